@@ -0,0 +1,62 @@
+"""
+Key size benchmark.
+
+Compares the bytes of the keys written by `DefaultKeyBuilder` and by
+`CompactKeyBuilder`, needs a redis for the code registry (db 15 is flushed).
+
+    python -m benchmarks.bench_key_size
+"""
+import uuid
+from redis import Redis
+from src.flamemodel.core.key_builder import CompactKeyBuilder, DefaultKeyBuilder
+from src.flamemodel.models import String
+from src.flamemodel.models.fields import fields
+from src.flamemodel.models.metadata import FieldMetaData
+
+REDIS_URL = 'redis://:@localhost:6379/15'
+NUMBER = 10_000
+
+
+class CustomerAccountProfile(String):
+    id: int = fields(primary_key=True)
+    email: str = fields()
+
+
+class AuditLogEntry(String):
+    id: str = fields(primary_key=True)
+
+
+def keys(builder):
+    pk_info = {'id': FieldMetaData(primary_key=True)}
+    for i in range(NUMBER):
+        yield builder.primary_key(
+            model=CustomerAccountProfile, shard_tags=[], pk=i, pk_field_name='id', pk_field_info=pk_info
+        )
+        yield builder.index_key(
+            model=CustomerAccountProfile, shard_tags=[], index_fields=['email'],
+            index_values=[f'user{i}@example.com'], pk=i, index_fields_info=[]
+        )
+        yield builder.primary_key(
+            model=AuditLogEntry, shard_tags=[], pk=f'{uuid.UUID(int=i)}:{uuid.UUID(int=i * 7)}',
+            pk_field_name='id', pk_field_info=pk_info
+        )
+
+
+def main():
+    client = Redis.from_url(REDIS_URL)
+    client.flushdb()
+    default_size = sum(len(key) for key in keys(DefaultKeyBuilder()))
+    print(f'{"builder":<36} {"key bytes":>12} {"saved":>8}')
+    print(f'{"DefaultKeyBuilder":<36} {default_size:>12}')
+    for hash_pk_over in (None, 32):
+        builder = CompactKeyBuilder(hash_pk_over=hash_pk_over)
+        builder.registry.bind(client)
+        size = sum(len(key) for key in keys(builder))
+        name = f'CompactKeyBuilder({hash_pk_over=})'
+        print(f'{name:<36} {size:>12} {1 - size / default_size:>8.1%}')
+    client.flushdb()
+    client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Primary key building benchmark.
+
+Compares the key built through `KeyBuilderProtocol.primary_key` on every call
+with the function compiled once per model by `compile_primary_key`.
+
+    python -m benchmarks.bench_primary_key
+"""
+import timeit
+from src.flamemodel.core.key_builder import DefaultKeyBuilder
+from src.flamemodel.models import String
+from src.flamemodel.models.fields import fields
+from src.flamemodel.models.metadata import FieldMetaData
+
+NUMBER = 200_000
+
+
+class BenchUser(String):
+    id: int = fields(primary_key=True)
+
+
+class BenchPatternUser(String):
+    __key_pattern__ = 'user:{pk}:profile'
+
+    id: int = fields(primary_key=True)
+
+
+def bench(model, builder):
+    pk_field_info = {'id': FieldMetaData(primary_key=True)}
+
+    def generic():
+        return builder.primary_key(
+            model=model,
+            shard_tags=[],
+            pk=12345,
+            pk_field_name='id',
+            pk_field_info=pk_field_info
+        )
+
+    compiled = builder.compile_primary_key(
+        model=model,
+        shard_tags=[],
+        pk_field_name='id',
+        pk_field_info=pk_field_info
+    )
+    assert generic() == compiled(12345)
+    before = min(timeit.repeat(generic, number=NUMBER, repeat=5)) / NUMBER * 1e9
+    after = min(timeit.repeat(lambda: compiled(12345), number=NUMBER, repeat=5)) / NUMBER * 1e9
+    print(f'{model.__name__:<18} {builder.namespace or "-":<10} {before:8.1f} ns/key {after:8.1f} ns/key')
+
+
+def main():
+    print(f'{"model":<18} {"namespace":<10} {"before":>15} {"compiled":>15}')
+    for builder in (DefaultKeyBuilder(), DefaultKeyBuilder(namespace='app')):
+        for model in (BenchUser, BenchPatternUser):
+            bench(model, builder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Model registration benchmark.
+
+Registers 500 generated models and compares reading the `fields()` metadata
+from the json schema (the former registration path) with reading it from
+`model_fields`, as `parse_model_metadata` does now.
+
+    python -m benchmarks.bench_registration
+"""
+import time
+import warnings
+from pydantic import create_model
+from src.flamemodel.constant import FlameModelJsonSchemaKey, PydanticPropertyField
+from src.flamemodel.models import String
+from src.flamemodel.models.fields import fields
+from src.flamemodel.models.repository import RedisModelRepository
+from src.flamemodel.utils.parse_model_metadata import parse_model_metadata
+
+MODELS = 500
+
+
+def make_models():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return [
+            create_model(
+                f'BenchModel{i}',
+                __base__=String,
+                id=(int, fields(primary_key=True)),
+                name=(str, fields(index=True)),
+                email=(str, fields(unique=True)),
+                age=(int, fields(default=0)),
+                tags=(list[str], fields(default_factory=list)),
+            )
+            for i in range(MODELS)
+        ]
+
+
+def from_json_schema(model_cls):
+    properties = model_cls.model_json_schema()[PydanticPropertyField]
+    return {name: prop[FlameModelJsonSchemaKey] for name, prop in properties.items()}
+
+
+def bench(label, func, models):
+    started = time.perf_counter()
+    for model in models:
+        func(model)
+    elapsed = time.perf_counter() - started
+    print(f'{label:<32} {elapsed * 1000:8.1f} ms total {elapsed / len(models) * 1e6:8.1f} us/model')
+
+
+def main():
+    repo = RedisModelRepository()
+    bench('json schema metadata', from_json_schema, make_models())
+    bench('parse_model_metadata', parse_model_metadata, make_models())
+    models = make_models()
+    bench('field lookup, first call', lambda m: repo._get_field_info(m, 'email'), models)
+    bench('field lookup, cached', lambda m: repo._get_field_info(m, 'email'), models)
+
+
+if __name__ == '__main__':
+    main()
@@ -32,6 +32,8 @@ class RedisAdaptor:
         self.connect_options = connect_options
         self.runtime_mode = runtime_mode
         self._proxy = self._init_proxy()
+        # one driver instance per redis type, bound to this adaptor
+        self._drivers = {}
 
     def _init_proxy(self) -> RedisClientInstance:
         mode_map = RedisClientTypeMap[self.is_cluster]
@@ -41,8 +43,11 @@ class RedisAdaptor:
                      adaptor=self) # type: ignore
 
     def get_redis_driver(self, redis_type: RedisDataType):
-        driver_cls = get_driver(redis_type)
-        return driver_cls(self)
+        driver = self._drivers.get(redis_type)
+        if driver is None:
+            driver_cls = get_driver(redis_type)
+            driver = self._drivers[redis_type] = driver_cls(self)
+        return driver
 
     @property
     def proxy(self):
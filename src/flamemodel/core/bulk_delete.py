@@ -0,0 +1,142 @@
+"""Delete many keys without blocking the server.
+
+`BulkDeleter` walks the keys matching a glob with SCAN and removes every page
+with a pipeline of UNLINK, Redis frees the memory in a background thread:
+
+    BulkDeleter(User).run()                            # every key of the model
+    BulkDeleter('tenant42:*', max_ops_per_second=5000).run()
+    await BulkDeleter(User).run()                      # async mode
+
+Purging a model also removes its companion keys: the `:data` hash of the Geo
+models, the index/unique keys of the key builder and the collection key.
+The deleter works on one node, Redis Cluster is not supported.
+"""
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Any, Callable, List, Optional, Type, Union, TYPE_CHECKING
+from ..utils.action import Action
+from ..utils.rate_limit import RateLimiter
+from ..utils.steps import Sleep, run_steps
+
+if TYPE_CHECKING:
+    from ..adaptor.interface import RedisAdaptor
+    from ..models import BaseRedisModel
+
+
+@dataclass
+class DeleteProgress:
+    scanned: int = 0
+    deleted: int = 0
+    # pattern being scanned and its cursor
+    match: Optional[str] = None
+    cursor: int = 0
+    done: bool = False
+
+
+class BulkDeleter:
+    """UNLINK every key of a model or every key matching a glob.
+
+    :param target: a model class (all its keys) or a glob such as 'tenant42:*'.
+    :param adaptor: the adaptor to use, the one of the models by default.
+    :param batch_size: COUNT hint of SCAN, the number of keys of one pipeline.
+    :param max_ops_per_second: ceiling of the redis commands per second, None for no limit.
+    :param on_progress: called with the `DeleteProgress` after every page.
+    :param max_passes: the keyspace is scanned again while a pass deleted keys (keys written
+        during the purge, cursors moved by the deletions), up to this number of passes.
+    """
+
+    def __init__(
+            self,
+            target: Union[Type['BaseRedisModel'], str],
+            *,
+            adaptor: Optional['RedisAdaptor'] = None,
+            batch_size: int = 500,
+            max_ops_per_second: Optional[float] = None,
+            on_progress: Optional[Callable[[DeleteProgress], Any]] = None,
+            max_passes: int = 3
+    ):
+        from ..models import BaseRedisModel
+        self.model_cls = None if isinstance(target, str) else target
+        self.adaptor = adaptor or (self.model_cls or BaseRedisModel).__redis_adaptor__
+        if self.adaptor is None:
+            raise RuntimeError("RedisAdaptor has not been set. Call BaseRedisModel.set_redis_adaptor() first.")
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.max_passes = max_passes
+        self.patterns = [target] if isinstance(target, str) else self._model_patterns()
+        self._limiter = RateLimiter(max_ops_per_second)
+
+    def run(self) -> DeleteProgress:
+        """Delete to the end, a coroutine in async mode."""
+        return run_steps(self._steps(), self.adaptor.runtime_mode)
+
+    # ===== Private Helper Methods =====
+
+    def _steps(self):
+        progress = DeleteProgress()
+        for _ in range(self.max_passes):
+            deleted = progress.deleted
+            for match in self.patterns:
+                yield from self._scan_pass(match, progress)
+            if progress.deleted == deleted:
+                break
+        collection_key = self._collection_key()
+        if collection_key is not None:
+            progress.deleted += yield self.adaptor.proxy.unlink(collection_key)
+        progress.done = True
+        return progress
+
+    def _scan_pass(self, match: str, progress: DeleteProgress):
+        proxy = self.adaptor.proxy
+        progress.match, progress.cursor = match, 0
+        while True:
+            cursor, keys = yield proxy.scan(progress.cursor, match=match, count=self.batch_size)
+            keys = [_decode(key) for key in keys]
+            progress.scanned += len(keys)
+            targets = keys + [companion for key in keys for companion in self._companions(key)]
+            if targets:
+                replies = yield self._pipeline([proxy.unlink(key) for key in targets])
+                progress.deleted += sum(replies)
+            progress.cursor = int(cursor)
+            if self.on_progress is not None:
+                self.on_progress(progress)
+            if not progress.cursor:
+                return
+            delay = self._limiter.delay(len(targets) + 1)
+            if delay:
+                yield Sleep(delay)
+
+    def _pipeline(self, actions: List[Action]) -> Action:
+        return Action.pipeline(
+            actions,
+            runtime_mode=self.adaptor.runtime_mode,
+            client=self.adaptor.proxy,
+            result_from_index=None
+        )
+
+    def _model_patterns(self) -> List[str]:
+        """The glob of the primary keys, plus the globs of the index/unique keys it doesn't cover."""
+        key_builder = self.model_cls.__key_builder__
+        primary = key_builder.key_pattern(model=self.model_cls, pattern_type='primary')
+        patterns = [primary]
+        for pattern_type in ('index', 'unique'):
+            pattern = key_builder.key_pattern(model=self.model_cls, pattern_type=pattern_type)
+            if not any(fnmatchcase(pattern, covered) for covered in patterns):
+                patterns.append(pattern)
+        return patterns
+
+    def _companions(self, key: str) -> List[str]:
+        if self.model_cls is None or self.model_cls.__redis_type__ != 'geo' or key.endswith(':data'):
+            return []
+        return [f"{key}:data"]
+
+    def _collection_key(self) -> Optional[str]:
+        if self.model_cls is None or getattr(self.model_cls, '__collection__', None) is None:
+            return None
+        return self.model_cls.collection_key()
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
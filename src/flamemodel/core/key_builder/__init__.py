@@ -1,7 +1,14 @@
-from .protocol import KeyBuilderProtocol
+from .protocol import KeyBuilderProtocol, PrimaryKeyCompiler
 from .default_builder import DefaultKeyBuilder
+from .compact_builder import CompactKeyBuilder, KeyCodeRegistry
+from .resolver import KeyResolver, ParsedKey
 
 __all__ = [
     'KeyBuilderProtocol',
-    'DefaultKeyBuilder'
+    'PrimaryKeyCompiler',
+    'DefaultKeyBuilder',
+    'CompactKeyBuilder',
+    'KeyCodeRegistry',
+    'KeyResolver',
+    'ParsedKey'
 ]
@@ -0,0 +1,427 @@
+"""Key builder writing short keys.
+
+Every model and field name gets a short code (base 36 of a sequence number) and
+the markers of the secondary keys are one character long:
+
+    DefaultKeyBuilder    UserProfile:123            UserProfile:idx:email:a@b.c
+    CompactKeyBuilder    3:123                      3:#:a:a@b.c
+
+The codes are kept in a registry hash in Redis, so they are stable across
+processes and deploys, a code is never reassigned. Optionally the pks longer
+than `hash_pk_over` characters are replaced by a fixed width digest, such keys
+can't be turned back into their pk.
+
+    FlameModel('sync', url, key_builder_cls='src.flamemodel.core.key_builder:CompactKeyBuilder')
+"""
+import asyncio
+import base64
+import hashlib
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Literal, Optional, Type
+from ...constant import RedisKeyDelimiter, StringModelDelimiter
+from ...exceptions import KeyCodeRegistryError
+from ...utils.action import Action
+from ...utils.steps import run_steps
+from .default_builder import DefaultKeyBuilder
+
+if TYPE_CHECKING:
+    from ...adaptor.interface import RedisAdaptor
+    from ...models import BaseRedisModel
+    from ...models.metadata import FieldMetaData
+
+DefaultRegistryKey = RedisKeyDelimiter.join(['__flamemodel__', 'keycodes'])
+_sequence_field = '__seq__'
+# the names the models put in the field position of their internal index keys
+_index_segments = ('__gen__', '__tmp__', '__cache__', '__prefix__')
+_digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+class KeyCodeRegistry:
+    """Name -> short code mapping, persisted in a redis hash.
+
+    Codes are assigned with HINCRBY on a sequence field and HSETNX on the name,
+    when two processes race for the same name the first HSETNX wins and the
+    other one reads its code. Codes are only assigned the first time a name is seen.
+
+    The registry is bound to the adaptor of `FlameModel` (`bind_adaptor`) and talks
+    to redis with its actions. In async mode the keys are still built synchronously,
+    the codes are therefore loaded and assigned beforehand with
+    `await key_builder.prepare()`, the unknown codes met by `name` are looked up by
+    a background reload. `bind` takes a sync redis client instead.
+
+    An unknown code reloads the registry at most once every `reload_interval`
+    seconds, the other misses are answered from memory.
+    """
+
+    def __init__(self, key: str = DefaultRegistryKey, client: Any = None, reload_interval: float = 5.0):
+        self.key = key
+        self.reload_interval = reload_interval
+        self._client = client
+        self._proxy = None
+        self._runtime_mode = 'sync'
+        self._lock = threading.RLock()
+        self._codes: Dict[str, str] = {}
+        self._names: Dict[str, str] = {}
+        self._loaded = False
+        # monotonic time of the last reload caused by an unknown code
+        self._reloaded_at: Optional[float] = None
+        self._reloading: Optional['asyncio.Task'] = None
+
+    def bind(self, client: Any):
+        """Persist the codes with the sync redis `client`."""
+        with self._lock:
+            self._client, self._proxy, self._runtime_mode = client, None, 'sync'
+            self._loaded = False
+
+    def bind_adaptor(self, adaptor: 'RedisAdaptor'):
+        """Persist the codes with the actions of `adaptor`."""
+        with self._lock:
+            self._client, self._proxy, self._runtime_mode = None, adaptor.proxy, adaptor.runtime_mode
+            self._loaded = False
+
+    def prepare(self, names: Iterable[str]):
+        """Load the registry and assign the codes of `names`, a coroutine in async mode."""
+        return run_steps(self._prepare_steps(list(names)), self._runtime_mode)
+
+    def code(self, name: str) -> str:
+        code = self._codes.get(name)
+        if code is not None:
+            return code
+        with self._lock:
+            code = self._codes.get(name)
+            if code is not None:
+                return code
+            if self._runtime_mode != 'sync':
+                raise KeyCodeRegistryError(
+                    f"The name {name} has no code in the key code registry {self.key} yet, "
+                    "call `await key_builder.prepare()` before building the keys in async mode."
+                )
+            if not self._loaded:
+                run_steps(self._load_steps(), 'sync')
+            code = self._codes.get(name)
+            if code is None:
+                code = run_steps(self._assign_steps(name), 'sync')
+        return code
+
+    def name(self, code: str) -> Optional[str]:
+        name = self._names.get(code)
+        if name is not None or not self._bound():
+            return name
+        now = time.monotonic()
+        if self._reloaded_at is not None and now - self._reloaded_at < self.reload_interval:
+            return None
+        # the code may have been assigned by another process
+        with self._lock:
+            self._reloaded_at = now
+            if self._runtime_mode == 'sync':
+                run_steps(self._load_steps(), 'sync')
+            else:
+                self._reload_in_background()
+        return self._names.get(code)
+
+    def _bound(self) -> bool:
+        return self._client is not None or self._proxy is not None
+
+    def _command(self, command: str, *args) -> Action:
+        if self._proxy is not None:
+            return getattr(self._proxy, command)(*args)
+        if self._client is None:
+            raise KeyCodeRegistryError(
+                f"The key code registry {self.key} is not bound to redis, "
+                "create the FlameModel with the key builder or call bind() first."
+            )
+        return Action(runtime_mode='sync', executor=getattr(self._client, command), args=args)
+
+    def _prepare_steps(self, names: List[str]):
+        yield from self._load_steps()
+        for name in names:
+            if name not in self._codes:
+                yield from self._assign_steps(name)
+
+    def _load_steps(self):
+        mapping = yield self._command('hgetall', self.key)
+        for name, code in (mapping or {}).items():
+            name, code = _decode(name), _decode(code)
+            if name != _sequence_field:
+                self._remember(name, code)
+        self._loaded = True
+
+    def _assign_steps(self, name: str):
+        sequence = yield self._command('hincrby', self.key, _sequence_field, 1)
+        code = _base36(sequence - 1)
+        if not (yield self._command('hsetnx', self.key, name, code)):
+            code = _decode((yield self._command('hget', self.key, name)))
+        self._remember(name, code)
+        return code
+
+    def _reload_in_background(self):
+        if self._reloading is not None and not self._reloading.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._reloading = loop.create_task(run_steps(self._load_steps(), 'async'))
+
+    def _remember(self, name: str, code: str):
+        self._codes[name] = code
+        self._names[code] = name
+
+
+class CompactKeyBuilder(DefaultKeyBuilder):
+    """`DefaultKeyBuilder` with short model/field codes and one character markers.
+
+    Args:
+        delimiter: Character to separate key segments (default: ':')
+        namespace: Optional global namespace prefix for all keys
+        registry_key: Redis key of the code registry hash
+        hash_pk_over: Replace the pks longer than this by their digest, None to keep every pk
+        digest_size: Size in bytes of the pk digest (blake2b, written in base64url)
+        parse_cache_size: Size of the LRU cache of `parse_key` results
+        reload_interval: Minimum seconds between two reloads of the registry for unknown codes
+    """
+
+    index_marker = '#'
+    unique_marker = '!'
+    foreign_marker = '>'
+    relationship_marker = '&'
+    backref_marker = '<'
+    collection_marker = '@'
+    # first character of a digested pk
+    pk_digest_prefix = '~'
+
+    def __init__(
+            self,
+            delimiter: str = RedisKeyDelimiter,
+            namespace: Optional[str] = None,
+            registry_key: str = DefaultRegistryKey,
+            hash_pk_over: Optional[int] = None,
+            digest_size: int = 12,
+            parse_cache_size: int = 65536,
+            reload_interval: float = 5.0
+    ):
+        super().__init__(delimiter=delimiter, namespace=namespace, parse_cache_size=parse_cache_size)
+        self.registry = KeyCodeRegistry(registry_key, reload_interval=reload_interval)
+        self.digest_size = digest_size
+        digest_width = len(self.pk_digest_prefix) + len(_b64(bytes(digest_size)))
+        if hash_pk_over is not None and hash_pk_over < digest_width:
+            raise ValueError(f"hash_pk_over must be at least the digest width ({digest_width}).")
+        self.hash_pk_over = hash_pk_over
+
+    def bind_adaptor(self, adaptor: 'RedisAdaptor'):
+        """Persist the codes with the redis of `adaptor`, called by `FlameModel`."""
+        self.registry.bind_adaptor(adaptor)
+
+    def prepare(self, models: Optional[Iterable[Type['BaseRedisModel']]] = None):
+        """Load the codes and assign the ones of `models` and their fields, the defined
+        models by default. Required in async mode before the keys are built, a
+        coroutine in async mode.
+
+            await key_builder.prepare()
+        """
+        if models is None:
+            from ...models.repository import RedisModelRepository
+            models = RedisModelRepository().models()
+        names = []
+        for model in models:
+            model_name = super()._get_model_name(model)
+            names.append(model_name)
+            names.extend(f'{model_name}{StringModelDelimiter}{field}' for field in (*model.model_fields, *_index_segments))
+        return self.registry.prepare(names)
+
+    def compact_pk(self, pk: Any) -> str:
+        """The pk as written in the keys, digested when it is longer than `hash_pk_over`."""
+        pk = str(pk)
+        if self.hash_pk_over is None or len(pk) <= self.hash_pk_over:
+            return pk
+        digest = hashlib.blake2b(pk.encode('utf-8'), digest_size=self.digest_size).digest()
+        return self.pk_digest_prefix + _b64(digest)
+
+    def primary_key(
+            self,
+            *,
+            model: 'BaseRedisModel',
+            shard_tags: List[str],
+            pk: Any,
+            pk_field_name: str,
+            pk_field_info: Dict[str, 'FieldMetaData']
+    ) -> str:
+        return super().primary_key(
+            model=model,
+            shard_tags=shard_tags,
+            pk=self.compact_pk(pk),
+            pk_field_name=pk_field_name,
+            pk_field_info=pk_field_info
+        )
+
+    def compile_primary_key(
+            self,
+            *,
+            model: 'BaseRedisModel',
+            shard_tags: List[str],
+            pk_field_name: str,
+            pk_field_info: Dict[str, 'FieldMetaData']
+    ) -> Callable[[Any], str]:
+        func = super().compile_primary_key(
+            model=model,
+            shard_tags=shard_tags,
+            pk_field_name=pk_field_name,
+            pk_field_info=pk_field_info
+        )
+        if self.hash_pk_over is None:
+            return func
+        compact_pk = self.compact_pk
+        return lambda pk: func(compact_pk(pk))
+
+    def index_key(
+            self,
+            *,
+            model: 'BaseRedisModel',
+            shard_tags: List[str],
+            index_fields: List[str],
+            index_values: List[Any],
+            pk: Any,
+            index_fields_info: List[Dict[str, 'FieldMetaData']]
+    ) -> str:
+        return super().index_key(
+            model=model,
+            shard_tags=shard_tags,
+            index_fields=self._field_codes(model, index_fields),
+            index_values=index_values,
+            pk=pk,
+            index_fields_info=index_fields_info
+        )
+
+    def unique_key(
+            self,
+            *,
+            model: 'BaseRedisModel',
+            shard_tags: List[str],
+            unique_fields: List[str],
+            unique_values: List[Any],
+            pk: Any,
+            unique_fields_info: List[Dict[str, 'FieldMetaData']]
+    ) -> str:
+        return super().unique_key(
+            model=model,
+            shard_tags=shard_tags,
+            unique_fields=self._field_codes(model, unique_fields),
+            unique_values=unique_values,
+            pk=pk,
+            unique_fields_info=unique_fields_info
+        )
+
+    def foreign_key(
+            self,
+            *,
+            model: 'BaseRedisModel',
+            foreign_model: 'BaseRedisModel',
+            field_name: str,
+            pk: Any,
+            foreign_pk: Any
+    ) -> str:
+        return super().foreign_key(
+            model=model,
+            foreign_model=foreign_model,
+            field_name=self._field_code(model, field_name),
+            pk=self.compact_pk(pk),
+            foreign_pk=foreign_pk
+        )
+
+    def relationship_key(
+            self,
+            *,
+            model: 'BaseRedisModel',
+            related_model: 'BaseRedisModel',
+            relation_name: str,
+            pk: Any,
+            relation_type: Literal['one', 'many']
+    ) -> str:
+        return super().relationship_key(
+            model=model,
+            related_model=related_model,
+            relation_name=self._field_code(model, relation_name),
+            pk=self.compact_pk(pk),
+            relation_type=relation_type
+        )
+
+    def backref_key(
+            self,
+            *,
+            model: 'BaseRedisModel',
+            source_model: 'BaseRedisModel',
+            backref_name: str,
+            pk: Any,
+            source_pk: Any
+    ) -> str:
+        return super().backref_key(
+            model=model,
+            source_model=source_model,
+            backref_name=self._field_code(model, backref_name),
+            pk=self.compact_pk(pk),
+            source_pk=source_pk
+        )
+
+    def hash_field_key(
+            self,
+            *,
+            model: 'BaseRedisModel',
+            pk: Any,
+            field_name: str
+    ) -> str:
+        return super().hash_field_key(model=model, pk=self.compact_pk(pk), field_name=field_name)
+
+    def parse_key(
+            self,
+            key: str
+    ) -> Dict[str, Any]:
+        """Parse a compact key, the codes are translated back to the names.
+
+        A digested pk is returned as None with the digest under `pk_digest`.
+        """
+        result = super().parse_key(key)
+        model_name = self.registry.name(result['model'])
+        if model_name is not None:
+            result['model'] = model_name
+        for name in ('field', 'relation', 'backref'):
+            code = result.get(name)
+            if code is not None:
+                field_name = self.registry.name(code)
+                if field_name is not None:
+                    result[name] = field_name.rsplit(StringModelDelimiter, 1)[-1]
+        pk = result.get('pk')
+        if pk is not None and pk.startswith(self.pk_digest_prefix):
+            result['pk'] = None
+            result['pk_digest'] = pk
+        return result
+
+    # ===== Private Helper Methods =====
+
+    def _get_model_name(self, model: 'BaseRedisModel') -> str:
+        return self.registry.code(super()._get_model_name(model))
+
+    def _field_code(self, model: 'BaseRedisModel', field_name: str) -> str:
+        return self.registry.code(f'{super()._get_model_name(model)}{StringModelDelimiter}{field_name}')
+
+    def _field_codes(self, model: 'BaseRedisModel', field_names: List[str]) -> List[str]:
+        return [self._field_code(model, name) for name in field_names]
+
+
+def _base36(number: int) -> str:
+    code = ''
+    while True:
+        number, digit = divmod(number, 36)
+        code = _digits[digit] + code
+        if not number:
+            return code
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
@@ -1,13 +1,17 @@
-from typing import TYPE_CHECKING, List, Any, Dict, Optional, Literal, Type, Union
+import re
+from functools import lru_cache
+from string import Formatter
+from typing import TYPE_CHECKING, List, Any, Dict, Optional, Literal, Type, Union, Callable
 from ...constant import RedisKeyDelimiter
-from .protocol import KeyBuilderProtocol
+from .protocol import KeyBuilderProtocol, PrimaryKeyCompiler
 
 if TYPE_CHECKING:
     from ...models import BaseRedisModel
     from ...models.metadata import FieldMetaData
 
+_placeholder_re = re.compile(r'\{[^{}]*\}')
 
-class DefaultKeyBuilder(KeyBuilderProtocol):
+class DefaultKeyBuilder(KeyBuilderProtocol, PrimaryKeyCompiler):
     """Default implementation of KeyBuilderProtocol.
     
     Uses a hierarchical key structure with colon (:) as delimiter.
@@ -21,15 +25,38 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         - Relationship: User:123:rel:orders
     """
 
-    def __init__(self, delimiter: str = RedisKeyDelimiter, namespace: Optional[str] = None):
+    # markers of the secondary keys
+    index_marker = 'idx'
+    unique_marker = 'uniq'
+    foreign_marker = 'fk'
+    relationship_marker = 'rel'
+    backref_marker = 'backref'
+    collection_marker = 'all'
+
+    def __init__(
+            self,
+            delimiter: str = RedisKeyDelimiter,
+            namespace: Optional[str] = None,
+            parse_cache_size: int = 65536
+    ):
         """Initialize the key builder.
         
         Args:
             delimiter: Character to separate key segments (default: ':')
             namespace: Optional global namespace prefix for all keys
+            parse_cache_size: Size of the LRU cache of `parse_key` results
         """
         self.delimiter = delimiter
         self.namespace = namespace
+        # marker -> (key type, result field of the name after the marker)
+        self._key_markers = {
+            self.index_marker: ('index', None),
+            self.unique_marker: ('unique', None),
+            self.foreign_marker: ('foreign', 'field'),
+            self.relationship_marker: ('relationship', 'relation'),
+            self.backref_marker: ('backref', 'backref'),
+        }
+        self._parse_key_cached = lru_cache(maxsize=parse_cache_size)(self._parse_key)
 
     def primary_key(
             self,
@@ -53,6 +80,43 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         parts.append(str(pk))
         return self._join_parts(parts)
 
+    def compile_primary_key(
+            self,
+            *,
+            model: 'BaseRedisModel',
+            shard_tags: List[str],
+            pk_field_name: str,
+            pk_field_info: Dict[str, 'FieldMetaData']
+    ) -> Callable[[Any], str]:
+        """Precompute the key around the pk, only `str(pk)` is left at call time."""
+        pattern = getattr(model, '__key_pattern__', None)
+        if pattern and not shard_tags:
+            affixes = self._split_key_pattern(pattern, pk_field_name)
+            if affixes is None:
+                # format spec or several placeholders, keep the generic formatting
+                def _primary_key(pk: Any) -> str:
+                    return self.primary_key(
+                        model=model,
+                        shard_tags=shard_tags,
+                        pk=pk,
+                        pk_field_name=pk_field_name,
+                        pk_field_info=pk_field_info
+                    )
+
+                return _primary_key
+            prefix, suffix = affixes
+            if self.namespace:
+                prefix = f"{self.namespace}{self.delimiter}{prefix}"
+        else:
+            parts = [self._get_model_name(model)]
+            if shard_tags:
+                parts.append(self.format_shard_tags(shard_tags))
+            prefix, suffix = self._join_parts(parts) + self.delimiter, ''
+
+        if suffix:
+            return lambda pk: f"{prefix}{pk}{suffix}"
+        return lambda pk: f"{prefix}{pk}"
+
     def index_key(
             self,
             *,
@@ -69,7 +133,7 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         if shard_tags:
             parts.append(self.format_shard_tags(shard_tags))
 
-        parts.append('idx')
+        parts.append(self.index_marker)
 
         # Add field names
         parts.extend(index_fields)
@@ -95,7 +159,7 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         if shard_tags:
             parts.append(self.format_shard_tags(shard_tags))
 
-        parts.append('uniq')
+        parts.append(self.unique_marker)
 
         # Add field names
         parts.extend(unique_fields)
@@ -118,7 +182,7 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         parts = [
             self._get_model_name(model),
             str(pk),
-            'fk',
+            self.foreign_marker,
             field_name
         ]
         return self._join_parts(parts)
@@ -136,7 +200,7 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         parts = [
             self._get_model_name(model),
             str(pk),
-            'rel',
+            self.relationship_marker,
             relation_name
         ]
         return self._join_parts(parts)
@@ -154,7 +218,7 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         parts = [
             self._get_model_name(model),
             str(pk),
-            'backref',
+            self.backref_marker,
             backref_name
         ]
         return self._join_parts(parts)
@@ -168,7 +232,7 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
     ) -> str:
         pattern = getattr(model, '__key_pattern__', None)
         if pattern:
-            pk_field_name = list(model.__model_meta__.pk_info.keys())[0]
+            pk_field_name = model.__model_meta__.accessors.pk_field
             placeholders = {'pk': pk, pk_field_name: pk}
             key = pattern.format(**placeholders)
             if self.namespace:
@@ -189,7 +253,7 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         if shard_tags:
             parts.append(self.format_shard_tags(shard_tags))
 
-        parts.append('all')
+        parts.append(self.collection_marker)
 
         return self._join_parts(parts)
 
@@ -201,6 +265,13 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
             prefix: Optional[str] = None
     ) -> str:
         """Build key pattern for scanning: ModelName:pattern_type:*"""
+        pattern = getattr(model, '__key_pattern__', None)
+        if pattern_type == 'primary' and pattern and not prefix:
+            # every placeholder of the key pattern matches anything
+            key = _placeholder_re.sub('*', pattern)
+            if self.namespace:
+                return f"{self.namespace}{self.delimiter}{key}"
+            return key
         parts = [self._get_model_name(model)]
 
         if prefix:
@@ -209,13 +280,13 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         if pattern_type == 'primary':
             parts.append('*')
         elif pattern_type == 'index':
-            parts.extend(['idx', '*'])
+            parts.extend([self.index_marker, '*'])
         elif pattern_type == 'unique':
-            parts.extend(['uniq', '*'])
+            parts.extend([self.unique_marker, '*'])
         elif pattern_type == 'foreign':
-            parts.extend(['*', 'fk', '*'])
+            parts.extend(['*', self.foreign_marker, '*'])
         elif pattern_type == 'relationship':
-            parts.extend(['*', 'rel', '*'])
+            parts.extend(['*', self.relationship_marker, '*'])
 
         return self._join_parts(parts)
 
@@ -235,6 +306,21 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         Returns:
             Dict with keys: model, pk, type, fields (if applicable)
         """
+        return dict(self._parse_key_cached(key))
+
+    def get_namespace(
+            self,
+            model: 'BaseRedisModel'
+    ) -> str:
+        """Get the namespace for a model."""
+        if self.namespace:
+            return self.namespace
+        # Check if model has custom schema
+        return getattr(model, '__schema__', None) or model.__name__
+
+    # ===== Private Helper Methods =====
+
+    def _parse_key(self, key: str) -> Dict[str, Any]:
         # Remove namespace if present
         if self.namespace and key.startswith(f"{self.namespace}{self.delimiter}"):
             key = key[len(self.namespace) + len(self.delimiter):]
@@ -245,53 +331,46 @@ class DefaultKeyBuilder(KeyBuilderProtocol):
         if len(parts) < 2:
             return result
 
-        # Check for special key types
-        if 'idx' in parts:
-            idx_pos = parts.index('idx')
-            result['type'] = 'index'
-            result['pk'] = None  # Index keys don't directly contain pk
-        elif 'uniq' in parts:
-            uniq_pos = parts.index('uniq')
-            result['type'] = 'unique'
-            result['pk'] = None
-        elif 'fk' in parts:
-            fk_pos = parts.index('fk')
-            result['type'] = 'foreign'
-            result['pk'] = parts[1] if len(parts) > 1 else None
-            result['field'] = parts[fk_pos + 1] if len(parts) > fk_pos + 1 else None
-        elif 'rel' in parts:
-            rel_pos = parts.index('rel')
-            result['type'] = 'relationship'
-            result['pk'] = parts[1] if len(parts) > 1 else None
-            result['relation'] = parts[rel_pos + 1] if len(parts) > rel_pos + 1 else None
-        elif 'backref' in parts:
-            backref_pos = parts.index('backref')
-            result['type'] = 'backref'
-            result['pk'] = parts[1] if len(parts) > 1 else None
-            result['backref'] = parts[backref_pos + 1] if len(parts) > backref_pos + 1 else None
-        else:
+        # one pass over the parts, the markers are then checked by precedence
+        markers = self._key_markers.keys() & set(parts)
+        if not markers:
             # Primary key format
             result['type'] = 'primary'
             result['pk'] = parts[-1]
+            return result
+        for marker, (type_, name) in self._key_markers.items():
+            if marker not in markers:
+                continue
+            result['type'] = type_
+            if name is None:
+                result['pk'] = None  # Index and unique keys don't directly contain pk
+            else:
+                pos = parts.index(marker)
+                result['pk'] = parts[1]
+                result[name] = parts[pos + 1] if len(parts) > pos + 1 else None
+            break
 
         return result
 
-    def get_namespace(
-            self,
-            model: 'BaseRedisModel'
-    ) -> str:
-        """Get the namespace for a model."""
-        if self.namespace:
-            return self.namespace
-        # Check if model has custom schema
-        return getattr(model, '__schema__', None) or model.__name__
-
-    # ===== Private Helper Methods =====
-
     def _get_model_name(self, model: 'BaseRedisModel') -> str:
         """Extract model name from model class."""
         return getattr(model, '__schema__', None) or model.__name__
 
+    @staticmethod
+    def _split_key_pattern(pattern: str, pk_field_name: str):
+        """Split a key pattern around its only pk placeholder, None when it isn't that simple."""
+        prefix, suffix, found = [], [], False
+        for literal, name, spec, conversion in Formatter().parse(pattern):
+            (suffix if found else prefix).append(literal)
+            if name is None:
+                continue
+            if found or name not in ('pk', pk_field_name) or spec or conversion:
+                return None
+            found = True
+        if not found:
+            return None
+        return ''.join(prefix), ''.join(suffix)
+
     def _join_parts(self, parts: List[str]) -> str:
         """Join key parts with delimiter and optional namespace."""
         key = self.delimiter.join(parts)
@@ -1,7 +1,7 @@
 from typing import (
     Protocol, runtime_checkable,
     TYPE_CHECKING, List,
-    Any, Dict, Optional, Literal
+    Any, Dict, Optional, Literal, Callable
 )
 
 if TYPE_CHECKING:
@@ -270,3 +270,36 @@ class KeyBuilderProtocol(Protocol):
             Namespace string (e.g., 'app:User' or just 'User')
         """
         ...
+
+
+class PrimaryKeyCompiler(Protocol):
+    """Optional method of a key builder, the primary keys of a model built from one function.
+
+    A key builder without it gets its `primary_key` called with every pk, see
+    `BaseRedisModel.compile_primary_key`. It is not part of `KeyBuilderProtocol`
+    so the builders written before it still pass the `isinstance` check.
+    """
+
+    def compile_primary_key(
+            self,
+            *,
+            model: 'BaseRedisModel',
+            shard_tags: List[str],
+            pk_field_name: str,
+            pk_field_info: Dict[str, 'FieldMetaData']
+    ) -> Callable[[Any], str]:
+        """Build a function returning the primary key of `model` from a pk value.
+
+        Called once per model, everything which doesn't depend on the pk should be
+        computed here.
+
+        Args:
+            model: The model class
+            shard_tags: List of shard tag values for distributed keys
+            pk_field_name: Name of the primary key field
+            pk_field_info: Metadata of the primary key field
+
+        Returns:
+            Callable taking the pk value and returning the Redis key string
+        """
+        ...
@@ -0,0 +1,127 @@
+import re
+from functools import lru_cache
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Type, Union, TYPE_CHECKING
+from pydantic import TypeAdapter
+from ...exceptions import FlameModelException
+
+if TYPE_CHECKING:
+    from ...models import BaseRedisModel
+    from .protocol import KeyBuilderProtocol
+
+# stands for the pk when a key is built to find its prefix and suffix
+_pk_sentinel = '\x00pk\x00'
+
+
+class ParsedKey(NamedTuple):
+    model: Type['BaseRedisModel']
+    pk: Any
+    key: str
+
+
+class KeyResolver:
+    """Resolve primary keys back to their model class and typed pk.
+
+    The primary key of every model is built once with a sentinel pk to find the
+    prefix and suffix around the pk, all the models are then matched at once by
+    one compiled regex (one alternative per model), the matching alternative
+    gives the model. The pk is converted to the type of the pk field.
+
+        resolver = KeyResolver(key_builder, [User, Order])
+        resolver.parse_key('User:42')   # ParsedKey(model=User, pk=42, key='User:42')
+
+    Keys which are not the primary key of one of the models resolve to None, a
+    digested pk (see `CompactKeyBuilder`) resolves with a None pk.
+
+    Without `models` every model defined so far (`RedisModelRepository`) is resolved:
+
+        resolver = KeyResolver(key_builder)
+
+    :param key_builder: the key builder which built the keys.
+    :param models: model classes to resolve, the defined models by default, models
+        without usable metadata are skipped.
+    :param cache_size: size of the LRU cache of the results.
+    """
+
+    def __init__(
+            self,
+            key_builder: 'KeyBuilderProtocol',
+            models: Optional[Iterable[Type['BaseRedisModel']]] = None,
+            cache_size: int = 65536
+    ):
+        if models is None:
+            from ...models.repository import RedisModelRepository
+            models = RedisModelRepository().models()
+        self.key_builder = key_builder
+        self.models: List[Type['BaseRedisModel']] = []
+        self._pk_converters: List[Callable[[str], Any]] = []
+        # digested pks (CompactKeyBuilder) can't be converted back
+        self._pk_digest_prefix = getattr(key_builder, 'pk_digest_prefix', None)
+        delimiter = getattr(key_builder, 'delimiter', None)
+        pk_pattern = f'[^{re.escape(delimiter)}]+' if delimiter else '.+'
+        alternatives = []
+        for model in models:
+            affixes = self._key_affixes(model)
+            if affixes is None:
+                continue
+            prefix, suffix, converter = affixes
+            index = len(self.models)
+            self.models.append(model)
+            self._pk_converters.append(converter)
+            alternatives.append((prefix, f'{re.escape(prefix)}(?P<m{index}>{pk_pattern}){re.escape(suffix)}'))
+        # the longest prefixes first, so a model never shadows a more specific one
+        alternatives.sort(key=lambda item: len(item[0]), reverse=True)
+        self._regex = re.compile('|'.join(pattern for _, pattern in alternatives)) if alternatives else None
+        self._parse_key_cached = lru_cache(maxsize=cache_size)(self._parse_key)
+
+    def parse_key(self, key: Union[str, bytes]) -> Optional[ParsedKey]:
+        if isinstance(key, bytes):
+            key = key.decode('utf-8')
+        return self._parse_key_cached(key)
+
+    def parse_keys(self, keys: Iterable[Union[str, bytes]]) -> List[Optional[ParsedKey]]:
+        """Resolve a page of keys (e.g. a SCAN reply), None for the keys which don't resolve."""
+        parse_key = self.parse_key
+        return [parse_key(key) for key in keys]
+
+    def _parse_key(self, key: str) -> Optional[ParsedKey]:
+        if self._regex is None:
+            return None
+        match = self._regex.fullmatch(key)
+        if match is None:
+            return None
+        group = match.lastgroup
+        index = int(group[1:])
+        raw = match.group(group)
+        if self._pk_digest_prefix and raw.startswith(self._pk_digest_prefix):
+            return ParsedKey(model=self.models[index], pk=None, key=key)
+        try:
+            pk = self._pk_converters[index](raw)
+        except ValueError:
+            return None
+        return ParsedKey(model=self.models[index], pk=pk, key=key)
+
+    def _key_affixes(self, model: Type['BaseRedisModel']):
+        try:
+            meta = model.__model_meta__
+        except (FlameModelException, AttributeError):
+            # no metadata (e.g. a direct subclass of BaseRedisModel) or invalid one
+            return None
+        if meta is None:
+            return None
+        pk_field_name = meta.accessors.pk_field
+        compile_primary_key = getattr(self.key_builder, 'compile_primary_key', None)
+        kwargs = dict(
+            model=model,
+            shard_tags=meta.shard_tags,
+            pk_field_name=pk_field_name,
+            pk_field_info=meta.pk_info
+        )
+        if compile_primary_key is not None:
+            key = compile_primary_key(**kwargs)(_pk_sentinel)
+        else:
+            key = self.key_builder.primary_key(pk=_pk_sentinel, **kwargs)
+        if key.count(_pk_sentinel) != 1:
+            return None
+        prefix, suffix = key.split(_pk_sentinel)
+        adapter = TypeAdapter(model.model_fields[pk_field_name].rebuild_annotation())
+        return prefix, suffix, adapter.validate_strings
@@ -0,0 +1,244 @@
+"""Online migration of stored models.
+
+`Migrator` walks the keys of one model with SCAN and rewrites every stored
+value through an upgrade function, in pipelined chunks. The rewrites go through
+the write path of the model, its indexes, unique claims and query generation
+follow the upgraded values:
+
+    migrator = Migrator(User, upgrade=add_nickname, max_ops_per_second=2000)
+    progress = migrator.run()          # `await migrator.run()` in async mode
+
+The cursor and the counters are checkpointed in Redis after every chunk, in the
+same round trip as the writes (after them for the models with indexed or unique
+fields, whose writes WATCH their keys), so an interrupted migration resumes
+where it stopped. A key may be processed twice when a chunk is interrupted, the upgrade
+function must therefore accept values which are already upgraded.
+
+Combined with an upgrade on read (the model accepting both shapes) the data is
+migrated in the background without downtime.
+The migrator works on one node, Redis Cluster is not supported.
+"""
+import json
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Type, Union, TYPE_CHECKING
+from ..constant import RedisKeyDelimiter
+from ..exceptions import MigrationNotSupportedError
+from .key_builder.resolver import KeyResolver
+from ..models.field_storage import dump_fields
+from ..utils.action import Action
+from ..utils.rate_limit import RateLimiter
+from ..utils.steps import Sleep, run_steps
+
+if TYPE_CHECKING:
+    from ..models import BaseRedisModel
+
+UpgradeResult = Union[None, Dict[str, Any], 'BaseRedisModel']
+
+
+@dataclass
+class MigrationProgress:
+    scanned: int = 0
+    migrated: int = 0
+    skipped: int = 0
+    cursor: int = 0
+    done: bool = False
+
+
+class Migrator:
+    """Rewrite every stored value of `model_cls` through `upgrade`.
+
+    :param model_cls: a `String` model (blob or fields storage mode) or a `Hash` model.
+    :param upgrade: called with the stored data as a dict (old shape), returns the
+        new data as a dict or a model instance, or None to leave the value untouched.
+    :param name: name of the migration, used for the checkpoint key.
+    :param batch_size: COUNT hint of SCAN, the number of keys of one chunk.
+    :param max_ops_per_second: ceiling of the redis commands per second, None for no limit.
+    :param resume: continue from the checkpoint of a previous run of the same migration.
+    :param checkpoint_key: redis key of the checkpoint, derived from the model and the name by default.
+    :param on_progress: called with the `MigrationProgress` after every chunk.
+    :param decoder: decode the raw stored value to a dict, `json.loads` by default.
+    """
+
+    def __init__(
+            self,
+            model_cls: Type['BaseRedisModel'],
+            upgrade: Callable[[Dict[str, Any]], UpgradeResult],
+            *,
+            name: str = 'default',
+            batch_size: int = 500,
+            max_ops_per_second: Optional[float] = None,
+            resume: bool = True,
+            checkpoint_key: Optional[str] = None,
+            on_progress: Optional[Callable[[MigrationProgress], Any]] = None,
+            decoder: Callable[[Any], Dict[str, Any]] = json.loads
+    ):
+        if model_cls.__redis_type__ not in ('string', 'hash'):
+            raise MigrationNotSupportedError(
+                f"The model {model_cls.__name__} is a {model_cls.__redis_type__} model, "
+                "only string and hash models can be migrated."
+            )
+        self.model_cls = model_cls
+        self.upgrade = upgrade
+        self.name = name
+        self.batch_size = batch_size
+        self.resume = resume
+        self.on_progress = on_progress
+        self.decoder = decoder
+        self.checkpoint_key = checkpoint_key or RedisKeyDelimiter.join(
+            ['__flamemodel__', 'migration', self._model_name(), name]
+        )
+        self._limiter = RateLimiter(max_ops_per_second)
+        self._resolver = KeyResolver(model_cls.__key_builder__, [model_cls])
+
+    @property
+    def adaptor(self):
+        return self.model_cls.__redis_adaptor__
+
+    def run(self) -> MigrationProgress:
+        """Run the migration to the end, a coroutine in async mode."""
+        return run_steps(self._steps(), self.adaptor.runtime_mode)
+
+    def checkpoint(self) -> Action:
+        """Read the saved progress of this migration, None when there is none."""
+        return self.adaptor.proxy.hgetall(self.checkpoint_key).then(self._load_progress)
+
+    def reset(self) -> Action:
+        """Forget the checkpoint, the next run starts from the beginning."""
+        return self.adaptor.proxy.delete(self.checkpoint_key)
+
+    # ===== Private Helper Methods =====
+
+    def _steps(self):
+        proxy = self.adaptor.proxy
+        driver = self.model_cls.get_driver()
+        progress = None
+        if self.resume:
+            progress = yield self.checkpoint()
+        progress = progress or MigrationProgress()
+        match = self.model_cls.__key_builder__.key_pattern(model=self.model_cls, pattern_type='primary')
+        key_type = self._key_type()
+        while True:
+            cursor, keys = yield driver.scan(progress.cursor, match=match, count=self.batch_size, type_=key_type)
+            keys = self._primary_keys(keys)
+            writes = []
+            if keys:
+                values = yield self._pipeline([self._read(key) for key in keys])
+                for key, value in zip(keys, values):
+                    progress.scanned += 1
+                    write = self._rewrite(key, value) if value else None
+                    if write is not None:
+                        progress.migrated += 1
+                        writes.append(write)
+                    else:
+                        progress.skipped += 1
+            progress.cursor = int(cursor)
+            progress.done = progress.cursor == 0
+            if progress.done:
+                writes.append(proxy.delete(self.checkpoint_key))
+            else:
+                writes.append(proxy.hset(self.checkpoint_key, mapping=self._dump_progress(progress)))
+            if all(write.queueable() for write in writes):
+                yield self._pipeline(writes)
+            else:
+                # the writes of the models with indexed or unique fields WATCH their keys first
+                yield Action.sequence(writes, runtime_mode=self.adaptor.runtime_mode, client=proxy)
+            if self.on_progress is not None:
+                self.on_progress(progress)
+            if progress.done:
+                return progress
+            # the SCAN, the reads and the writes with the checkpoint
+            delay = self._limiter.delay(1 + len(keys) + len(writes))
+            if delay:
+                yield Sleep(delay)
+
+    def _pipeline(self, actions: List[Action]) -> Action:
+        return Action.pipeline(
+            actions,
+            runtime_mode=self.adaptor.runtime_mode,
+            client=self.adaptor.proxy,
+            result_from_index=None
+        )
+
+    def _key_type(self) -> str:
+        if self.model_cls.__redis_type__ == 'hash' or self.model_cls.__storage_mode__ == 'fields':
+            return 'hash'
+        return 'string'
+
+    def _primary_keys(self, keys) -> List[str]:
+        # the match pattern of SCAN is a glob, keep only the primary keys of the model
+        return [parsed.key for parsed in self._resolver.parse_keys(keys) if parsed is not None]
+
+    def _read(self, key: str) -> Action:
+        if self._key_type() == 'hash':
+            return self.adaptor.proxy.hgetall(key)
+        return self.adaptor.proxy.get(key)
+
+    def _rewrite(self, key: str, value: Any) -> Optional[Action]:
+        """The write of the upgraded value of `key`, None when it is left untouched.
+
+        The write goes through the write path of the model: the indexes, the unique
+        claims and the query generation are kept up to date, the collection is not
+        touched (the key is already stored). The stored value has the old shape, the
+        index entries it replaces are read from its raw fields (see `stored_tokens`).
+        """
+        proxy = self.adaptor.proxy
+        model_cls = self.model_cls
+        if model_cls.__redis_type__ == 'hash':
+            instances = []
+            for raw in value.values():
+                instance = self._upgrade(self.decoder(raw))
+                if instance is not None:
+                    instances.append(instance)
+            if not instances:
+                return None
+            mapping = {instance.hash_field[1]: model_cls.__serializer__.serialize(instance) for instance in instances}
+            # the upkeep of a hash model is the same for every field of the key
+            return instances[0]._track_write(proxy.hset(key, mapping=mapping), added=True, with_collection=False)
+        if model_cls.__storage_mode__ == 'fields':
+            data = {_decode(name): self.decoder(raw) for name, raw in value.items()}
+            instance = self._upgrade(data)
+            if instance is None:
+                return None
+            mapping = dump_fields(instance)
+            writes = []
+            removed = [name for name in data if name not in mapping]
+            if removed:
+                writes.append(proxy.hdel(key, *removed))
+            writes.append(proxy.hset(key, mapping=mapping))
+            action = Action.transaction(
+                writes, runtime_mode=self.adaptor.runtime_mode, client=proxy, result_from_index=-1
+            )
+            return instance._track_write(action, added=True, with_collection=False)
+        instance = self._upgrade(self.decoder(value))
+        if instance is None:
+            return None
+        driver = model_cls.get_driver()
+        action = driver.commit(key, model_cls.__serializer__.serialize(instance), keep_ttl=True)
+        return instance._track_write(action, added=True, with_collection=False)
+
+    def _upgrade(self, data: Dict[str, Any]) -> Optional['BaseRedisModel']:
+        result = self.upgrade(data)
+        if result is None or isinstance(result, self.model_cls):
+            return result
+        return self.model_cls.model_validate(result)
+
+    def _model_name(self) -> str:
+        return getattr(self.model_cls, '__schema__', None) or self.model_cls.__name__
+
+    @staticmethod
+    def _dump_progress(progress: MigrationProgress) -> Dict[str, int]:
+        return {name: int(value) for name, value in asdict(progress).items()}
+
+    @staticmethod
+    def _load_progress(mapping) -> Optional[MigrationProgress]:
+        if not mapping:
+            return None
+        data = {_decode(name): int(value) for name, value in mapping.items()}
+        data['done'] = bool(data.get('done'))
+        return MigrationProgress(**data)
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
@@ -0,0 +1,306 @@
+"""Planner of the `Query` conditions over the indexes of a model.
+
+The planner lists the indexes able to answer the conditions (the equality sets,
+the range sorted sets, the prefix sorted sets, the sorted set of the ordering
+field), reads their cardinalities in one pipeline (SCARD, ZCOUNT over the range
+of the condition, ZLEXCOUNT over the prefix, ZCARD) and picks the cheapest way
+to get the matching pks:
+
+- `unique`: one GET of the claim key of a unique value.
+- `empty`: one of the conditions matches nothing (or two equalities of one field
+  ask for different values), nothing else is read.
+- `index`: one index answers alone (or the server is a cluster, the smallest
+  index is read and the other conditions are checked on the instances).
+- `intersect`: the indexes are intersected on the server, smallest first, into
+  a temporary key which lives a few seconds (SINTERSTORE, or ZINTERSTORE
+  scored by the sorted set of the ordering or range field, the ranges of the
+  other sorted sets being cut with ZRANGESTORE). Only the final page of pks is
+  transferred.
+  A prefix index is only read alone, when it is the smallest index (its
+  members are not pks, they can't be intersected), else its `startswith`
+  condition is checked on the instances.
+- `scan`: no index helps, the primary keys are scanned.
+
+    print(session.query(User).filter_by(city='paris', age__gte=30).explain())
+"""
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+from ..models.indexes import RangeIndex, model_indexes, model_prefix_indexes, model_range_indexes
+from ..models.unique import model_unique_indexes
+from ..utils.action import Action
+
+if TYPE_CHECKING:
+    from .query import Query, Condition
+
+
+@dataclass
+class IndexSource:
+    """One index key able to answer some conditions."""
+    # 'set', 'zset' or 'lex'
+    kind: str
+    field: str
+    key: str
+    # ZRANGEBYSCORE bounds of a sorted set, ZRANGEBYLEX bounds of a prefix index
+    min: Any = '-inf'
+    max: Any = '+inf'
+    # False for the sorted set only used to order the results
+    filtering: bool = True
+    cardinality: Optional[int] = None
+    index: Optional[Any] = field(default=None, repr=False)
+    # the equality value of a set, the prefix of a prefix index
+    value: Any = field(default=None, repr=False)
+
+    def describe(self) -> str:
+        bounds = f" [{self.min}, {self.max}]" if self.kind in ('zset', 'lex') else ''
+        role = '' if self.filtering else ' (order)'
+        return f"{self.kind} {self.key}{bounds} card={self.cardinality}{role}"
+
+
+@dataclass
+class QueryPlan:
+    # 'unique', 'empty', 'index', 'intersect' or 'scan'
+    strategy: str
+    # the indexes considered, the smallest first
+    sources: List[IndexSource] = field(default_factory=list)
+    # the sources the read pks come from
+    inputs: List[IndexSource] = field(default_factory=list)
+    # the key the pks are paged from, the temporary key of an intersection
+    key: Optional[str] = None
+    # 'set', 'zset' or 'lex', the type of `key`
+    kind: Optional[str] = None
+    min: Any = '-inf'
+    max: Any = '+inf'
+    # the field scoring the sorted set `key`
+    score_field: Optional[str] = None
+    descending: bool = False
+    # the pks come in the requested order
+    ordered: bool = False
+    # the offset and the limit are applied on the server
+    pushdown: bool = False
+    temp_key: Optional[str] = None
+    # the claim keys of the `unique` strategy
+    unique_keys: List[str] = field(default_factory=list)
+    # the fields of the conditions only checked on the instances
+    residual: List[str] = field(default_factory=list)
+    # the commands building the temporary key
+    store: Optional[Action] = field(default=None, repr=False)
+
+    def describe(self) -> str:
+        lines = [f"strategy: {self.strategy}"]
+        lines.extend(f"  claim {key}" for key in self.unique_keys)
+        lines.extend(f"  {source.describe()}" for source in self.sources)
+        if self.key is not None:
+            lines.append(f"read: {self.kind} {self.key}" + (' (temporary)' if self.temp_key else ''))
+            lines.append(f"ordered by the index: {self.ordered}, paged on the server: {self.pushdown}")
+        if self.residual:
+            lines.append(f"checked on the instances: {', '.join(self.residual)}")
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.describe()
+
+
+def plan_steps(query: 'Query', with_order: bool = True):
+    """Steps building the `QueryPlan` of `query`, they read the cardinalities of the indexes.
+
+    :param with_order: False to plan the conditions only, e.g. for a count.
+    """
+    conditions = query._conditions
+    order = query._order if with_order else []
+    proxy = query.app.adaptor.proxy
+    if _conflicting(conditions):
+        # two equalities of one field ask for different values
+        return QueryPlan('empty')
+    unique_keys = _unique_keys(query)
+    if unique_keys:
+        return QueryPlan('unique', unique_keys=unique_keys, residual=_fields(conditions))
+    sources = _sources(query, order)
+    if not sources:
+        return QueryPlan('scan', residual=_fields(conditions))
+    counts = yield Action.pipeline(
+        [_cardinality(proxy, source) for source in sources],
+        runtime_mode=query.app.runtime_mode,
+        client=proxy,
+        result_from_index=None
+    )
+    for source, count in zip(sources, counts):
+        source.cardinality = count
+    filtering = sorted((s for s in sources if s.filtering), key=lambda s: s.cardinality)
+    sources = filtering + [s for s in sources if not s.filtering]
+    if any(source.cardinality == 0 for source in filtering):
+        return QueryPlan('empty', sources=sources)
+    if filtering and filtering[0].kind == 'lex':
+        # the smallest index is a prefix index, it is read alone
+        return _finish(QueryPlan(
+            'index', sources=sources, key=filtering[0].key, kind='lex', min=filtering[0].min, max=filtering[0].max
+        ), [filtering[0]], conditions, order)
+    # the members of a prefix index are no pks, its condition is checked on the instances
+    filtering = [s for s in filtering if s.kind != 'lex']
+    sources = [s for s in sources if s.kind != 'lex']
+    order_field = order[0][0] if len(order) == 1 else None
+    order_source = next((s for s in sources if s.kind == 'zset' and s.field == order_field), None)
+    alone = order_source is None or any(order_source is s for s in filtering)
+    if query.app.adaptor.is_cluster or len(filtering) <= 1 and alone:
+        # one index alone, the other conditions are checked on the instances
+        driver = (filtering or sources)[0]
+        covered = [driver]
+        plan = QueryPlan('index', sources=sources, key=driver.key, kind=driver.kind, min=driver.min, max=driver.max)
+        plan.score_field = driver.field if driver.kind == 'zset' else None
+    else:
+        covered = list(sources)
+        plan = _intersection(query, sources, order_source)
+    return _finish(plan, covered, conditions, order)
+
+
+def _finish(plan: QueryPlan, covered: List[IndexSource], conditions: List['Condition'],
+            order: List[Tuple[str, bool]]) -> QueryPlan:
+    order_field = order[0][0] if len(order) == 1 else None
+    plan.inputs = covered
+    plan.descending = bool(order) and order[0][1]
+    plan.ordered = not order or (order_field is not None and order_field == plan.score_field)
+    plan.residual = [
+        c.field for c in conditions
+        if not any(_covers(source, c) for source in covered)
+    ]
+    plan.pushdown = plan.ordered and not plan.residual
+    return plan
+
+
+def _intersection(query: 'Query', sources: List[IndexSource], order_source: Optional[IndexSource]) -> QueryPlan:
+    """Intersect every source on the server into a temporary key, the sources come smallest first."""
+    model_cls = query.model_cls
+    proxy = query.app.adaptor.proxy
+    ttl = query.temp_ttl
+    temp_key = _temp_key(model_cls)
+    zsets = [s for s in sources if s.kind == 'zset']
+    if not zsets:
+        store = [proxy.sinterstore(temp_key, [s.key for s in sources]), proxy.expire(temp_key, ttl)]
+        plan = QueryPlan('intersect', key=temp_key, kind='set')
+    else:
+        scored = order_source or zsets[0]
+        weights, cuts, store = {}, [], []
+        for source in sources:
+            if source is scored:
+                weights[source.key] = 1
+            elif source.kind == 'zset' and source.filtering:
+                # only the members in the range of the condition take part
+                cut = _temp_key(model_cls)
+                store.append(proxy.zrangestore(cut, source.key, source.min, source.max, byscore=True))
+                cuts.append(cut)
+                weights[cut] = 0
+            else:
+                weights[source.key] = 0
+        store.append(proxy.zinterstore(temp_key, weights, aggregate='SUM'))
+        if cuts:
+            store.append(proxy.unlink(*cuts))
+        store.append(proxy.expire(temp_key, ttl))
+        plan = QueryPlan('intersect', key=temp_key, kind='zset', min=scored.min, max=scored.max)
+        plan.score_field = scored.field
+    plan.sources = sources
+    plan.temp_key = temp_key
+    plan.store = Action.transaction(
+        store,
+        runtime_mode=query.app.runtime_mode,
+        client=proxy,
+        result_from_index=None
+    )
+    return plan
+
+
+def _unique_keys(query: 'Query') -> List[str]:
+    equals = query._equals()
+    keys = []
+    for index in model_unique_indexes(query.model_cls):
+        token = index.token(equals.get(index.field))
+        if token is not None:
+            keys.append(index.key(query.model_cls, token))
+    return keys
+
+
+def _sources(query: 'Query', order: List[Tuple[str, bool]]) -> List[IndexSource]:
+    model_cls = query.model_cls
+    equals = query._equals()
+    sources = []
+    for index in model_indexes(model_cls):
+        token = index.token(equals.get(index.field))
+        if token is not None:
+            sources.append(IndexSource('set', index.field, index.key(model_cls, token), value=equals[index.field]))
+    conditions = [c for c in query._conditions if c.value is not None and c.op != 'startswith']
+    order_field = order[0][0] if len(order) == 1 else None
+    for index in model_range_indexes(model_cls):
+        field_conditions = [c for c in conditions if c.field == index.field]
+        if field_conditions:
+            min_arg, max_arg = score_range(index, field_conditions)
+            sources.append(IndexSource('zset', index.field, index.key(model_cls), min_arg, max_arg, index=index))
+        elif index.field == order_field:
+            sources.append(IndexSource('zset', index.field, index.key(model_cls), filtering=False, index=index))
+    for index in model_prefix_indexes(model_cls):
+        prefixes = [c.value for c in query._conditions if c.field == index.field and c.op == 'startswith']
+        if prefixes:
+            # the longest prefix is the most selective one
+            prefix = max(prefixes, key=len)
+            min_arg, max_arg = index.bounds(prefix)
+            sources.append(IndexSource('lex', index.field, index.key(model_cls), min_arg, max_arg, index=index,
+                                       value=prefix))
+    return sources
+
+
+def score_range(index: RangeIndex, conditions: List['Condition']) -> Tuple[str, str]:
+    """The (min, max) arguments of ZRANGEBYSCORE for the conditions on the field of `index`."""
+    # (score, exclusive) and (score, inclusive), so max() and min() keep the tightest bounds
+    low, high = None, None
+    for condition in conditions:
+        lower, upper = condition.bounds()
+        if lower is not None:
+            bound = (index.score(lower[0]), lower[1])
+            low = bound if low is None else max(low, bound)
+        if upper is not None:
+            bound = (index.score(upper[0]), not upper[1])
+            high = bound if high is None else min(high, bound)
+    min_arg = '-inf' if low is None else f"{'(' if low[1] else ''}{low[0]!r}"
+    max_arg = '+inf' if high is None else f"{'' if high[1] else '('}{high[0]!r}"
+    return min_arg, max_arg
+
+
+def _cardinality(proxy, source: IndexSource) -> Action:
+    if source.kind == 'set':
+        return proxy.scard(source.key)
+    if source.kind == 'lex':
+        return proxy.zlexcount(source.key, source.min, source.max)
+    if source.filtering:
+        return proxy.zcount(source.key, source.min, source.max)
+    return proxy.zcard(source.key)
+
+
+def _covers(source: IndexSource, condition: 'Condition') -> bool:
+    if source.field != condition.field or not source.filtering:
+        return False
+    if source.kind == 'set':
+        return condition.op == 'eq' and condition.value == source.value
+    if source.kind == 'lex':
+        return condition.op == 'startswith' and condition.value == source.value
+    return condition.value is not None and condition.op != 'startswith'
+
+
+def _conflicting(conditions: List['Condition']) -> bool:
+    equals = {}
+    for condition in conditions:
+        if condition.op == 'eq' and equals.setdefault(condition.field, condition.value) != condition.value:
+            return True
+    return False
+
+
+def _fields(conditions: List['Condition']) -> List[str]:
+    return list(dict.fromkeys(c.field for c in conditions))
+
+
+def _temp_key(model_cls) -> str:
+    return model_cls.__key_builder__.index_key(
+        model=model_cls,
+        shard_tags=list(model_cls.__model_meta__.shard_tags),
+        index_fields=['__tmp__'],
+        index_values=[uuid.uuid4().hex],
+        pk=None,
+        index_fields_info=[]
+    )
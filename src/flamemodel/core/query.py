@@ -1,49 +1,987 @@
-from typing import TYPE_CHECKING, Type, TypeVar, Generic, Optional, List
+"""Queries over the instances of a string model.
+
+    users = session.query(User).filter_by(city='Paris', active=True).all()
+    products = session.query(Product).filter_by(price__between=(10, 20)).order_by('-price').limit(10).all()
+
+A condition is `field=value` or `field__<operator>=value` with the operators
+`gt`, `gte`, `lt`, `lte`, `between` (a pair of inclusive bounds) and
+`startswith` (a string prefix).
+
+A condition on a unique field (`fields(unique=True)`) is resolved with one GET
+of its claim key and one read of the owner. The conditions on the indexed fields
+(`fields(index=True)`) are resolved from the index sets, the conditions on a
+range indexed field (`fields(range_index=True)`) and the ordering by it with
+ZRANGEBYSCORE, the pks then come already ordered and only the requested page
+is read. The `startswith` conditions on a prefix indexed field
+(`fields(prefix_index=True)`) are resolved with ZRANGEBYLEX. Several indexes
+are intersected on the server, see `core.planner` (and `Query.explain()`).
+The matching instances are read in one pipelined batch. Without any indexed
+condition the primary keys of the model are scanned.
+The fetched instances are checked against every condition, so the conditions on
+the fields which are not indexed are applied here, and the stale index entries
+met on the way are removed.
+
+The pages of an order by a range indexed field are also walked by keyset, the
+cursor of a page holds the (score, pk) of its last instance:
+
+    page = session.query(Product).order_by('-price').limit(20).after(token).page()
+    page.items, page.cursor
+
+`count()` reads the cardinalities of the indexes rather than the instances.
+
+The results of `all()`, `first()` and `page()` can be cached, see `core.query_cache`.
+
+With `server_filter=True` the conditions the indexes don't answer are applied
+on the server by a Lua script, see `core.server_filter`.
+
+`iter(chunk_size)` streams the matching instances chunk by chunk in bounded memory.
+
+`update(**changes)` and `delete()` apply to every matching instance in chunks of
+pipelined writes (one transaction per chunk, the indexes kept up to date, UNLINK
+for the deletes) and return the number of affected instances.
+"""
+import asyncio
+import base64
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Type, TypeVar, Generic, Optional, List, Set, Tuple
 from ..models import BaseRedisModel
-from ..exceptions import FieldNotFoundError
+from ..models.collection import collection_count, collection_key
+from ..models.field_storage import field_adapter
+from ..models.indexes import RangeIndex, member_pk, model_prefix_indexes, model_range_indexes
+from ..models.scan import KeyScanner, read_page, unseen_keys
+from ..exceptions import FieldNotFoundError, InvalidCursorError, QueryCacheNotSupportedError, ScanNotSupportedError
+from ..utils.action import Action
+from ..utils.rate_limit import RateLimiter
+from ..utils.steps import Sleep, run_steps
+from . import server_filter as lua_filter
+from .planner import IndexSource, QueryPlan, plan_steps
 
 _T = TypeVar("_T", bound=BaseRedisModel)
 
 if TYPE_CHECKING:
     from ..main import FlameModel
+    from .query_cache import QueryCache
+
+_operators = ('gt', 'gte', 'lt', 'lte', 'between', 'startswith')
+
+
+@dataclass(frozen=True)
+class Condition:
+    field: str
+    # 'eq' or one of `_operators`
+    op: str
+    # validated like the field, a (low, high) pair for 'between', the str prefix of 'startswith'
+    value: Any
+    # 'startswith' ignores the case, the prefix is casefolded
+    casefold: bool = False
+
+    def test(self, instance: BaseRedisModel) -> bool:
+        actual = getattr(instance, self.field, None)
+        if self.op == 'eq':
+            return actual == self.value
+        if actual is None:
+            return False
+        if self.op == 'startswith':
+            text = str(actual)
+            return (text.casefold() if self.casefold else text).startswith(self.value)
+        if self.op == 'gt':
+            return actual > self.value
+        if self.op == 'gte':
+            return actual >= self.value
+        if self.op == 'lt':
+            return actual < self.value
+        if self.op == 'lte':
+            return actual <= self.value
+        low, high = self.value
+        return low <= actual <= high
+
+    def bounds(self) -> Tuple[Optional[Tuple[Any, bool]], Optional[Tuple[Any, bool]]]:
+        """The (value, exclusive) lower and upper bounds of the condition, None when unbounded."""
+        if self.op == 'between':
+            return (self.value[0], False), (self.value[1], False)
+        return {
+            'eq': ((self.value, False), (self.value, False)),
+            'gt': ((self.value, True), None),
+            'gte': ((self.value, False), None),
+            'lt': (None, (self.value, True)),
+            'lte': (None, (self.value, False)),
+        }[self.op]
+
+
+@dataclass
+class Page(Generic[_T]):
+    items: List[_T]
+    # the token of the next page (`Query.after`), None after the last page
+    cursor: Optional[str]
 
 
 class Query(Generic[_T]):
     def __init__(
             self,
             app: 'FlameModel',
-            model_cls: Type[_T]
+            model_cls: Type[_T],
+            scan_count: int = 1000,
+            batch_size: int = 100,
+            temp_ttl: int = 10,
+            cache: Optional['QueryCache'] = None,
+            server_filter: bool = False
     ):
         self.app = app
         self.model_cls = model_cls
-        self.model_fields_set = set([
-            i for i in self.model_cls.__model_meta__.fields
-        ])
-        self._query_param = {}
+        self.model_fields_set = set(self.model_cls.model_fields)
+        self.scan_count = scan_count
+        self.batch_size = batch_size
+        # seconds to live of the temporary keys of the intersections
+        self.temp_ttl = temp_ttl
+        if cache is not None and not model_cls.__query_cache__:
+            raise QueryCacheNotSupportedError(
+                f"The queries of the model {model_cls.__name__} can't be cached, set `__query_cache__ = True`."
+            )
+        self.cache = cache
+        # the residual conditions are applied by a Lua script, when it can
+        self.server_filter = server_filter
+        self._conditions: List[Condition] = []
+        # (field name, descending)
+        self._order: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        # keyset pagination: the (field, descending, score, pk) of the last instance read
+        self._keyset = False
+        self._after: Optional[Tuple[str, bool, float, str]] = None
 
     def filter_by(self, **kwargs) -> 'Query[Type[_T]]':
-        for k in kwargs:
-            if k not in self.model_fields_set:
-                raise FieldNotFoundError(
-                    f"Can't create a query condition for the model {self.model_cls.__name__} "
-                    f"because the field {k} doesn't exist.",
-                    model_cls=self.model_cls,
-                    field_name=k
-                )
-        self._query_param.update(kwargs)
+        for k, v in kwargs.items():
+            name, _, op = k.rpartition('__')
+            if op not in _operators or not name:
+                name, op = k, 'eq'
+            self._check_field(name)
+            adapter = field_adapter(self.model_cls, name)
+            if op == 'startswith':
+                # the prefix index of the field decides whether the case is ignored
+                casefold = any(i.field == name and i.casefold for i in model_prefix_indexes(self.model_cls))
+                self._conditions.append(Condition(name, op, str(v).casefold() if casefold else str(v), casefold))
+                continue
+            if op == 'between':
+                low, high = v
+                value = (adapter.validate_python(low), adapter.validate_python(high))
+            else:
+                value = adapter.validate_python(v)
+            self._conditions.append(Condition(name, op, value))
+        return self  # type: ignore
+
+    def order_by(self, *names: str) -> 'Query[Type[_T]]':
+        """Order the results by these fields, '-field' for the descending order."""
+        for name in names:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            self._check_field(name)
+            self._order.append((name, descending))
+        return self  # type: ignore
+
+    def limit(self, count: Optional[int]) -> 'Query[Type[_T]]':
+        self._limit = count
         return self  # type: ignore
 
+    def offset(self, count: int) -> 'Query[Type[_T]]':
+        self._offset = count
+        return self  # type: ignore
+
+    def after(self, cursor: Optional[str]) -> 'Query[Type[_T]]':
+        """Resume after the instance of `cursor` (`Page.cursor`), None for the first page.
+
+        The keyset pagination needs `order_by` on one range indexed field, the
+        page starts at the (score, pk) of the cursor so a deep page costs as much
+        as the first one. The instances without a value for the field are not paged.
+        """
+        self._keyset = True
+        self._after = None if cursor is None else _decode_cursor(cursor)
+        return self  # type: ignore
+
+    def page(self) -> Page[_T]:
+        """The instances of the next page and the cursor of the page after it, a coroutine in async mode."""
+        self._keyset = True
+        self._keyset_index()
+        return run_steps(self._page_steps(), self.app.runtime_mode)
+
+    def cursor(self, instance: _T) -> str:
+        """The opaque token resuming the keyset pagination after `instance`."""
+        index, descending = self._keyset_index()
+        score = index.score(getattr(instance, index.field, None))
+        if score is None:
+            raise InvalidCursorError(
+                f"The {self.model_cls.__name__} has no value for {index.field}, it can't be a cursor."
+            )
+        pk = str(instance.__model_meta__.accessors.pk_getter(instance))
+        token = json.dumps([index.field, descending, score, pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+
+    def iter(self, chunk_size: int = 500):
+        """Iterate over the matching instances page by page, an async iterator in async mode.
+
+        The pks are walked chunk by chunk (SCAN, SSCAN of the index set, keyset
+        windows of the sorted set) and the instances of a chunk are read in one
+        round trip, the next chunk is read while the current one is consumed.
+        Without `order_by` the order is unspecified. An order the indexes can't
+        give, a limit or an offset need every result, they are read first.
+        """
+        walker = _Walker(self, chunk_size)
+        if self.app.runtime_mode == 'sync':
+            return _iter_sync(walker)
+        return _iter_async(walker)
+
     def first(self) -> Optional[_T]:
-        return self.model_cls.get(**self._query_param).execute()
+        return run_steps(self._first_steps(), self.app.runtime_mode)
 
     def all(self) -> List[_T]:
-        pass
+        """Every matching instance, a coroutine in async mode."""
+        return run_steps(self._results_steps(self._limit), self.app.runtime_mode)
 
-    def update(self, **kwargs):
-        pass
+    def count(self, approximate: bool = False, sample_size: int = 200, verify: bool = False) -> int:
+        """The number of matching instances, a coroutine in async mode.
 
-    def delete(self):
-        pass
+        The order, the limit and the offset are ignored. The count is read from
+        the indexes when they answer every condition (SCARD, ZCOUNT, SINTERCARD,
+        the collection without conditions), the instances are read only to check
+        the other conditions.
+
+        The indexes are exact while every write goes through the models, the
+        entries left by other clients or by expired instances are counted until
+        a query repairs them: the count read from the indexes may then be more
+        than `len(all())`.
+
+        :param approximate: estimate the counts which need to read the instances
+            from a sample of `sample_size` pks of the smallest index.
+        :param verify: read and check every candidate instance (the stale entries
+            are repaired), the count is then the one of `all()`, `approximate` is ignored.
+        """
+        return run_steps(self._count_steps(approximate and not verify, sample_size, verify), self.app.runtime_mode)
+
+    def explain(self) -> QueryPlan:
+        """The plan of the query (`print` it), a coroutine in async mode.
+
+        Only the cardinalities of the indexes are read.
+        """
+        return run_steps(plan_steps(self), self.app.runtime_mode)
+
+    def update(
+            self,
+            values: Optional[Dict[str, Any]] = None,
+            *,
+            batch_size: Optional[int] = None,
+            max_ops_per_second: Optional[float] = None,
+            **changes: Any
+    ) -> int:
+        """Apply `changes` (and `values`) to every matching instance, return how many were updated.
+
+        The instances are read and written back chunk by chunk, every chunk in one
+        transaction which keeps the indexes up to date (a save checking unique
+        fields runs alone). A coroutine in async mode.
+
+        :param values: the changes, for the fields named like the keyword parameters.
+        :param batch_size: the number of instances of one chunk, `self.batch_size` by default.
+        :param max_ops_per_second: ceiling of the redis commands per second, None for no limit.
+        """
+        changes = {**(values or {}), **changes}
+        for name in changes:
+            self._check_field(name)
+
+        def _write(instance: BaseRedisModel) -> Action:
+            return instance.update(**changes)
+
+        steps = self._bulk_steps(_write, lambda results: len(results), batch_size, max_ops_per_second)
+        return run_steps(steps, self.app.runtime_mode)
+
+    def delete(self, batch_size: Optional[int] = None, max_ops_per_second: Optional[float] = None) -> int:
+        """UNLINK every matching instance (and its index entries), return how many were deleted.
+
+        Chunked like `update`, a coroutine in async mode.
+        """
+        def _write(instance: BaseRedisModel) -> Action:
+            return instance.delete(unlink=True)
+
+        steps = self._bulk_steps(_write, sum, batch_size, max_ops_per_second)
+        return run_steps(steps, self.app.runtime_mode)
 
     def remove(self):
         pass
+
+    # ===== Private Helper Methods =====
+
+    def _check_field(self, name: str):
+        if name not in self.model_fields_set:
+            raise FieldNotFoundError(
+                f"Can't create a query condition for the model {self.model_cls.__name__} "
+                f"because the field {name} doesn't exist.",
+                model_cls=self.model_cls,
+                field_name=name
+            )
+
+    def _equals(self) -> Dict[str, Any]:
+        return {c.field: c.value for c in self._conditions if c.op == 'eq'}
+
+    def _matches(self, instance: BaseRedisModel, conditions: Optional[List[Condition]] = None) -> bool:
+        return all(c.test(instance) for c in (self._conditions if conditions is None else conditions))
+
+    def _keyset_index(self) -> Tuple[RangeIndex, bool]:
+        """The range index and the direction of the keyset pagination."""
+        field_name = self._order[0][0] if len(self._order) == 1 else None
+        index = next((i for i in model_range_indexes(self.model_cls) if i.field == field_name), None)
+        if index is None:
+            raise InvalidCursorError(
+                f"The keyset pagination of {self.model_cls.__name__} needs the order of one range indexed field."
+            )
+        descending = self._order[0][1]
+        if self._after is not None and self._after[:2] != (field_name, descending):
+            raise InvalidCursorError(
+                f"The cursor was made for the order by {self._after[0]} (descending: {self._after[1]})."
+            )
+        return index, descending
+
+    def _past_cursor(self, score: float, pk: str) -> bool:
+        """Whether the (score, pk) comes after the cursor, in the order of the sorted set."""
+        if self._after is None:
+            return True
+        _, descending, after_score, after_pk = self._after
+        return _is_past((after_score, after_pk), descending, score, pk)
+
+    def _sorted(self, instances: List[_T]) -> List[_T]:
+        if self._keyset:
+            # the order of the sorted set: by score then pk, the instances without score are not paged
+            index, descending = self._keyset_index()
+            scored = []
+            for instance in instances:
+                score = index.score(getattr(instance, index.field, None))
+                pk = str(instance.__model_meta__.accessors.pk_getter(instance))
+                if score is not None and self._past_cursor(score, pk):
+                    scored.append(((score, pk), instance))
+            scored.sort(key=lambda item: item[0], reverse=descending)
+            return [instance for _, instance in scored]
+        for name, descending in reversed(self._order):
+            instances.sort(
+                key=lambda i: (getattr(i, name, None) is None, getattr(i, name, None)),
+                reverse=descending
+            )
+        return instances
+
+    def _page(self, instances: List[_T], limit: Optional[int]) -> List[_T]:
+        end = None if limit is None else self._offset + limit
+        return instances[self._offset:end]
+
+    def _first_steps(self):
+        found = yield from self._results_steps(1 if self._limit is None else min(self._limit, 1))
+        return found[0] if found else None
+
+    def _page_steps(self):
+        if self._limit is None:
+            return Page((yield from self._results_steps(None)), None)
+        # one more instance tells whether there is a next page, a short read is no proof of the end
+        found = yield from self._results_steps(self._limit + 1)
+        if len(found) <= self._limit:
+            return Page(found, None)
+        found = found[:self._limit]
+        return Page(found, self.cursor(found[-1]))
+
+    def _results_steps(self, limit: Optional[int]):
+        if self.cache is None:
+            return (yield from self._all_steps(limit))
+        return (yield from self.cache.results_steps(self, limit, lambda: self._all_steps(limit)))
+
+    def _all_steps(self, limit: Optional[int]):
+        if self._keyset:
+            self._keyset_index()
+        plan = yield from plan_steps(self)
+        if plan.strategy == 'empty':
+            return []
+        if plan.strategy == 'unique':
+            owners = yield self._pipeline([self._proxy.get(key) for key in plan.unique_keys])
+            owners = {_decode(owner) for owner in owners}
+            if len(owners) != 1 or None in owners:
+                return []
+            instances = yield self._fetch([self.model_cls.primary_key(owners.pop())])
+            return self._page(self._sorted([i for i in instances if self._matches(i)]), limit)
+        if plan.strategy == 'scan':
+            found = yield from self._scan_steps()
+            return self._page(self._sorted(found), limit)
+        if plan.store is not None:
+            yield plan.store
+        found = (yield from self._server_filter_steps(plan, limit)) if self.server_filter else None
+        if found is None and plan.kind == 'set':
+            found = yield from self._set_steps(plan, limit)
+        elif found is None:
+            found = yield from self._zset_steps(plan, limit)
+        if plan.temp_key is not None:
+            yield self._proxy.unlink(plan.temp_key)
+        return found
+
+    def _set_steps(self, plan: QueryPlan, limit: Optional[int]):
+        if not plan.pushdown or limit is None:
+            members = yield self._proxy.smembers(plan.key)
+            pks = sorted(_decode(member) for member in members)
+            found = (yield from self._checked(plan, pks)) if pks else []
+            return self._page(self._sorted(found), limit)
+        # the page is cut on the server in the same order as above (by pk), the
+        # stale members dropped by the check are replaced by the next ones
+        found, start, window = [], self._offset, limit
+        while len(found) < limit:
+            members = yield self._proxy.sort(plan.key, start=start, num=window, alpha=True)
+            pks = [_decode(member) for member in members]
+            if pks:
+                checked, removed = yield from self._checked_window(plan, pks)
+                found.extend(checked)
+            if len(members) < window:
+                break
+            # the removed members were before the next position
+            start += window - removed
+            window = max(limit - len(found), self.batch_size)
+        return found[:limit]
+
+    def _zset_steps(self, plan: QueryPlan, limit: Optional[int]):
+        keyset = plan.ordered and self._after is not None
+        # after a cursor the offset counts from the cursor, it is skipped here
+        pushdown = plan.pushdown and not keyset
+        if plan.ordered and limit is not None:
+            wanted = limit if pushdown else self._offset + limit
+            window = wanted if pushdown else max(self.batch_size, wanted)
+        else:
+            wanted, window = None, self.batch_size
+        start = self._offset if pushdown else 0
+        min_arg, max_arg = _keyset_range(plan, self._after[2] if keyset else None)
+        found = []
+        while window:
+            if plan.kind == 'lex':
+                read = self._proxy.zrangebylex(plan.key, plan.min, plan.max, start=start, num=window)
+            elif plan.descending:
+                read = self._proxy.zrevrangebyscore(
+                    plan.key, max_arg, min_arg, start=start, num=window, withscores=keyset
+                )
+            else:
+                read = self._proxy.zrangebyscore(
+                    plan.key, min_arg, max_arg, start=start, num=window, withscores=keyset
+                )
+            members = yield read
+            if keyset:
+                pks = [pk for pk, score in ((_decode(m), s) for m, s in members) if self._past_cursor(score, pk)]
+            else:
+                pks = _pks(plan, members)
+            removed = 0
+            if pks:
+                checked, removed = yield from self._checked_window(plan, pks, members if plan.kind == 'lex' else None)
+                found.extend(checked)
+            if len(members) < window or (wanted is not None and len(found) >= wanted):
+                break
+            # the removed members were before the next position
+            start += window - removed
+        if not plan.ordered:
+            return self._page(self._sorted(found), limit)
+        if pushdown:
+            return found if limit is None else found[:limit]
+        return self._page(found, limit)
+
+    def _server_filter_steps(self, plan: QueryPlan, limit: Optional[int]):
+        """The page read through the Lua filter, None when the script can't serve the query."""
+        compiled = lua_filter.predicates(self, plan) if plan.residual else None
+        if compiled is None:
+            return None
+        found = yield from lua_filter.filter_steps(self, plan, compiled, limit)
+        if found is None:
+            return None
+        # the conditions the script doesn't know are checked here
+        found = [instance for instance in found if self._matches(instance)]
+        if plan.kind == 'set':
+            # SSCAN order, sorted by pk first as in `_set_steps`
+            pk_getter = self.model_cls.__model_meta__.accessors.pk_getter
+            found.sort(key=lambda instance: str(pk_getter(instance)))
+        if plan.kind == 'set' or not plan.ordered:
+            return self._page(self._sorted(found), limit)
+        return self._page(found, limit)
+
+    def _checked(self, plan: QueryPlan, pks: List[str], members: Optional[List[Any]] = None):
+        """Read the instances of `pks`, the matching ones are returned.
+
+        The pks come from the indexes of the plan, the ones which don't match are
+        stale entries of these indexes and are removed (or scored again).
+
+        :param members: the prefix index members the pks were read from, if any.
+        """
+        found, _ = yield from self._checked_window(plan, pks, members)
+        return found
+
+    def _checked_window(self, plan: QueryPlan, pks: List[str], members: Optional[List[Any]] = None):
+        """`_checked`, with the number of the read members removed from (or scored
+        out of the range of) the key of the plan by the repairs."""
+        instances = yield self._fetch([self.model_cls.primary_key(pk) for pk in pks], keep_missing=True)
+        members = members or [None] * len(pks)
+        found, repairs, removed = [], [], 0
+        for pk, instance, member in zip(pks, instances, members):
+            # an old member of a prefix index may lead to an instance which still matches
+            stale = member is not None and _stale_member(plan.inputs[0], pk, instance, member)
+            if instance is not None and self._matches(instance) and not stale:
+                found.append(instance)
+                continue
+            for source in plan.inputs:
+                repair = self._repair(source, pk, instance, member)
+                if repair is not None:
+                    repairs.append(repair)
+                    removed += source.key == plan.key
+        if repairs:
+            yield self._pipeline(repairs)
+        return found, removed
+
+    def _repair(self, source: IndexSource, pk: str, instance: Optional[BaseRedisModel],
+                member: Any = None) -> Optional[Action]:
+        if source.kind == 'set':
+            if instance is None or getattr(instance, source.field, None) != source.value:
+                return self._proxy.srem(source.key, pk)
+            return None
+        if source.kind == 'lex':
+            return self._proxy.zrem(source.key, member) if _stale_member(source, pk, instance, member) else None
+        if instance is None:
+            return self._proxy.zrem(source.key, pk)
+        conditions = [c for c in self._conditions if c.field == source.field]
+        if not source.filtering or self._matches(instance, conditions):
+            return None
+        # scored with a value it doesn't have (anymore)
+        score = source.index.score(getattr(instance, source.field, None))
+        return self._proxy.zrem(source.key, pk) if score is None else self._proxy.zadd(source.key, {pk: score})
+
+    def _bulk_steps(
+            self,
+            write: Callable[[BaseRedisModel], Action],
+            affected: Callable[[List[Any]], int],
+            batch_size: Optional[int],
+            max_ops_per_second: Optional[float]
+    ):
+        """Run `write` over the matching instances chunk by chunk, return the affected count.
+
+        Without order and page the pks are streamed (SCAN pages, or the pks of the
+        plan read first, checked when their chunk is read), otherwise the page is
+        read first.
+        """
+        chunk_size = batch_size or self.batch_size
+        limiter = RateLimiter(max_ops_per_second)
+        count = 0
+        if self._order or self._limit is not None or self._offset:
+            instances = yield from self._all_steps(self._limit)
+            for start in range(0, len(instances), chunk_size):
+                count += yield from self._write_steps(instances[start:start + chunk_size], write, affected, limiter)
+            return count
+        plan = yield from plan_steps(self)
+        if plan.strategy == 'scan':
+            scanner = self._scanner()
+            seen = set()
+            for node in scanner.nodes():
+                cursor = 0
+                while True:
+                    cursor, keys = yield scanner.page(cursor, node)
+                    keys = unseen_keys(keys, seen)
+                    for start in range(0, len(keys), chunk_size):
+                        instances = yield self._fetch(keys[start:start + chunk_size])
+                        instances = [i for i in instances if self._matches(i)]
+                        count += yield from self._write_steps(instances, write, affected, limiter)
+                    if not cursor:
+                        break
+            return count
+        pks = yield from self._pk_steps(plan)
+        for start in range(0, len(pks), chunk_size):
+            instances = yield from self._checked(plan, pks[start:start + chunk_size])
+            count += yield from self._write_steps(instances, write, affected, limiter)
+        return count
+
+    def _pk_steps(self, plan: QueryPlan):
+        """Every pk the plan reads, in no particular order."""
+        if plan.strategy == 'empty':
+            return []
+        if plan.strategy == 'unique':
+            owners = yield self._pipeline([self._proxy.get(key) for key in plan.unique_keys])
+            owners = {_decode(owner) for owner in owners}
+            return [] if len(owners) != 1 or None in owners else list(owners)
+        if plan.store is not None:
+            yield plan.store
+        if plan.kind == 'set':
+            members = yield self._proxy.smembers(plan.key)
+        elif plan.kind == 'lex':
+            members = yield self._proxy.zrangebylex(plan.key, plan.min, plan.max)
+        else:
+            members = yield self._proxy.zrangebyscore(plan.key, plan.min, plan.max)
+        if plan.temp_key is not None:
+            yield self._proxy.unlink(plan.temp_key)
+        return sorted(_pks(plan, members))
+
+    def _write_steps(
+            self,
+            instances: List[BaseRedisModel],
+            write: Callable[[BaseRedisModel], Action],
+            affected: Callable[[List[Any]], int],
+            limiter: RateLimiter
+    ):
+        if not instances:
+            return 0
+        actions = [write(instance) for instance in instances]
+        if all(action.queueable() for action in actions):
+            chunk = Action.transaction(
+                actions,
+                runtime_mode=self.app.runtime_mode,
+                client=self._proxy,
+                result_from_index=None
+            )
+        else:
+            # e.g. the saves of indexed or unique fields, each of them is a transaction of its own
+            chunk = Action.sequence(actions, runtime_mode=self.app.runtime_mode, result_from_index=None)
+        results = yield chunk
+        # the reads and the writes of the chunk
+        delay = limiter.delay(2 * len(instances))
+        if delay:
+            yield Sleep(delay)
+        return affected(results)
+
+    def _count_steps(self, approximate: bool, sample_size: int, verify: bool = False):
+        proxy = self._proxy
+        if not verify and not self._conditions and self.model_cls.__collection__ is not None:
+            return (yield collection_count(self.model_cls))
+        plan = yield from plan_steps(self, with_order=False)
+        if plan.strategy == 'empty':
+            return 0
+        if not verify and not plan.residual and plan.strategy == 'index':
+            return plan.inputs[0].cardinality
+        if not verify and not plan.residual and plan.strategy == 'intersect':
+            if plan.kind == 'set':
+                return (yield proxy.sintercard(len(plan.sources), [source.key for source in plan.sources]))
+            yield plan.store
+            count = yield proxy.zcount(plan.key, plan.min, plan.max)
+            yield proxy.unlink(plan.temp_key)
+            return count
+        if approximate and plan.strategy != 'unique':
+            driver = plan.sources[0] if plan.sources else (yield from self._collection_source())
+            if driver is not None:
+                return (yield from self._estimate_steps(driver, sample_size))
+        if plan.strategy == 'scan':
+            return (yield from self._scan_count_steps())
+        pks = yield from self._pk_steps(plan)
+        count = 0
+        for start in range(0, len(pks), self.batch_size):
+            count += len((yield from self._checked(plan, pks[start:start + self.batch_size])))
+        return count
+
+    def _scan_count_steps(self):
+        scanner = self._scanner()
+        count = 0
+        seen = set()
+        for node in scanner.nodes():
+            cursor = 0
+            while True:
+                cursor, keys = yield scanner.page(cursor, node)
+                keys = unseen_keys(keys, seen)
+                if keys and self._conditions:
+                    instances = yield self._fetch(keys)
+                    count += sum(1 for i in instances if self._matches(i))
+                else:
+                    count += len(keys)
+                if not cursor:
+                    break
+        return count
+
+    def _collection_source(self) -> Optional[IndexSource]:
+        """The collection of the model as the index sampled by an estimate, if any."""
+        collection = self.model_cls.__collection__
+        if collection is None:
+            return None
+        source = IndexSource(collection, '', collection_key(self.model_cls))
+        source.cardinality = yield collection_count(self.model_cls)
+        return source
+
+    def _estimate_steps(self, driver: IndexSource, sample_size: int):
+        """Estimate the count from a random sample of the pks of `driver`, checked on their instances."""
+        proxy = self._proxy
+        total = driver.cardinality
+        if total <= sample_size:
+            members = yield (
+                proxy.smembers(driver.key) if driver.kind == 'set'
+                else proxy.zrangebylex(driver.key, driver.min, driver.max) if driver.kind == 'lex'
+                else proxy.zrangebyscore(driver.key, driver.min, driver.max)
+            )
+        elif driver.kind == 'set':
+            members = yield proxy.srandmember(driver.key, sample_size)
+        else:
+            # random ranks within the range, the range starts after the members below its minimum
+            if driver.kind == 'lex':
+                first = yield proxy.zlexcount(driver.key, '-', b'(' + driver.min[1:])
+            else:
+                first = 0 if driver.min == '-inf' else (yield proxy.zcount(driver.key, '-inf', _below(driver.min)))
+            ranks = sorted(random.sample(range(first, first + total), sample_size))
+            pages = yield self._pipeline([proxy.zrange(driver.key, rank, rank) for rank in ranks])
+            members = [member for page in pages for member in page]
+        pks = _pks(driver, members)
+        if not pks:
+            return 0
+        instances = yield self._fetch([self.model_cls.primary_key(pk) for pk in pks], keep_missing=True)
+        matched = sum(1 for i in instances if i is not None and self._matches(i))
+        if total <= sample_size:
+            return matched
+        return round(total * matched / len(pks))
+
+    def _scanner(self) -> KeyScanner:
+        if self.model_cls.__redis_type__ not in ('string', 'hash'):
+            raise ScanNotSupportedError(
+                f"The model {self.model_cls.__name__} is a {self.model_cls.__redis_type__} model, "
+                "only the instances of string and hash models can be queried."
+            )
+        return KeyScanner(self.model_cls, count=self.scan_count)
+
+    def _scan_steps(self):
+        scanner = self._scanner()
+        found = []
+        seen = set()
+        for node in scanner.nodes():
+            cursor = 0
+            while True:
+                cursor, keys = yield scanner.page(cursor, node)
+                keys = unseen_keys(keys, seen)
+                if keys:
+                    instances = yield self._fetch(keys)
+                    found.extend(i for i in instances if self._matches(i))
+                if not cursor:
+                    break
+        return found
+
+    @property
+    def _proxy(self):
+        return self.app.adaptor.proxy
+
+    def _fetch(self, keys: List[str], keep_missing: bool = False) -> Action:
+        return read_page(self.model_cls, keys, self.app.adaptor.is_cluster, keep_missing=keep_missing)
+
+    def _pipeline(self, actions: List[Action]) -> Action:
+        return Action.pipeline(
+            actions,
+            runtime_mode=self.app.runtime_mode,
+            client=self._proxy,
+            result_from_index=None
+        )
+
+
+class _Walker:
+    """The chunks of instances of `Query.iter`, every `next_steps` reads the next one."""
+
+    def __init__(self, query: Query, chunk_size: int):
+        self.query = query
+        self.chunk_size = chunk_size
+        self.plan: Optional[QueryPlan] = None
+        # 'loaded', 'scan', 'set', 'zset' or 'lex'
+        self.mode: Optional[str] = None
+        self.loaded: List[BaseRedisModel] = []
+        self.scanner: Optional[KeyScanner] = None
+        self.nodes: List[Any] = []
+        self.cursor = 0
+        # the keys (or pks) already returned by SCAN (or SSCAN), they may come back
+        self.seen: Set[str] = set()
+        # the (score, pk) of the last member read from the sorted set
+        self.after: Optional[Tuple[float, str]] = None
+        # the ZRANGEBYLEX minimum after the last member read from the prefix index
+        self.lex_min: Optional[bytes] = None
+        self.done = False
+
+    def next_steps(self):
+        """Steps reading the next chunk, None after the last one."""
+        if self.done:
+            return None
+        if self.plan is None:
+            yield from self._start_steps()
+        if self.mode == 'loaded':
+            chunk, self.loaded = self.loaded[:self.chunk_size], self.loaded[self.chunk_size:]
+            self.done = not self.loaded
+            return chunk
+        if self.mode == 'scan':
+            return (yield from self._scan_steps())
+        if self.mode == 'set':
+            return (yield from self._set_steps())
+        if self.mode == 'lex':
+            return (yield from self._lex_steps())
+        return (yield from self._zset_steps())
+
+    def _start_steps(self):
+        query = self.query
+        self.plan = plan = yield from plan_steps(query)
+        if plan.strategy == 'empty':
+            self.mode = 'loaded'
+        elif (plan.strategy == 'unique' or query._limit is not None or query._offset
+              or (query._order and not plan.ordered)):
+            self.mode = 'loaded'
+            self.loaded = yield from query._all_steps(query._limit)
+        elif plan.strategy == 'scan':
+            self.mode = 'scan'
+            self.scanner = query._scanner()
+            self.scanner.count = self.chunk_size
+            self.nodes = self.scanner.nodes()
+        else:
+            if plan.store is not None:
+                yield plan.store
+            self.mode = plan.kind
+            if query._after is not None:
+                self.after = query._after[2:]
+
+    def _scan_steps(self):
+        query = self.query
+        self.cursor, keys = yield self.scanner.page(self.cursor, self.nodes[0])
+        keys = unseen_keys(keys, self.seen)
+        found = []
+        if keys:
+            instances = yield query._fetch(keys)
+            found = [i for i in instances if query._matches(i)]
+        if not self.cursor:
+            self.nodes.pop(0)
+            self.done = not self.nodes
+        return found
+
+    def _set_steps(self):
+        cursor, members = yield self._read(self.query._proxy.sscan(self.plan.key, self.cursor, count=self.chunk_size))
+        self.cursor = int(cursor)
+        pks = unseen_keys([_decode(member) for member in members], self.seen)
+        found = (yield from self.query._checked(self.plan, pks)) if pks else []
+        if not self.cursor:
+            yield from self._finish_steps()
+        return found
+
+    def _zset_steps(self):
+        plan, proxy, window = self.plan, self.query._proxy, self.chunk_size
+        min_arg, max_arg = _keyset_range(plan, self.after[0] if self.after else None)
+        start = 0
+        while True:
+            if plan.descending:
+                read = proxy.zrevrangebyscore(plan.key, max_arg, min_arg, start=start, num=window, withscores=True)
+            else:
+                read = proxy.zrangebyscore(plan.key, min_arg, max_arg, start=start, num=window, withscores=True)
+            members = yield self._read(read)
+            pairs = [(_decode(m), score) for m, score in members]
+            pairs = [(pk, score) for pk, score in pairs if _is_past(self.after, plan.descending, score, pk)]
+            # a whole window of ties up to the last pk read
+            if pairs or len(members) < window:
+                break
+            start += window
+        found = []
+        if pairs:
+            self.after = (pairs[-1][1], pairs[-1][0])
+            found = yield from self.query._checked(plan, [pk for pk, _ in pairs])
+        if len(members) < window:
+            yield from self._finish_steps()
+        return found
+
+    def _lex_steps(self):
+        plan = self.plan
+        members = yield self._read(self.query._proxy.zrangebylex(
+            plan.key, self.lex_min or plan.min, plan.max, start=0, num=self.chunk_size
+        ))
+        found = []
+        if members:
+            last = members[-1]
+            self.lex_min = b'(' + (last if isinstance(last, bytes) else last.encode('utf-8'))
+            found = yield from self.query._checked(plan, _pks(plan, members), members)
+        if len(members) < self.chunk_size:
+            yield from self._finish_steps()
+        return found
+
+    def _read(self, action: Action) -> Action:
+        """`action`, keeping the temporary key of the plan alive while it is walked."""
+        if self.plan.temp_key is None:
+            return action
+        return Action.pipeline(
+            [action, self.query._proxy.expire(self.plan.temp_key, self.query.temp_ttl)],
+            runtime_mode=self.query.app.runtime_mode,
+            client=self.query._proxy,
+            result_from_index=0
+        )
+
+    def _finish_steps(self):
+        self.done = True
+        if self.plan.temp_key is not None:
+            yield self.query._proxy.unlink(self.plan.temp_key)
+
+
+def _iter_sync(walker: _Walker):
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(run_steps, walker.next_steps(), 'sync')
+        while True:
+            chunk = future.result()
+            if chunk is None:
+                return
+            # the next chunk is read while this one is consumed
+            future = pool.submit(run_steps, walker.next_steps(), 'sync')
+            yield from chunk
+
+
+async def _iter_async(walker: _Walker):
+    task = asyncio.ensure_future(run_steps(walker.next_steps(), 'async'))
+    try:
+        while True:
+            chunk = await task
+            if chunk is None:
+                return
+            task = asyncio.ensure_future(run_steps(walker.next_steps(), 'async'))
+            for instance in chunk:
+                yield instance
+    finally:
+        task.cancel()
+
+
+def _is_past(after: Optional[Tuple[float, str]], descending: bool, score: float, pk: str) -> bool:
+    """Whether the (score, pk) comes after `after` in the order of the sorted set, ties by pk."""
+    if after is None:
+        return True
+    if descending:
+        return (score, pk) < after
+    return (score, pk) > after
+
+
+def _pks(source, members: List[Any]) -> List[str]:
+    """The pks of the members read from the key of a plan or a source."""
+    if source.kind == 'lex':
+        return [member_pk(member) for member in members]
+    return [_decode(member) for member in members]
+
+
+def _stale_member(source: IndexSource, pk: str, instance: Optional[BaseRedisModel], member: Any) -> bool:
+    """Whether `member` of the prefix index `source` is not the member of the current value of `instance`."""
+    if member is None or source.kind != 'lex':
+        return False
+    index = source.index
+    expected = None if instance is None else index.member(index.token(getattr(instance, source.field, None)), pk)
+    return _decode(member) != expected
+
+
+def _keyset_range(plan: QueryPlan, score: Optional[float]) -> Tuple[str, str]:
+    """The (min, max) range of `plan` starting at `score`, the ties of which are skipped by the caller."""
+    min_arg, max_arg = plan.min, plan.max
+    if score is not None:
+        if plan.descending and score < _bound(max_arg):
+            max_arg = repr(score)
+        elif not plan.descending and score > _bound(min_arg):
+            min_arg = repr(score)
+    return min_arg, max_arg
+
+
+def _below(min_arg: str) -> str:
+    """The ZCOUNT maximum of the scores below the ZRANGEBYSCORE minimum `min_arg`."""
+    if min_arg.startswith('('):
+        return min_arg[1:]
+    return f"({min_arg}"
+
+
+def _bound(arg: str) -> float:
+    """The score of a ZRANGEBYSCORE bound such as '(10.0' or '-inf'."""
+    return float(arg.lstrip('('))
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, bool, float, str]:
+    try:
+        field_name, descending, score, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(field_name), bool(descending), float(score), str(pk)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"The cursor {cursor!r} is not valid.") from e
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
@@ -0,0 +1,126 @@
+"""Cache of the query results, invalidated by the writes.
+
+    cache = QueryCache(max_entries=1024, ttl=30, shared_ttl=60)
+    session.query(User, cache=cache).filter_by(city='paris').order_by('-age').limit(10).all()
+
+The results are cached by model, conditions, order and page. The model needs
+`__query_cache__ = True`: its writes start a new generation (see
+`models.generation`) and an entry is only served while the generation it was
+computed with is the current one, so a repeated query costs one read of the
+generation key instead of a new evaluation.
+
+The entries live in process (LRU of `max_entries`, `ttl` seconds), with
+`shared_ttl` they are also written to Redis next to the indexes of the model
+so the other processes share them.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple
+from ..models.generation import read_generation
+
+if TYPE_CHECKING:
+    from ..models import BaseRedisModel
+    from .query import Query
+
+
+class QueryCache:
+    """Local LRU (and optional shared tier) of query results.
+
+    :param max_entries: the number of results kept in process.
+    :param ttl: seconds a local entry is served, None to keep it until it is evicted.
+    :param shared_ttl: seconds of the entries written to Redis, None for no shared tier.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 60, shared_ttl: Optional[int] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_ttl = shared_ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (generation, expiry, instances)
+        self._entries: 'OrderedDict[str, Tuple[Optional[str], Optional[float], List[BaseRedisModel]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def results_steps(self, query: 'Query', limit: Optional[int], compute: Callable[[], Any]):
+        """Steps returning the cached results of `query`, or computing (then caching) them with `compute`."""
+        model_cls = query.model_cls
+        key = _cache_key(query, limit)
+        generation = yield read_generation(model_cls)
+        instances = self._get(key, generation)
+        if instances is None and self.shared_ttl is not None:
+            instances = _load(model_cls, (yield query._proxy.get(self._shared_key(query, key))), generation)
+            if instances is not None:
+                self._put(key, generation, instances)
+        if instances is not None:
+            self.hits += 1
+            return [instance.model_copy(deep=True) for instance in instances]
+        self.misses += 1
+        instances = yield from compute()
+        self._put(key, generation, instances)
+        if self.shared_ttl is not None:
+            payload = json.dumps({'g': generation, 'v': [i.model_dump(mode='json') for i in instances]})
+            yield query._proxy.set(self._shared_key(query, key), payload, ex=self.shared_ttl)
+        return [instance.model_copy(deep=True) for instance in instances]
+
+    # ===== Private Helper Methods =====
+
+    def _get(self, key: str, generation: Optional[str]) -> Optional[List['BaseRedisModel']]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_generation, expiry, instances = entry
+            if entry_generation != generation or (expiry is not None and expiry < time.monotonic()):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return instances
+
+    def _put(self, key: str, generation: Optional[str], instances: List['BaseRedisModel']):
+        expiry = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (generation, expiry, instances)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _shared_key(query: 'Query', key: str) -> str:
+        model_cls = query.model_cls
+        return model_cls.__key_builder__.index_key(
+            model=model_cls,
+            shard_tags=list(model_cls.__model_meta__.shard_tags),
+            index_fields=['__cache__'],
+            index_values=[hashlib.sha1(key.encode('utf-8')).hexdigest()],
+            pk=None,
+            index_fields_info=[]
+        )
+
+
+def _cache_key(query: 'Query', limit: Optional[int]) -> str:
+    model_cls = query.model_cls
+    return repr((
+        f"{model_cls.__module__}.{model_cls.__qualname__}",
+        tuple((c.field, c.op, c.value) for c in query._conditions),
+        tuple(query._order),
+        limit,
+        query._offset,
+        query._keyset,
+        query._after
+    ))
+
+
+def _load(model_cls, payload, generation: Optional[str]) -> Optional[List['BaseRedisModel']]:
+    if payload is None:
+        return None
+    data = json.loads(payload)
+    if data['g'] != generation:
+        return None
+    return [model_cls.model_validate(value) for value in data['v']]
@@ -0,0 +1,99 @@
+"""Per-model encode/decode functions honoring the field level options of `fields()`.
+
+`serializer`, `deserializer` and `exclude_from_dump` are resolved once when the
+codec is compiled, the generated functions only contain the statements of the
+customised fields, so nothing is looked up per field when a model is dumped or
+loaded. Models without any customised field get no codec at all and keep the
+plain pydantic path.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Type, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ...models import BaseRedisModel
+    from ...models.metadata import FieldMetaData, ModelMetadata
+
+_missing = object()
+
+
+@dataclass(frozen=True)
+class ModelCodec:
+    encode: Callable[['BaseRedisModel'], Dict[str, Any]]
+    decode: Callable[[Dict[str, Any]], Dict[str, Any]]
+    source: str
+
+
+def field_metadata(
+        model_cls: Type['BaseRedisModel'],
+        metadata: Optional['ModelMetadata'] = None
+) -> Dict[str, 'FieldMetaData']:
+    """Field name -> FieldMetaData, from the parsed model metadata when given."""
+    if metadata is not None:
+        return {name: meta for item in metadata.fields for name, meta in item.items()}
+    from ...models.metadata import model_fields_metadata
+    return {name: meta for name, meta in model_fields_metadata(model_cls).items() if meta is not None}
+
+
+def compile_codec(
+        model_cls: Type['BaseRedisModel'],
+        fields_meta: Dict[str, 'FieldMetaData'],
+        *,
+        mode: str = 'json',
+        by_alias: bool = False,
+        exclude_none: bool = False,
+        exclude_unset: bool = False,
+        exclude_defaults: bool = False
+) -> Optional[ModelCodec]:
+    """Generate the codec of `model_cls`, None when no field is customised.
+
+    `encode` returns the dict to store (`model_dump` output with the customised
+    fields replaced or dropped), `decode` applies the deserializers in place on
+    the loaded dict before the model is validated.
+    """
+    custom = {
+        name: meta for name, meta in fields_meta.items()
+        if name in model_cls.model_fields and (meta.serializer or meta.deserializer or meta.exclude_from_dump)
+    }
+    if not custom:
+        return None
+    namespace = {'_missing': _missing}
+    excluded = {name for name, meta in custom.items() if meta.exclude_from_dump or meta.serializer}
+    namespace['_exclude'] = frozenset(excluded)
+    encode_lines = [
+        'def encode(instance):',
+        f'    data = instance.model_dump(mode={mode!r}, by_alias={by_alias!r}, '
+        f'exclude_none={exclude_none!r}, exclude_unset={exclude_unset!r}, '
+        f'exclude_defaults={exclude_defaults!r}, exclude=_exclude)',
+    ]
+    decode_lines = ['def decode(data):']
+    for i, (name, meta) in enumerate(custom.items()):
+        field_info = model_cls.model_fields[name]
+        key = field_info.alias if by_alias and field_info.alias else name
+        if meta.serializer and not meta.exclude_from_dump:
+            namespace[f'_ser_{i}'] = meta.serializer
+            indent = '    '
+            encode_lines.append(f'    value = instance.{name}')
+            conditions = []
+            if exclude_unset:
+                conditions.append(f"{name!r} in instance.model_fields_set")
+            if exclude_none:
+                conditions.append('value is not None')
+            if exclude_defaults and not field_info.is_required() and field_info.default_factory is None:
+                namespace[f'_default_{i}'] = field_info.default
+                conditions.append(f'value != _default_{i}')
+            if conditions:
+                encode_lines.append(f"    if {' and '.join(conditions)}:")
+                indent = '        '
+            encode_lines.append(f'{indent}data[{key!r}] = None if value is None else _ser_{i}(value)')
+        if meta.deserializer and not meta.exclude_from_dump:
+            namespace[f'_de_{i}'] = meta.deserializer
+            decode_lines.extend([
+                f'    value = data.get({key!r}, _missing)',
+                '    if value is not _missing and value is not None:',
+                f'        data[{key!r}] = _de_{i}(value)',
+            ])
+    encode_lines.append('    return data')
+    decode_lines.append('    return data')
+    source = '\n'.join(encode_lines) + '\n\n\n' + '\n'.join(decode_lines) + '\n'
+    exec(compile(source, f'<flamemodel codec {model_cls.__name__}>', 'exec'), namespace)
+    return ModelCodec(encode=namespace['encode'], decode=namespace['decode'], source=source)
@@ -1,9 +1,13 @@
 import json
-from typing import Any, Dict, Type, TYPE_CHECKING
+from typing import Any, Dict, Optional, Type, TYPE_CHECKING
 from .protocol import SerializerProtocol
+from .codegen import ModelCodec, compile_codec, field_metadata
 
 if TYPE_CHECKING:
     from ...models import BaseRedisModel
+    from ...models.metadata import ModelMetadata
+
+_json_separators = (',', ':')
 
 
 class DefaultSerializer(SerializerProtocol):
@@ -13,6 +17,9 @@ class DefaultSerializer(SerializerProtocol):
     - JSON 字符串（默认）
     - JSON 字节
     - 字典（用于 Hash 类型）
+
+    字段的 `serializer`、`deserializer` 和 `exclude_from_dump` 选项通过每个模型
+    预先生成的编解码函数实现（见 `codegen`），没有自定义字段的模型仍走 Pydantic 原生路径。
     
     Args:
         options: 序列化配置选项
@@ -38,6 +45,40 @@ class DefaultSerializer(SerializerProtocol):
         self.exclude_unset = self.options.get('exclude_unset', False)
         self.exclude_defaults = self.options.get('exclude_defaults', False)
         self.as_bytes = self.options.get('as_bytes', False)
+        # 模型类 -> 编解码函数，None 表示该模型没有自定义字段
+        self._codecs: Dict[Type['BaseRedisModel'], Optional[ModelCodec]] = {}
+
+    def compile_model(
+            self,
+            model_cls: Type['BaseRedisModel'],
+            metadata: Optional['ModelMetadata'] = None
+    ) -> Optional[ModelCodec]:
+        """为模型生成并缓存编解码函数，模型注册时调用，未注册的模型在首次使用时生成。
+
+        Args:
+            model_cls: 模型类
+            metadata: 已解析的模型元数据，为空时从 JSON Schema 读取字段元数据
+
+        Returns:
+            编解码函数，模型没有自定义字段时返回 None
+        """
+        codec = compile_codec(
+            model_cls,
+            field_metadata(model_cls, metadata),
+            mode='python' if self.mode == 'dict' else 'json',
+            by_alias=self.by_alias,
+            exclude_none=self.exclude_none,
+            exclude_unset=self.exclude_unset,
+            exclude_defaults=self.exclude_defaults
+        )
+        self._codecs[model_cls] = codec
+        return codec
+
+    def _get_codec(self, model_cls: Type['BaseRedisModel']) -> Optional[ModelCodec]:
+        try:
+            return self._codecs[model_cls]
+        except KeyError:
+            return self.compile_model(model_cls)
     
     def serialize(self, instance: 'BaseRedisModel') -> bytes | str | Dict[str, Any]:
         """将模型实例序列化为 Redis 可存储的格式。
@@ -54,6 +95,17 @@ class DefaultSerializer(SerializerProtocol):
         Raises:
             ValueError: 当 mode 不是 'json' 或 'dict' 时
         """
+        codec = self._get_codec(type(instance))
+        if codec is not None:
+            data = codec.encode(instance)
+            if self.mode == 'dict':
+                return data
+            if self.mode != 'json':
+                raise ValueError(f"Unsupported serialization modes: {self.mode}, please use 'json' or 'dict'")
+            json_str = json.dumps(data, separators=_json_separators, ensure_ascii=False)
+            if self.as_bytes:
+                return json_str.encode('utf-8')
+            return json_str
         if self.mode == 'dict':
             # 使用 Pydantic 的 model_dump 方法序列化为字典
             return instance.model_dump(
@@ -97,6 +149,18 @@ class DefaultSerializer(SerializerProtocol):
         """
         if data is None:
             return None
+        codec = self._get_codec(model_class)
+        if codec is not None:
+            if isinstance(data, dict):
+                data = dict(data)
+            elif isinstance(data, (bytes, str)):
+                data = json.loads(data)
+            else:
+                raise TypeError(
+                    f"Unsupported data types: {type(data)}, "
+                    f"expectation bytes、str or Dict[str, Any]"
+                )
+            return model_class.model_validate(codec.decode(data))
         if isinstance(data, dict):
             # 字典数据直接使用 Pydantic 的 model_validate 方法
             return model_class.model_validate(data)
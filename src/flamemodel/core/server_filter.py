@@ -0,0 +1,236 @@
+"""Filtering of the candidates of a query on the server, with a Lua script.
+
+    session.query(User, server_filter=True).filter_by(city='paris', nickname='bob').limit(10).all()
+
+A query reads the pks of its smallest index, fetches every candidate instance
+and checks the conditions the indexes don't answer on the client. With
+`server_filter=True` these residual conditions are passed to one script which
+reads a window of the candidate index (SSCAN, ZRANGEBYSCORE or ZRANGEBYLEX),
+GETs the values, decodes them with cjson and only returns the matching values,
+stopping once the requested page is complete. The script is run with EVALSHA,
+it is loaded again when the server answers NOSCRIPT.
+
+The conditions compiled to Lua are the equalities on str, numbers, bools and
+None, the ranges on numbers and `startswith` without casefold, the others are
+only checked on the client, like every returned instance.
+
+The query runs as without the option on a cluster (the script reads keys it
+doesn't declare), for the `fields` storage mode, the hash models, the fields
+with a custom serializer and on a server without scripting. Unlike the client
+path, the stale index entries are skipped rather than removed, every pk is
+returned once.
+"""
+import json
+import math
+import weakref
+from typing import TYPE_CHECKING, Any, List, Optional
+from redis.exceptions import ResponseError
+from ..utils.action import Action
+from .serializer import DefaultSerializer
+
+if TYPE_CHECKING:
+    from .planner import QueryPlan
+    from .query import Condition, Query
+
+# ARGV: mode, min, max, start (the SSCAN cursor of a set), count, needed matches
+# (0 for all of them), prefix and suffix of the keys of the pks, predicates
+_script = """
+local mode, count, need = ARGV[1], tonumber(ARGV[5]), tonumber(ARGV[6])
+local prefix, suffix = ARGV[7], ARGV[8]
+local predicates = cjson.decode(ARGV[9])
+local members, position
+if mode == 'set' then
+    local page = redis.call('SSCAN', KEYS[1], ARGV[4], 'COUNT', count)
+    position, members = page[1], page[2]
+elseif mode == 'zset' then
+    members = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[2], ARGV[3], 'LIMIT', ARGV[4], count)
+elseif mode == 'zrev' then
+    members = redis.call('ZREVRANGEBYSCORE', KEYS[1], ARGV[3], ARGV[2], 'LIMIT', ARGV[4], count)
+else
+    members = redis.call('ZRANGEBYLEX', KEYS[1], ARGV[2], ARGV[3], 'LIMIT', ARGV[4], count)
+end
+
+local function test(doc, p)
+    local v, op, x = doc[p[1]], p[2], p[3]
+    if op == 'null' then
+        return v == nil or v == cjson.null
+    elseif op == 'eq' then
+        return v == x
+    elseif op == 'startswith' then
+        return type(v) == 'string' and string.sub(v, 1, #x) == x
+    elseif type(v) ~= 'number' then
+        return false
+    elseif op == 'gt' then
+        return v > x
+    elseif op == 'gte' then
+        return v >= x
+    elseif op == 'lt' then
+        return v < x
+    elseif op == 'lte' then
+        return v <= x
+    end
+    return v >= x[1] and v <= x[2]
+end
+
+local found, read, seen = {}, 0, {}
+for i, member in ipairs(members) do
+    read = i
+    local pk = member
+    if mode == 'lex' then
+        pk = string.match(member, '%z([^%z]*)$')
+    end
+    -- a stale entry of a prefix index repeats the pk of a current one
+    local value = not seen[pk] and redis.call('GET', prefix .. pk .. suffix)
+    seen[pk] = true
+    if value then
+        local ok, doc = pcall(cjson.decode, value)
+        local matched = not ok or type(doc) ~= 'table'
+        if not matched then
+            matched = true
+            for _, p in ipairs(predicates) do
+                if not test(doc, p) then
+                    matched = false
+                    break
+                end
+            end
+        end
+        -- the values which can't be decoded here are left to the client
+        if matched then
+            found[#found + 1] = value
+            if need > 0 and #found >= need then
+                break
+            end
+        end
+    end
+end
+return {position or read, #members, found}
+"""
+
+_sentinel = '\x00pk\x00'
+# the largest integers a Lua number (a double) holds exactly
+_max_exact = 2 ** 53
+# raw client -> registered script, None once the server refused scripting
+_scripts: 'weakref.WeakKeyDictionary[Any, Any]' = weakref.WeakKeyDictionary()
+
+
+def predicates(query: 'Query', plan: 'QueryPlan') -> Optional[List[list]]:
+    """The Lua predicates of the residual conditions of `plan`, None when the script can't serve the query."""
+    model_cls = query.model_cls
+    serializer = model_cls.__serializer__
+    meta = model_cls.__model_meta__
+    if (query.app.adaptor.is_cluster or model_cls.__redis_type__ != 'string'
+            or model_cls.__storage_mode__ != 'blob' or plan.key is None or query._after is not None
+            or not isinstance(serializer, DefaultSerializer) or serializer.mode != 'json'):
+        return None
+    if _scripts.get(query._proxy._client, True) is None or model_cls.primary_key(_sentinel).count(_sentinel) != 1:
+        return None
+    infos = {name: info for item in (meta.fields if meta is not None else ()) for name, info in item.items()}
+    compiled = []
+    for condition in query._conditions:
+        if condition.field not in plan.residual:
+            continue
+        info = infos.get(condition.field)
+        if info is not None and (info.serializer is not None or info.exclude_from_dump):
+            continue
+        predicate = _compile(condition)
+        if predicate is not None:
+            name = model_cls.model_fields[condition.field].alias if serializer.by_alias else None
+            compiled.append([name or condition.field, *predicate])
+    return compiled or None
+
+
+def filter_steps(query: 'Query', plan: 'QueryPlan', compiled: List[list], limit: Optional[int]):
+    """Steps returning the instances of the candidates of `plan` matched by the script, unchecked.
+
+    The ordered plans stop once the page is complete, None when the server has no scripting.
+    """
+    model_cls = query.model_cls
+    prefix, _, suffix = model_cls.primary_key(_sentinel).partition(_sentinel)
+    mode = 'zrev' if plan.kind == 'zset' and plan.descending else plan.kind
+    # the sets are read whole, the query sorts their results by pk
+    wanted = query._offset + limit if plan.ordered and plan.kind != 'set' and limit is not None else 0
+    window = max(query.batch_size, wanted)
+    payload = json.dumps(compiled)
+    deserialize = model_cls.__serializer__.deserialize
+    pk_getter = model_cls.__model_meta__.accessors.pk_getter
+    # SSCAN may return a member again, the pk of a stale entry of a prefix index comes back
+    found, position, seen = [], 0, set()
+    while True:
+        need = max(wanted - len(found), 0) if wanted else 0
+        result = yield _run(query, plan.key, [
+            mode, plan.min, plan.max, position, window, need, prefix, suffix, payload
+        ])
+        if result is None:
+            return None
+        # the next SSCAN cursor of a set, the number of members read of a sorted set
+        moved, members, values = int(result[0]), int(result[1]), result[2]
+        for value in values:
+            instance = deserialize(value, model_cls)
+            pk = pk_getter(instance)
+            if pk not in seen:
+                seen.add(pk)
+                found.append(instance)
+        if mode == 'set':
+            position = moved
+            if not position:
+                return found
+        elif members < window or (wanted and len(found) >= wanted):
+            return found
+        else:
+            position += moved
+
+
+def _compile(condition: 'Condition') -> Optional[list]:
+    value = condition.value
+    if condition.op == 'eq':
+        if value is None:
+            return ['null', None]
+        return ['eq', value] if _plain(value) else None
+    if condition.op == 'startswith':
+        return None if condition.casefold else ['startswith', value]
+    if condition.op == 'between':
+        return ['between', list(value)] if all(_number(v) for v in value) else None
+    return [condition.op, value] if _number(value) else None
+
+
+def _plain(value: Any) -> bool:
+    return isinstance(value, (str, bool)) or _number(value)
+
+
+def _number(value: Any) -> bool:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    return abs(value) <= _max_exact if isinstance(value, int) else math.isfinite(value)
+
+
+def _run(query: 'Query', key: str, args: list) -> Action:
+    """EVALSHA of the script (loaded again on NOSCRIPT), its result is None when the server has no scripting."""
+    client = query._proxy._client
+    script = _scripts.get(client)
+    if script is None:
+        script = _scripts[client] = client.register_script(_script)
+
+    def _run_sync():
+        try:
+            return script(keys=[key], args=args)
+        except ResponseError as e:
+            return _refused(client, e)
+
+    async def _run_async():
+        try:
+            return await script(keys=[key], args=args)
+        except ResponseError as e:
+            return _refused(client, e)
+
+    return Action(
+        runtime_mode=query.app.runtime_mode,
+        executor=_run_sync if query.app.runtime_mode == 'sync' else _run_async,
+        client=query._proxy
+    )
+
+
+def _refused(client, error: ResponseError) -> None:
+    if 'unknown command' not in str(error).lower():
+        raise error
+    _scripts[client] = None
+    return None
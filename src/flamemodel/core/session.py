@@ -18,10 +18,11 @@ class Session:
         self._pending_task = []
         self._in_transaction = False
 
-    def query(self, model_cls: Type[_T]) -> Query[Type[_T]]:
+    def query(self, model_cls: Type[_T], **options) -> Query[Type[_T]]:
         return Query(
             app=self.app,
-            model_cls=model_cls
+            model_cls=model_cls,
+            **options
         )  # type: ignore
 
     def add(self, model: _T):
@@ -43,6 +44,13 @@ class Session:
             return None
         if len(self._pending_task) == 1:
             action = self._pending_task[0]
+        elif not all(task.queueable() for task in self._pending_task):
+            # e.g. the saves of indexed or unique fields, each of them is a transaction of its own
+            action = Action.sequence(
+                self._pending_task,
+                runtime_mode=self.app.runtime_mode,
+                result_from_index=None
+            )
         else:
             action = Action.transaction(
                 self._pending_task,
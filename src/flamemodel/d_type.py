@@ -107,3 +107,9 @@ RedisDataType = _t.Literal[
     'string', 'list', 'hash', 'stream', 'hyper_log_log',
     'set', 'zset', 'geo', 'bitmap'
 ]
+
+# how a standalone model is stored: one serialized value or one hash field per model field
+StorageMode = _t.Literal['blob', 'fields']
+
+# membership index of the saved pks of a model: a set, or a zset ordered by write time
+CollectionType = _t.Literal['set', 'zset']
@@ -1,20 +1,24 @@
 from typing import TYPE_CHECKING
-from ..d_type import SingletonMeta
 
 if TYPE_CHECKING:
     from ..adaptor import RedisAdaptor
 
 
-class BaseDriver(metaclass=SingletonMeta):
+class BaseDriver:
     def __init__(self, adaptor: 'RedisAdaptor'):
         self.adaptor = adaptor
 
-    def commit(self, key: str, value: str):
+    def commit(self, key: str, value: str, keep_ttl: bool = False):
+        if keep_ttl:
+            return self.adaptor.proxy.set(key, value, keepttl=True)
         return self.adaptor.proxy.set(key, value)
 
     def delete(self, key: str):
         return self.adaptor.proxy.delete(key)
 
+    def unlink(self, key: str):
+        return self.adaptor.proxy.unlink(key)
+
     def get(self, key: str):
         return self.adaptor.proxy.get(key)
 
@@ -32,3 +36,6 @@ class BaseDriver(metaclass=SingletonMeta):
 
     def keys(self, pk: str):
         return self.adaptor.proxy.keys(pk)
+
+    def scan(self, cursor: int = 0, match: str = None, count: int = None, type_: str = None):
+        return self.adaptor.proxy.scan(cursor, match=match, count=count, _type=type_)
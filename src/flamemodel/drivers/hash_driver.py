@@ -28,3 +28,9 @@ class HashDriver(BaseDriver):
 
     def hvals(self, key: str):
         return self.adaptor.proxy.hvals(key)
+
+    def hincrby(self, key: str, field: str, amount: int = 1):
+        return self.adaptor.proxy.hincrby(key, field, amount)
+
+    def hincrbyfloat(self, key: str, field: str, amount: float = 1.0):
+        return self.adaptor.proxy.hincrbyfloat(key, field, amount)
@@ -124,6 +124,56 @@ class NotUsedFieldsError(FlameModelException):
     pass
 
 
+class StorageModeNotSupportedError(FlameModelException):
+    pass
+
+
+class PartialModelError(FlameModelException):
+    pass
+
+
+class IncrNotSupportedError(FlameModelException):
+    pass
+
+
+class MigrationNotSupportedError(FlameModelException):
+    pass
+
+
+class KeyCodeRegistryError(FlameModelException):
+    pass
+
+
+class CollectionNotSupportedError(FlameModelException):
+    pass
+
+
+class RangeIndexNotSupportedError(FlameModelException):
+    pass
+
+
+class ScanNotSupportedError(FlameModelException):
+    pass
+
+
+class InvalidCursorError(FlameModelException):
+    pass
+
+
+class QueryCacheNotSupportedError(FlameModelException):
+    pass
+
+
+class UniqueViolationError(FlameModelException):
+    def __init__(self, message: str, model_cls, field_name, value, owner):
+        super().__init__(message)
+        self.model_cls = model_cls
+        self.field_name = field_name
+        self.value = value
+        # pk of the instance holding the value
+        self.owner = owner
+
+
 class FieldNotFoundError(FlameModelException):
     def __init__(self, message: str, model_cls, field_name):
         super().__init__(message)
@@ -38,20 +38,16 @@ class FlameModel:
         self._set_model_adaptor()
         self._set_model_key_builder()
         self._set_model_serializer()
-        self._register_models()
 
     def _set_model_adaptor(self):
         BaseRedisModel.set_redis_adaptor(self.adaptor)
 
-    def _register_models(self):
-        bases_models = BaseRedisModel.__subclasses__()
-        for bases_model in bases_models:
-            for cls in bases_model.__subclasses__():
-                model_name = cls.__schema__ or cls.__name__
-                self.redis_model_repository.register_model(model_name, cls)
-
     def _set_model_key_builder(self):
         key_builder_instance = self.key_builder_cls(**self.key_builder_options)
+        # key builders keeping state in redis (e.g. CompactKeyBuilder) are bound to the adaptor
+        bind_adaptor = getattr(key_builder_instance, 'bind_adaptor', None)
+        if bind_adaptor is not None:
+            bind_adaptor(self.adaptor)
         BaseRedisModel.set_key_builder(key_builder_instance)
 
     def _set_model_serializer(self):
@@ -9,6 +9,7 @@ from .geo_model import Geo
 from .bitmap_model import BitMap
 from .hyper_log_log_model import HyperLogLog
 from .stream_model import Stream
+from .lazy import LazyModel, LazyModelList
 
 __all__ = (
     'BaseRedisModel',
@@ -21,5 +22,7 @@ __all__ = (
     'HyperLogLog',
     'BitMap',
     'Stream',
-    'Geo'
+    'Geo',
+    'LazyModel',
+    'LazyModelList'
 )
@@ -1,4 +1,4 @@
-from typing import Any, Tuple, Dict, Literal
+from typing import Any, Tuple, Literal
 from .redis_model import BaseRedisModel
 from ..d_type import SelfInstance
 from ..utils.action import Action
@@ -6,6 +6,7 @@ from ..utils.action import Action
 
 class BitMap(BaseRedisModel):
     __redis_type__ = 'bitmap'
+    __abstract__ = True
 
     @classmethod
     def count_by(cls, pk: Any) -> int:
@@ -16,11 +17,10 @@ class BitMap(BaseRedisModel):
     @classmethod
     def get(cls, pk: Any) -> SelfInstance:
         driver = cls.get_driver()
-        pk_field_info = cls.__model_meta__.pk_info
-        pk_field_name = list(pk_field_info.keys())[0]
+        pk_field_name = cls.__model_meta__.accessors.pk_field
         primary_key = cls.primary_key(pk)
         acts = []
-        for field_name, offset in cls._bitmap_offset().items():
+        for field_name, offset in cls._bitmap_offset():
             acts.append(
                 driver.getbit(primary_key, offset).then(
                     lambda x, fn=field_name: (fn, 1 if x else 0)
@@ -40,7 +40,7 @@ class BitMap(BaseRedisModel):
         driver = self.get_driver()
         pk = self.get_primary_key()
         acts = []
-        for _, offset in self._bitmap_offset().items():
+        for _, offset in self._bitmap_offset():
             acts.append(
                 driver.getbit(pk, offset).then(
                     lambda x: 1 if x else 0
@@ -56,8 +56,9 @@ class BitMap(BaseRedisModel):
         driver = self.get_driver()
         pk = self.get_primary_key()
         acts = []
-        for field_name, offset in self._bitmap_offset().items():
-            value = getattr(self, field_name)
+        accessors = self.__model_meta__.accessors
+        values = accessors.bitmap_getter(self)
+        for (_, offset), value in zip(accessors.bitmap_offsets, values):
             acts.append(
                 driver.setbit(pk, offset, 1 if value else 0)
             )
@@ -101,12 +102,9 @@ class BitMap(BaseRedisModel):
         )
 
     @classmethod
-    def _bitmap_offset(cls) -> Dict[str, int]:
-        result = {}
-        for flag in cls.__model_meta__.flags:
-            filed_name, field_meta = list(flag.items())[0]
-            result[filed_name] = field_meta.flag
-        return result
+    def _bitmap_offset(cls) -> Tuple[Tuple[str, int], ...]:
+        """:return ((field_name, offset), ...) sorted by offset"""
+        return cls.__model_meta__.accessors.bitmap_offsets
 
     @classmethod
     def _bit_top(
@@ -122,11 +120,11 @@ class BitMap(BaseRedisModel):
             bitop_act = driver.bitop('NOT', dest_pk, source_pk)
         else:
             bitop_act = driver.bitop(operate, dest_pk, source_pk, target_pk)
-        pk_field_name = list(cls.__model_meta__.pk_info.keys())[0]
+        pk_field_name = cls.__model_meta__.accessors.pk_field
         parsed = cls.__key_builder__.parse_key(dest_pk)
         pk_value = parsed.get('pk')
         acts = []
-        for field_name, offset in cls._bitmap_offset().items():
+        for field_name, offset in cls._bitmap_offset():
             acts.append(
                 driver.getbit(dest_pk, offset).then(
                     lambda x, fn=field_name: (fn, 1 if x else 0)
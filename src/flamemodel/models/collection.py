@@ -0,0 +1,160 @@
+"""Membership index of the saved pks of a model.
+
+With `__collection__ = 'set'` (or `'zset'`, ordered by write time) every
+`save()` adds the pk to the collection key of the model and every `delete()`
+removes it, in the same transaction as the write. The instances can then be
+counted and listed page by page from this one key, without walking the
+keyspace with KEYS or SCAN:
+
+    class User(String):
+        __collection__ = 'zset'
+        ...
+
+    User.count().execute()
+    cursor, pks = User.page(0, count=100).execute()
+    for pk in User.iter_pks():     # `async for` in async mode
+        ...
+
+Only the string and hash models are supported, the other models don't own
+one key per pk.
+"""
+import time
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Type, TYPE_CHECKING
+from pydantic import TypeAdapter
+from ..exceptions import CollectionNotSupportedError
+from ..utils.action import Action
+
+if TYPE_CHECKING:
+    from .redis_model import BaseRedisModel
+
+_collection_types = ('set', 'zset')
+_supported_redis_types = ('string', 'hash')
+
+
+def check_collection(model_cls: Type['BaseRedisModel']):
+    """Validate the `__collection__` option when the model class is created."""
+    collection = getattr(model_cls, '__collection__', None)
+    if collection is None:
+        return
+    if collection not in _collection_types:
+        raise CollectionNotSupportedError(
+            f"The collection of the model {model_cls.__name__} must be one of {_collection_types}, got {collection!r}."
+        )
+    if getattr(model_cls, '__redis_type__', None) not in _supported_redis_types:
+        raise CollectionNotSupportedError(
+            f"The model {model_cls.__name__} is a {model_cls.__redis_type__} model, "
+            "only string and hash models can keep a collection."
+        )
+
+
+def collection_key(model_cls: Type['BaseRedisModel']) -> str:
+    return model_cls.__key_builder__.model_collection_key(
+        model=model_cls,
+        shard_tags=list(model_cls.__model_meta__.shard_tags)
+    )
+
+
+def collection_ops(instance: 'BaseRedisModel', added: bool) -> List[Action]:
+    """The command adding (or removing) the pk of `instance` to the collection, if any."""
+    model_cls = type(instance)
+    collection = model_cls.__collection__
+    if collection is None:
+        return []
+    proxy = model_cls.__redis_adaptor__.proxy
+    key = collection_key(model_cls)
+    member = str(instance.__model_meta__.accessors.pk_getter(instance))
+    if collection == 'zset':
+        return [proxy.zadd(key, {member: time.time()}) if added else proxy.zrem(key, member)]
+    return [proxy.sadd(key, member) if added else proxy.srem(key, member)]
+
+
+def track(instance: 'BaseRedisModel', action: Action, added: bool) -> Action:
+    """Add (or remove) the pk of `instance` with the write `action`, in one transaction.
+
+    The result of `action` is kept as the result.
+    """
+    ops = collection_ops(instance, added)
+    if not ops:
+        return action
+    return Action.transaction(
+        [action, *ops],
+        runtime_mode=type(instance).__redis_adaptor__.runtime_mode,
+        client=type(instance).__redis_adaptor__.proxy,
+        result_from_index=0
+    )
+
+
+def collection_count(model_cls: Type['BaseRedisModel']) -> Action:
+    proxy = _proxy(model_cls)
+    if model_cls.__collection__ == 'zset':
+        return proxy.zcard(collection_key(model_cls))
+    return proxy.scard(collection_key(model_cls))
+
+
+def collection_page(model_cls: Type['BaseRedisModel'], cursor: int = 0, count: int = 100) -> Action:
+    """One page of pks as (next cursor, pks), the next cursor is 0 after the last page.
+
+    A set is read with SSCAN (`count` is a hint), a zset with ZRANGE from the
+    oldest write, the cursor is then the offset of the next page.
+    """
+    proxy = _proxy(model_cls)
+    key = collection_key(model_cls)
+    load_pks = _pk_loader(model_cls)
+    if model_cls.__collection__ == 'zset':
+        def _page(members):
+            return (cursor + count if len(members) == count else 0), load_pks(members)
+
+        return proxy.zrange(key, cursor, cursor + count - 1).then(_page)
+    return proxy.sscan(key, cursor, count=count).then(
+        lambda r: (int(r[0]), load_pks(r[1]))
+    )
+
+
+def iter_collection(model_cls: Type['BaseRedisModel'], batch_size: int = 100):
+    """Iterate over every pk of the collection, an async iterator in async mode."""
+    _proxy(model_cls)
+    if model_cls.__redis_adaptor__.runtime_mode == 'sync':
+        return _iter_sync(model_cls, batch_size)
+    return _iter_async(model_cls, batch_size)
+
+
+def _iter_sync(model_cls: Type['BaseRedisModel'], batch_size: int):
+    cursor = 0
+    while True:
+        cursor, pks = collection_page(model_cls, cursor, batch_size).execute()
+        yield from pks
+        if not cursor:
+            return
+
+
+async def _iter_async(model_cls: Type['BaseRedisModel'], batch_size: int):
+    cursor = 0
+    while True:
+        cursor, pks = await collection_page(model_cls, cursor, batch_size).execute()
+        for pk in pks:
+            yield pk
+        if not cursor:
+            return
+
+
+def _proxy(model_cls: Type['BaseRedisModel']):
+    if model_cls.__collection__ is None:
+        raise CollectionNotSupportedError(
+            f"The model {model_cls.__name__} has no collection, set `__collection__ = 'set'` or 'zset'."
+        )
+    return model_cls.__redis_adaptor__.proxy
+
+
+@lru_cache(maxsize=None)
+def _pk_loader(model_cls: Type['BaseRedisModel']) -> Callable[[List[Any]], List[Any]]:
+    pk_field = model_cls.__model_meta__.accessors.pk_field
+    validate = TypeAdapter(model_cls.model_fields[pk_field].rebuild_annotation()).validate_strings
+
+    def load_pks(members: Optional[List[Any]]) -> List[Any]:
+        return [
+            validate(member.decode('utf-8') if isinstance(member, bytes) else member)
+            for member in members or ()
+        ]
+
+    return load_pks
@@ -0,0 +1,104 @@
+"""Codec of the `fields` storage mode.
+
+Every model field is stored as one Redis hash field whose value is the JSON
+encoding of that field, numeric fields are therefore plain numbers and can be
+changed in place with HINCRBY/HINCRBYFLOAT.
+A whole object is loaded back by joining the fragments into one JSON document,
+so it is validated by pydantic in a single pass.
+
+The `serializer`, `deserializer` and `exclude_from_dump` options of the fields
+apply as in the blob mode (the same generated codec, see `core.serializer.codegen`),
+both modes store the same logical document. The `exclude_none`, `exclude_unset`
+and `exclude_defaults` options of the serializer don't: every field is written on
+its own, a dropped field would keep its previous value in the hash.
+"""
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Type, TYPE_CHECKING
+from pydantic import TypeAdapter
+from ..core.serializer.codegen import ModelCodec, compile_codec, field_metadata
+
+if TYPE_CHECKING:
+    from .redis_model import BaseRedisModel
+
+_json_separators = (',', ':')
+
+
+def dump_fields(instance: 'BaseRedisModel', names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Encode the model (or only `names`) to a hash mapping of JSON fragments."""
+    include = set(names) if names is not None else None
+    codec = fields_codec(type(instance))
+    if codec is None:
+        data = instance.model_dump(mode='json', include=include)
+    else:
+        data = codec.encode(instance)
+        if include is not None:
+            data = {name: value for name, value in data.items() if name in include}
+    return {
+        name: json.dumps(value, separators=_json_separators, ensure_ascii=False)
+        for name, value in data.items()
+    }
+
+
+def load_fields(model_cls: Type['BaseRedisModel'], mapping: Optional[Dict[Any, Any]]) -> Optional['BaseRedisModel']:
+    """Build the model from a full HGETALL mapping."""
+    if not mapping:
+        return None
+    parts = []
+    for name, value in mapping.items():
+        if isinstance(name, bytes):
+            name = name.decode('utf-8')
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        parts.append(f'"{name}":{value}')
+    document = '{' + ','.join(parts) + '}'
+    codec = fields_codec(model_cls)
+    if codec is not None:
+        return model_cls.model_validate(codec.decode(json.loads(document)))
+    return model_cls.model_validate_json(document)
+
+
+def load_values(model_cls: Type['BaseRedisModel'], names: List[str], values: List[Any]) -> Dict[str, Any]:
+    """Validate the values of a HMGET reply one field at a time, the missing ones are left out."""
+    codec = fields_codec(model_cls)
+    if codec is None:
+        return {
+            name: field_adapter(model_cls, name).validate_json(value)
+            for name, value in zip(names, values) if value is not None
+        }
+    data = codec.decode({name: json.loads(value) for name, value in zip(names, values) if value is not None})
+    return {name: field_adapter(model_cls, name).validate_python(value) for name, value in data.items()}
+
+
+def load_partial(
+        model_cls: Type['BaseRedisModel'],
+        names: List[str],
+        values: List[Any],
+        pk: Any
+) -> Optional['BaseRedisModel']:
+    """Build a partial model from a HMGET reply.
+
+    Only the requested fields are validated and set, the instance is created with
+    `model_construct` so the fields that were not read are left unset. The pk is
+    the one the instance was read with, not a generated one, and the instance is
+    marked partial: it can't be saved or updated.
+    """
+    data = load_values(model_cls, names, values)
+    if not data:
+        return None
+    pk_field = model_cls.__model_meta__.accessors.pk_field
+    values = {**data, pk_field: field_adapter(model_cls, pk_field).validate_python(pk)}
+    instance = model_cls.model_construct(_fields_set=set(data), **values)
+    instance._partial = True
+    return instance
+
+
+@lru_cache(maxsize=None)
+def fields_codec(model_cls: Type['BaseRedisModel']) -> Optional[ModelCodec]:
+    """The codec of the customised fields of `model_cls`, None when there is none."""
+    return compile_codec(model_cls, field_metadata(model_cls, model_cls.__model_meta__), mode='json')
+
+
+@lru_cache(maxsize=None)
+def field_adapter(model_cls: Type['BaseRedisModel'], name: str) -> TypeAdapter:
+    return TypeAdapter(model_cls.model_fields[name].rebuild_annotation())
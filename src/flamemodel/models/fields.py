@@ -21,6 +21,9 @@ def fields(
         shard_tag: bool = False,
         foreign_key: Optional[ForeignKey] = None,
         index: bool = False,
+        range_index: bool = False,
+        prefix_index: bool = False,
+        prefix_casefold: bool = False,
         unique: bool = False,
         serializer: Optional[Callable[[Any], str]] = None,
         deserializer: Optional[Callable[[str], Any]] = None,
@@ -50,6 +53,9 @@ def fields(
         shard_tag=shard_tag,
         foreign_key=foreign_key,
         index=index,
+        range_index=range_index,
+        prefix_index=prefix_index,
+        prefix_casefold=prefix_casefold,
         unique=unique,
         serializer=serializer,
         deserializer=deserializer,
@@ -68,7 +74,10 @@ def fields(
         existing_json_schema_extra=existing_json_schema_extra,
         fields_kwargs=fields_kwargs
     )
-    return Field(json_schema_extra=param_normalized, **kwargs)
+    field_info = Field(json_schema_extra=param_normalized, **kwargs)
+    # kept on the FieldInfo too, so it is read from `model_fields` without building the json schema
+    field_info.metadata.append(fields_kwargs.light_copy())
+    return field_info
 
 
 def _wrap_json_schema_extra_func(original_func, fields_kwargs: FieldMetaData):
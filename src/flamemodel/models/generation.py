@@ -0,0 +1,62 @@
+"""Generation marker of the models whose queries are cached.
+
+With `__query_cache__ = True` every `save()`, `update()`, `incr_field()` and
+`delete()` of the model (and `hash_delete()` of a hash model) writes a new
+random token to the generation key of the model, in the same transaction as
+the write:
+
+    User:idx:__gen__ -> '5f0c...'
+
+A cached query result remembers the token it was computed with and is served
+again only while the token didn't change, see `core.query_cache`. A random
+token rather than a counter: a purge of the model (`BulkDeleter`) removes the
+key, a counter would then restart and meet its old values again. A missing
+key (before the first write, after a purge) is given a new token when it is
+read, so no result is ever cached without a generation.
+The writes which bypass the model (other clients) are not seen.
+"""
+import uuid
+from typing import List, Optional, Type, TYPE_CHECKING
+from ..utils.action import Action
+
+if TYPE_CHECKING:
+    from .redis_model import BaseRedisModel
+
+
+def generation_key(model_cls: Type['BaseRedisModel']) -> str:
+    return model_cls.__key_builder__.index_key(
+        model=model_cls,
+        shard_tags=list(model_cls.__model_meta__.shard_tags),
+        index_fields=['__gen__'],
+        index_values=[],
+        pk=None,
+        index_fields_info=[]
+    )
+
+
+def generation_ops(instance: 'BaseRedisModel') -> List[Action]:
+    """The command starting a new generation of the model of `instance`, if its queries are cached."""
+    model_cls = type(instance)
+    if not model_cls.__query_cache__:
+        return []
+    proxy = model_cls.__redis_adaptor__.proxy
+    return [proxy.set(generation_key(model_cls), uuid.uuid4().hex)]
+
+
+def read_generation(model_cls: Type['BaseRedisModel']) -> Action:
+    """Read the current generation token, a new generation is started when there is none."""
+    adaptor = model_cls.__redis_adaptor__
+    proxy = adaptor.proxy
+    key = generation_key(model_cls)
+    return Action.transaction(
+        [proxy.set(key, uuid.uuid4().hex, nx=True), proxy.get(key)],
+        runtime_mode=adaptor.runtime_mode,
+        client=proxy,
+        result_from_index=1
+    ).then(_decode)
+
+
+def _decode(value) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
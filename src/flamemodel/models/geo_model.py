@@ -6,25 +6,18 @@ from ..utils.action import Action
 
 class Geo(BaseRedisModel):
     __redis_type__ = 'geo'
+    __abstract__ = True
 
     @classmethod
     def _geo_fields(cls) -> Tuple[str, str, str]:
         """:return (member_field, longitude_field, latitude_field)"""
-        meta = cls.__model_meta__
-        member = list(meta.member_field.keys())[0]
-        lon = list(meta.lng_field.keys())[0]
-        lat = list(meta.lat_field.keys())[0]
-        return member, lon, lat
+        return cls.__model_meta__.accessors.geo_fields
 
     @property
     def geo_tuple(self) -> Tuple[float, float, str]:
         """:return (longitude, latitude, member_id)"""
-        member_f, lon_f, lat_f = self._geo_fields()
-        return (
-            float(getattr(self, lon_f)),
-            float(getattr(self, lat_f)),
-            str(getattr(self, member_f))
-        )
+        lon, lat, member = self.__model_meta__.accessors.geo_getter(self)
+        return float(lon), float(lat), str(member)
 
     def save(self) -> SelfInstance:
         """save Geo + Hash"""
@@ -1,10 +1,14 @@
 from typing import Any, List, Dict
 from .redis_model import BaseRedisModel
+from .lazy import lazy_or_eager
+from . import collection, generation
 from ..d_type import SelfInstance
+from ..utils.action import Action
 
 
 class Hash(BaseRedisModel):
     __redis_type__ = 'hash'
+    __abstract__ = True
 
     @classmethod
     def get(cls, pk: Any, field: Any) -> SelfInstance:
@@ -17,15 +21,14 @@ class Hash(BaseRedisModel):
         )
 
     @classmethod
-    def get_all(cls, pk: Any) -> List[SelfInstance]:
+    def get_all(cls, pk: Any, lazy: bool = False) -> List[SelfInstance]:
+        """Read every hash value, with `lazy=True` a `LazyModelList` is returned
+        and values are only deserialized when they are used."""
         pk_key = cls.primary_key(pk)
         driver = cls.get_driver()
         result = driver.hgetall(pk_key)
         return result.then(
-            lambda x: [
-                cls.__serializer__.deserialize(i, cls)
-                for i in x.values()
-            ]
+            lambda x: lazy_or_eager(list(x.values()) if x else None, cls, lazy)
         )
 
     @classmethod
@@ -35,15 +38,12 @@ class Hash(BaseRedisModel):
         return driver.hkeys(pk_key)
 
     @classmethod
-    def hash_values(cls, pk: Any) -> List[SelfInstance]:
+    def hash_values(cls, pk: Any, lazy: bool = False) -> List[SelfInstance]:
         pk_key = cls.primary_key(pk)
         driver = cls.get_driver()
         result = driver.hvals(pk_key)
         return result.then(
-            lambda x: [
-                cls.__serializer__.deserialize(i, cls)
-                for i in x
-            ]
+            lambda x: lazy_or_eager(x, cls, lazy)
         )
 
     def exists(self, field: Any) -> bool:
@@ -54,21 +54,36 @@ class Hash(BaseRedisModel):
         _, value = self.hash_field
         driver = self.get_driver()
         pk = self.get_primary_key()
-        return driver.hdel(pk, value)
+        return self._track_write(driver.hdel(pk, value), added=False, with_collection=False)
 
     def save(self) -> SelfInstance:
         _, field = self.hash_field
         pk = self.get_primary_key()
         driver = self.get_driver()
-        return driver.hset(pk, field, self.__serializer__.serialize(self))
+        action = driver.hset(pk, field, self.__serializer__.serialize(self))
+        return self._track_write(action, added=True)
+
+    def _track_write(self, action: Action, added: bool, with_collection: bool = True) -> Action:
+        """Run the write `action` with the upkeep of the collection and the query generation,
+        in one transaction, the hash models have no indexes."""
+        ops = generation.generation_ops(self)
+        if with_collection:
+            ops = collection.collection_ops(self, added) + ops
+        if not ops:
+            return action
+        adaptor = self.__redis_adaptor__
+        return Action.transaction(
+            [action, *ops],
+            runtime_mode=adaptor.runtime_mode,
+            client=adaptor.proxy,
+            result_from_index=0
+        )
 
     @classmethod
     def _hash_field(cls, value: Any = None):
-        hash_fields = cls.__model_meta__.hash_field
-        field_name = list(hash_fields.keys())[0]
-        return field_name, value
+        return cls.__model_meta__.accessors.hash_field, value
 
     @property
     def hash_field(self):
-        field_name, _ = self._hash_field()
-        return field_name, getattr(self, field_name)
+        accessors = self.__model_meta__.accessors
+        return accessors.hash_field, accessors.hash_getter(self)
@@ -7,6 +7,7 @@ from ..utils.action import Action
 
 class HyperLogLog(BaseRedisModel):
     __redis_type__ = 'hyper_log_log'
+    __abstract__ = True
 
     def add(self, *elements: Any) -> int:
         if not elements:
@@ -0,0 +1,39 @@
+from .secondary import (
+    FieldIndex,
+    SecondaryIndex,
+    field_indexes,
+    model_indexes,
+    tracked_fields,
+    stored_tokens,
+    index_ops
+)
+from .range_index import (
+    RangeIndex,
+    check_range_indexes,
+    model_range_indexes,
+    range_index_ops
+)
+from .prefix_index import (
+    PrefixIndex,
+    member_pk,
+    model_prefix_indexes,
+    prefix_index_ops
+)
+
+__all__ = (
+    'FieldIndex',
+    'SecondaryIndex',
+    'field_indexes',
+    'model_indexes',
+    'tracked_fields',
+    'stored_tokens',
+    'index_ops',
+    'RangeIndex',
+    'check_range_indexes',
+    'model_range_indexes',
+    'range_index_ops',
+    'PrefixIndex',
+    'member_pk',
+    'model_prefix_indexes',
+    'prefix_index_ops'
+)
@@ -0,0 +1,96 @@
+"""Prefix indexes of the `fields(prefix_index=True)` fields.
+
+Every prefix indexed field of a string model owns one sorted set, all its
+members have the score 0 and are the value and the pk joined by a NUL byte,
+so they are ordered by value and ZRANGEBYLEX reads the values of a prefix:
+
+    User:idx:__prefix__:name -> {'alice\\x001', 'albert\\x007'}
+
+With `fields(prefix_index=True, prefix_casefold=True)` the values are
+casefolded first, the `startswith` queries then ignore the case.
+
+`save()` adds the member of the current value and `delete()` removes it, in the
+same transaction as the write, the member of the stored value is removed when
+the value changed (see `models.indexes.secondary`).
+The queries read the pks of a prefix with ZRANGEBYLEX, see `core.query`.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Type, TYPE_CHECKING
+from ...utils.action import Action
+from .secondary import FieldIndex, field_indexes
+
+if TYPE_CHECKING:
+    from ..redis_model import BaseRedisModel
+
+_separator = '\x00'
+
+
+@dataclass(frozen=True)
+class PrefixIndex(FieldIndex):
+    @property
+    def casefold(self) -> bool:
+        return self.field_info[self.field].prefix_casefold
+
+    def fold(self, text: str) -> str:
+        return text.casefold() if self.casefold else text
+
+    def member(self, token: Optional[str], pk: str) -> Optional[str]:
+        """The member of a value token, None values are not indexed."""
+        if token is None:
+            return None
+        return f"{self.fold(token)}{_separator}{pk}"
+
+    def bounds(self, prefix: str) -> Tuple[bytes, bytes]:
+        """The (min, max) arguments of ZRANGEBYLEX for the values starting with `prefix`."""
+        start = self.fold(prefix).encode('utf-8')
+        # 0xff never appears in utf-8, it is above every continuation of the prefix
+        return b'[' + start, b'[' + start + b'\xff'
+
+    def key(self, model_cls: Type['BaseRedisModel']) -> str:
+        return model_cls.__key_builder__.index_key(
+            model=model_cls,
+            shard_tags=list(model_cls.__model_meta__.shard_tags),
+            # the marker comes before the field: `idx:<field>:<value>` is the set of a value
+            index_fields=['__prefix__', self.field],
+            index_values=[],
+            pk=None,
+            index_fields_info=[{}, self.field_info]
+        )
+
+
+def member_pk(member) -> str:
+    """The pk of a member of a prefix index."""
+    if isinstance(member, bytes):
+        member = member.decode('utf-8')
+    return member.rpartition(_separator)[2]
+
+
+@lru_cache(maxsize=None)
+def model_prefix_indexes(model_cls: Type['BaseRedisModel']) -> Tuple[PrefixIndex, ...]:
+    """The maintained prefix indexes of a model, empty for the models other than string."""
+    meta = model_cls.__model_meta__
+    return field_indexes(model_cls, meta.prefix_indexes if meta else (), PrefixIndex)
+
+
+def prefix_index_ops(instance: 'BaseRedisModel', added: bool, stored: Dict[str, Optional[str]]) -> List[Action]:
+    """The commands adding (or removing) the members of the values of `instance`.
+
+    The member of the stored value (`stored_tokens`) is removed when the value changed.
+    """
+    model_cls = type(instance)
+    indexes = model_prefix_indexes(model_cls)
+    if not indexes:
+        return []
+    proxy = model_cls.__redis_adaptor__.proxy
+    pk = str(instance.__model_meta__.accessors.pk_getter(instance))
+    ops = []
+    for index in indexes:
+        key = index.key(model_cls)
+        member = index.member(index.token(getattr(instance, index.field, None)), pk)
+        stale = index.member(stored.get(index.field), pk)
+        if stale is not None and stale != member:
+            ops.append(proxy.zrem(key, stale))
+        if member is not None:
+            ops.append(proxy.zadd(key, {member: 0}) if added else proxy.zrem(key, member))
+    return ops
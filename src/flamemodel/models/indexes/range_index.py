@@ -0,0 +1,106 @@
+"""Range indexes of the `fields(range_index=True)` fields.
+
+Every range indexed field of a string model owns one sorted set, the members
+are the pks and the scores are the values of the field:
+
+    Product:idx:price -> {'1': 9.5, '7': 20.0}
+
+`save()` sets the score of the pk (ZADD replaces the previous one, no stale
+entry is left), `incr_field()` moves it with ZINCRBY and `delete()` removes it,
+in the same transaction as the write.
+The queries read the pks of a range of values with ZRANGEBYSCORE, already
+ordered by the field, see `core.query`.
+
+The values must be numbers, booleans, dates or datetimes (scored by their
+timestamp), None values are not indexed. The type of the field is checked when
+the model class is created.
+"""
+import datetime
+import decimal
+import types
+import typing
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Type, TYPE_CHECKING
+from ...exceptions import RangeIndexNotSupportedError
+from ...utils.action import Action
+from ..metadata import model_fields_metadata
+from .secondary import FieldIndex, field_indexes
+
+if TYPE_CHECKING:
+    from ..redis_model import BaseRedisModel
+
+
+@dataclass(frozen=True)
+class RangeIndex(FieldIndex):
+    def score(self, value: Any) -> Optional[float]:
+        """The score of a value, None values are not indexed."""
+        if value is None:
+            return None
+        if isinstance(value, datetime.datetime):
+            return value.timestamp()
+        if isinstance(value, datetime.date):
+            return datetime.datetime.combine(value, datetime.time()).timestamp()
+        return float(value)
+
+    def key(self, model_cls: Type['BaseRedisModel']) -> str:
+        return model_cls.__key_builder__.index_key(
+            model=model_cls,
+            shard_tags=list(model_cls.__model_meta__.shard_tags),
+            index_fields=[self.field],
+            index_values=[],
+            pk=None,
+            index_fields_info=[self.field_info]
+        )
+
+
+_scored_types = (int, float, decimal.Decimal, datetime.date)
+
+
+def check_range_indexes(model_cls: Type['BaseRedisModel']):
+    """Validate the types of the range indexed fields when the model class is created."""
+    for name, meta in model_fields_metadata(model_cls).items():
+        if meta is None or not meta.range_index:
+            continue
+        annotation = model_cls.model_fields[name].annotation
+        if not _scored(annotation):
+            raise RangeIndexNotSupportedError(
+                f"The range indexed field {name} of the model {model_cls.__name__} is {annotation}, "
+                "it must be a number, a bool, a date or a datetime."
+            )
+
+
+def _scored(annotation: Any) -> bool:
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        return _scored(typing.get_args(annotation)[0])
+    if origin is typing.Union or origin is types.UnionType:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return bool(args) and all(_scored(arg) for arg in args)
+    return isinstance(annotation, type) and issubclass(annotation, _scored_types)
+
+
+@lru_cache(maxsize=None)
+def model_range_indexes(model_cls: Type['BaseRedisModel']) -> Tuple[RangeIndex, ...]:
+    """The maintained range indexes of a model, empty for the models other than string."""
+    meta = model_cls.__model_meta__
+    return field_indexes(model_cls, meta.range_indexes if meta else (), RangeIndex)
+
+
+def range_index_ops(instance: 'BaseRedisModel', added: bool) -> List[Action]:
+    """The commands scoring (or removing) the pk of `instance` in the sorted sets of its values."""
+    model_cls = type(instance)
+    indexes = model_range_indexes(model_cls)
+    if not indexes:
+        return []
+    proxy = model_cls.__redis_adaptor__.proxy
+    member = str(instance.__model_meta__.accessors.pk_getter(instance))
+    ops = []
+    for index in indexes:
+        key = index.key(model_cls)
+        score = index.score(getattr(instance, index.field, None))
+        if added and score is not None:
+            ops.append(proxy.zadd(key, {member: score}))
+        else:
+            ops.append(proxy.zrem(key, member))
+    return ops
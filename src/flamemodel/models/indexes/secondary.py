@@ -0,0 +1,183 @@
+"""Set-based secondary indexes of the `fields(index=True)` fields.
+
+Every indexed field of a string model owns one set per value, holding the pks
+of the instances having that value (the key of `KeyBuilder.index_key`):
+
+    User:idx:city:Paris -> {'1', '7'}
+
+`save()` adds the pk to the sets of the current values and `delete()` removes
+it, in the same transaction as the write. The values stored before the write
+are read under WATCH first (see `models.unique.guarded_write`), so a changed
+value moves the pk from the set of the old value to the set of the new one,
+whether the instance was loaded or built from scratch.
+Entries left behind by writes which bypass the models (another client) are
+dropped by the queries reading them, see `core.query`.
+
+Only the string models (both storage modes) maintain their indexes, the other
+models don't own one key per pk.
+"""
+import json
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TYPE_CHECKING
+from pydantic import TypeAdapter
+from ...utils.action import Action
+from ...utils.logger import logger
+from ..field_storage import load_values
+
+if TYPE_CHECKING:
+    from ..redis_model import BaseRedisModel
+    from ..metadata import FieldMetaData
+
+
+@dataclass(frozen=True)
+class FieldIndex:
+    """An index over the values of one field."""
+    field: str
+    field_info: Dict[str, 'FieldMetaData'] = field(compare=False)
+    adapter: TypeAdapter = field(compare=False)
+
+    def token(self, value: Any) -> Optional[str]:
+        """The member of the key of a stored value, None values are not indexed."""
+        if value is None:
+            return None
+        return str(self.adapter.dump_python(value, mode='json'))
+
+    def lookup_token(self, value: Any) -> Optional[str]:
+        """The token of a value of a query condition, validated like the field."""
+        return self.token(self.adapter.validate_python(value))
+
+
+@dataclass(frozen=True)
+class SecondaryIndex(FieldIndex):
+    def key(self, model_cls: Type['BaseRedisModel'], token: str) -> str:
+        return model_cls.__key_builder__.index_key(
+            model=model_cls,
+            shard_tags=list(model_cls.__model_meta__.shard_tags),
+            index_fields=[self.field],
+            index_values=[token],
+            pk=None,
+            index_fields_info=[self.field_info]
+        )
+
+
+def field_indexes(
+        model_cls: Type['BaseRedisModel'],
+        items: Tuple[Dict[str, 'FieldMetaData'], ...],
+        index_cls: Type[FieldIndex]
+) -> Tuple[FieldIndex, ...]:
+    """Build the indexes of the metadata `items` of a model, none for the models other than string."""
+    if model_cls.__model_meta__ is None or model_cls.__redis_type__ != 'string':
+        return ()
+    indexes = []
+    for item in items:
+        (name, _), = item.items()
+        adapter = TypeAdapter(model_cls.model_fields[name].rebuild_annotation())
+        indexes.append(index_cls(field=name, field_info=item, adapter=adapter))
+    return tuple(indexes)
+
+
+@lru_cache(maxsize=None)
+def model_indexes(model_cls: Type['BaseRedisModel']) -> Tuple[SecondaryIndex, ...]:
+    """The maintained indexes of a model, empty for the models other than string."""
+    meta = model_cls.__model_meta__
+    return field_indexes(model_cls, meta.indexes if meta else (), SecondaryIndex)
+
+
+@lru_cache(maxsize=None)
+def tracked_fields(model_cls: Type['BaseRedisModel']) -> Tuple[FieldIndex, ...]:
+    """The fields whose stored values are read before a write: the indexed and the unique ones."""
+    meta = model_cls.__model_meta__
+    if meta is None:
+        return ()
+    items = {name: item for item in (*meta.indexes, *meta.prefix_indexes, *meta.unique_indexes) for name in item}
+    return field_indexes(model_cls, tuple({name: item[name]} for name, item in items.items()), FieldIndex)
+
+
+def stored_tokens(model_cls: Type['BaseRedisModel'], primary_key: str) -> Action:
+    """Read the tokens of the tracked fields of the stored instance, empty when there is none.
+
+    A stored value which is no longer a valid instance (an old shape, a value written
+    by another client) doesn't fail the write: the tracked fields are read from the
+    raw stored mapping one at a time, the ones which don't validate are left out.
+    """
+    proxy = model_cls.__redis_adaptor__.proxy
+    fields = tracked_fields(model_cls)
+    if model_cls.__storage_mode__ == 'fields':
+        names = [index.field for index in fields]
+
+        def _tokens(values):
+            try:
+                loaded = load_values(model_cls, names, values)
+            except ValueError:
+                loaded = {}
+                for name, value in zip(names, values):
+                    if value is not None:
+                        loaded.update(_load_field(model_cls, name, lambda: load_values(model_cls, [name], [value])))
+            return {index.field: index.token(loaded[index.field]) for index in fields if index.field in loaded}
+
+        return proxy.hmget(primary_key, names).then(_tokens)
+
+    def _tokens(value):
+        try:
+            stored = model_cls.__serializer__.deserialize(value, model_cls)
+        except (ValueError, TypeError):
+            return _mapping_tokens(model_cls, fields, value)
+        if stored is None:
+            return {}
+        return {index.field: index.token(getattr(stored, index.field, None)) for index in fields}
+
+    return proxy.get(primary_key).then(_tokens)
+
+
+def _mapping_tokens(model_cls: Type['BaseRedisModel'], fields: Tuple[FieldIndex, ...], value: Any) -> Dict[str, str]:
+    """The tokens of the tracked fields found in a stored blob which is not a valid instance."""
+    try:
+        data = json.loads(value)
+    except (ValueError, TypeError):
+        logger.warning(f"The stored value of a {model_cls.__name__} can't be decoded, its index entries are kept")
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    by_alias = getattr(model_cls.__serializer__, 'by_alias', False)
+    tokens = {}
+    for index in fields:
+        alias = model_cls.model_fields[index.field].alias
+        name = alias if by_alias and alias else index.field
+        if name in data:
+            loaded = _load_field(model_cls, index.field, lambda: {index.field: index.adapter.validate_python(data[name])})
+            if index.field in loaded:
+                tokens[index.field] = index.token(loaded[index.field])
+    return tokens
+
+
+def _load_field(model_cls: Type['BaseRedisModel'], name: str, load: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        return load()
+    except ValueError:
+        logger.warning(f"The stored {name} of a {model_cls.__name__} is not valid, its index entries are kept")
+        return {}
+
+
+def index_ops(instance: 'BaseRedisModel', added: bool, stored: Dict[str, Optional[str]]) -> List[Action]:
+    """The commands adding (or removing) the pk of `instance` to the sets of its values.
+
+    :param stored: the tokens of the values stored before the write (`stored_tokens`),
+        their entries are removed when the values changed.
+    """
+    model_cls = type(instance)
+    indexes = model_indexes(model_cls)
+    if not indexes:
+        return []
+    proxy = model_cls.__redis_adaptor__.proxy
+    member = str(instance.__model_meta__.accessors.pk_getter(instance))
+    ops = []
+    for index in indexes:
+        token = index.token(getattr(instance, index.field, None))
+        stale = stored.get(index.field)
+        if stale is not None and stale != token:
+            ops.append(proxy.srem(index.key(model_cls, stale), member))
+        if token is not None:
+            key = index.key(model_cls, token)
+            ops.append(proxy.sadd(key, member) if added else proxy.srem(key, member))
+    return ops
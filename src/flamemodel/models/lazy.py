@@ -0,0 +1,137 @@
+import json
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Type, TYPE_CHECKING, Union, overload
+
+if TYPE_CHECKING:
+    from .redis_model import BaseRedisModel
+
+RawValue = Union[bytes, str, Dict[str, Any]]
+
+
+class LazyModel:
+    """A thin proxy around one stored model element.
+
+    The raw value read from Redis is kept as-is and is only deserialized
+    the first time an attribute of the model is accessed.
+    `peek(field)` reads a single field straight from the stored JSON
+    without building the model, which is enough for most filters.
+
+    :param raw: the value exactly as it was returned by Redis.
+    :param model_cls: model class used to deserialize the value.
+    """
+    __slots__ = ('_raw', '_model_cls', '_instance', '_data')
+
+    def __init__(self, raw: RawValue, model_cls: Type['BaseRedisModel']):
+        self._raw = raw
+        self._model_cls = model_cls
+        self._instance = None
+        self._data = None
+
+    @property
+    def raw(self) -> RawValue:
+        return self._raw
+
+    @property
+    def is_resolved(self) -> bool:
+        return self._instance is not None
+
+    def resolve(self) -> 'BaseRedisModel':
+        """Deserialize the element (once) and return the model instance."""
+        if self._instance is None:
+            self._instance = self._model_cls.__serializer__.deserialize(self._raw, self._model_cls)
+        return self._instance
+
+    def peek(self, field_name: str, default: Any = None) -> Any:
+        """Return one field as stored, without validating the whole model.
+
+        The value is the JSON decoded value (e.g. datetimes are still strings),
+        when the stored value is not JSON the element is fully resolved instead.
+        """
+        if self._instance is not None:
+            return getattr(self._instance, field_name, default)
+        if self._data is None:
+            if isinstance(self._raw, dict):
+                self._data = self._raw
+            else:
+                try:
+                    self._data = json.loads(self._raw)
+                except (TypeError, ValueError):
+                    return getattr(self.resolve(), field_name, default)
+        return self._data.get(field_name, default)
+
+    def __getattr__(self, item):
+        return getattr(self.resolve(), item)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyModel):
+            other = other.resolve()
+        return self.resolve() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self._instance is None:
+            return f'<LazyModel model={self._model_cls.__name__} resolved=False>'
+        return f'<LazyModel {self._instance!r}>'
+
+
+class LazyModelList(Sequence):
+    """Sequence of `LazyModel` proxies built on top of the raw values.
+
+    `len()`, slicing and iteration never deserialize anything, an element is
+    parsed only when one of its attributes is used.
+
+    :param raws: raw values returned by Redis.
+    :param model_cls: model class used to deserialize the values.
+    """
+    __slots__ = ('_raws', '_model_cls', '_proxies')
+
+    def __init__(self, raws: Sequence[RawValue], model_cls: Type['BaseRedisModel']):
+        self._raws = raws if isinstance(raws, list) else list(raws)
+        self._model_cls = model_cls
+        self._proxies: Dict[int, LazyModel] = {}
+
+    @property
+    def raw_values(self) -> List[RawValue]:
+        return self._raws
+
+    @overload
+    def __getitem__(self, index: int) -> LazyModel: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> 'LazyModelList': ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LazyModelList(self._raws[index], self._model_cls)
+        length = len(self._raws)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(index)
+        proxy = self._proxies.get(index)
+        if proxy is None:
+            proxy = self._proxies[index] = LazyModel(self._raws[index], self._model_cls)
+        return proxy
+
+    def __len__(self) -> int:
+        return len(self._raws)
+
+    def __iter__(self) -> Iterator[LazyModel]:
+        for i in range(len(self._raws)):
+            yield self[i]
+
+    def materialize(self) -> List['BaseRedisModel']:
+        """Resolve every element and return a plain list of models."""
+        return [proxy.resolve() for proxy in self]
+
+    def __repr__(self):
+        return f'<LazyModelList model={self._model_cls.__name__} size={len(self._raws)}>'
+
+
+def lazy_or_eager(raws: Optional[Sequence[RawValue]], model_cls: Type['BaseRedisModel'], lazy: bool):
+    """Build the collection read result, lazily or fully deserialized."""
+    raws = raws or []
+    if lazy:
+        return LazyModelList(raws, model_cls)
+    deserialize = model_cls.__serializer__.deserialize
+    return [deserialize(i, model_cls) for i in raws]
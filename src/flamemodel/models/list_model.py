@@ -1,10 +1,12 @@
 from .redis_model import BaseRedisModel
+from .lazy import lazy_or_eager
 from ..d_type import SelfInstance
 from typing import Literal, Any, List as TypingList
 
 
 class List(BaseRedisModel):
     __redis_type__ = 'list'
+    __abstract__ = True
 
     @classmethod
     def left_pop(cls, pk: Any) -> SelfInstance:
@@ -43,14 +45,13 @@ class List(BaseRedisModel):
         return driver.ltrim(pk_key, 1, 0)
 
     @classmethod
-    def all(cls, pk: Any):
+    def all(cls, pk: Any, lazy: bool = False):
+        """Read the whole list, with `lazy=True` a `LazyModelList` is returned
+        and elements are only deserialized when they are used."""
         driver = cls.get_driver()
         pk_key = cls.primary_key(pk)
         return driver.lrange(pk_key, 0, -1).then(
-            lambda x: [
-                cls.__serializer__.deserialize(i, cls)
-                for i in x
-            ]
+            lambda x: lazy_or_eager(x, cls, lazy)
         )
 
     def remove_before(self):
@@ -75,15 +76,12 @@ class List(BaseRedisModel):
         pk, _ = self.pk_info()
         return self.len(pk)
 
-    def range(self, start_index: int, end_index: int) -> TypingList[SelfInstance]:
+    def range(self, start_index: int, end_index: int, lazy: bool = False) -> TypingList[SelfInstance]:
         driver = self.get_driver()
         pk_key = self.get_primary_key()
         results = driver.lrange(pk_key, start_index, end_index)
         return results.then(
-            lambda x: [
-                self.__serializer__.deserialize(r, self.__class__)
-                for r in x
-            ]
+            lambda x: lazy_or_eager(x, self.__class__, lazy)
         )
 
     def _save(self, pos: Literal['left', 'right']):
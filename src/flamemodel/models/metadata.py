@@ -1,7 +1,13 @@
 import copy
+from operator import attrgetter
 from .foreign import ForeignKey
 from dataclasses import dataclass
-from typing import Optional, Callable, Any, List, Dict, Tuple
+from pydantic.fields import FieldInfo
+from typing import Optional, Callable, Any, List, Dict, Tuple, Type, TYPE_CHECKING
+from ..constant import FlameModelJsonSchemaKey
+
+if TYPE_CHECKING:
+    from .redis_model import BaseRedisModel
 
 
 class MetadataMinix:
@@ -22,6 +28,12 @@ class FieldMetaData(MetadataMinix):
     shard_tag: bool = False
     foreign_key: Optional[ForeignKey] = None
     index: bool = False
+    # sorted set of the numeric (or datetime) values, for range queries
+    range_index: bool = False
+    # zero score sorted set of the string values, for prefix queries
+    prefix_index: bool = False
+    # the prefix index compares the casefolded values
+    prefix_casefold: bool = False
     unique: bool = False
     serializer: Optional[Callable[[Any], str]] = None
     deserializer: Optional[Callable[[str], Any]] = None
@@ -36,6 +48,28 @@ class FieldMetaData(MetadataMinix):
     entry: bool = False
 
 
+def get_field_metadata(field_info: FieldInfo) -> Optional[FieldMetaData]:
+    """Read the FieldMetaData that `fields()` attached to the pydantic FieldInfo."""
+    for item in field_info.metadata:
+        if isinstance(item, FieldMetaData):
+            return item
+    # fields created before the metadata was kept on FieldInfo, only in json_schema_extra
+    extra = field_info.json_schema_extra
+    if callable(extra):
+        schema = {}
+        extra(schema)
+        return schema.get(FlameModelJsonSchemaKey)
+    return None
+
+
+def model_fields_metadata(model_cls: Type['BaseRedisModel']) -> Dict[str, Optional[FieldMetaData]]:
+    """Field name -> FieldMetaData of a model, None for the fields not declared with `fields()`."""
+    return {
+        name: get_field_metadata(field_info)
+        for name, field_info in model_cls.model_fields.items()
+    }
+
+
 @dataclass
 class ModelMetadata(MetadataMinix):
     fields: Tuple[Dict[str, FieldMetaData]]
@@ -50,3 +84,81 @@ class ModelMetadata(MetadataMinix):
     lat_field: Dict[str, FieldMetaData]
     flags: Tuple[Dict[str, FieldMetaData]]
     entry_field: Dict[str, FieldMetaData]
+    range_indexes: Tuple[Dict[str, FieldMetaData]] = ()
+    prefix_indexes: Tuple[Dict[str, FieldMetaData]] = ()
+    accessors: Optional['ModelAccessors'] = None
+
+    def __post_init__(self):
+        if self.accessors is None:
+            self.accessors = ModelAccessors.from_metadata(self)
+
+
+def _field_name(item: Optional[Dict[str, FieldMetaData]]) -> Optional[str]:
+    if not item:
+        return None
+    return next(iter(item))
+
+
+def _getter(name: Optional[str]) -> Optional[attrgetter]:
+    return attrgetter(name) if name else None
+
+
+def _tuple_getter(names: List[str]) -> Callable[[Any], Tuple[Any, ...]]:
+    # attrgetter with only one name doesn't return a tuple
+    if len(names) == 1:
+        getter = attrgetter(names[0])
+        return lambda obj: (getter(obj),)
+    return attrgetter(*names)
+
+
+@dataclass(frozen=True)
+class ModelAccessors:
+    """Field names and getters of the special fields, computed once from the metadata
+    so the models don't extract them from the single-entry dicts on every call."""
+    pk_field: Optional[str] = None
+    pk_getter: Optional[attrgetter] = None
+    hash_field: Optional[str] = None
+    hash_getter: Optional[attrgetter] = None
+    score_field: Optional[str] = None
+    score_getter: Optional[attrgetter] = None
+    entry_field: Optional[str] = None
+    # (member, longitude, latitude)
+    geo_fields: Optional[Tuple[str, str, str]] = None
+    # returns (longitude, latitude, member)
+    geo_getter: Optional[attrgetter] = None
+    # ((field name, offset), ...) sorted by offset
+    bitmap_offsets: Tuple[Tuple[str, int], ...] = ()
+    bitmap_getter: Optional[Callable[[Any], Tuple[Any, ...]]] = None
+
+    @classmethod
+    def from_metadata(cls, meta: 'ModelMetadata') -> 'ModelAccessors':
+        pk_field = _field_name(meta.pk_info)
+        hash_field = _field_name(meta.hash_field)
+        score_field = _field_name(meta.score_field)
+        geo_fields = None
+        geo_getter = None
+        if meta.member_field and meta.lng_field and meta.lat_field:
+            geo_fields = (_field_name(meta.member_field), _field_name(meta.lng_field), _field_name(meta.lat_field))
+            member, lng, lat = geo_fields
+            geo_getter = attrgetter(lng, lat, member)
+        bitmap_offsets = tuple(
+            (name, field_meta.flag)
+            for flag in meta.flags or ()
+            for name, field_meta in flag.items()
+        )
+        bitmap_getter = None
+        if bitmap_offsets:
+            bitmap_getter = _tuple_getter([name for name, _ in bitmap_offsets])
+        return cls(
+            pk_field=pk_field,
+            pk_getter=_getter(pk_field),
+            hash_field=hash_field,
+            hash_getter=_getter(hash_field),
+            score_field=score_field,
+            score_getter=_getter(score_field),
+            entry_field=_field_name(meta.entry_field),
+            geo_fields=geo_fields,
+            geo_getter=geo_getter,
+            bitmap_offsets=bitmap_offsets,
+            bitmap_getter=bitmap_getter
+        )
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import ClassVar, Any, Optional
+from pydantic import BaseModel, PrivateAttr
+from typing import ClassVar, Any, Optional, Iterable, List, Union, Callable, Tuple
 from ..adaptor.interface import RedisAdaptor
 from ..exceptions import (
     model_repeat_set_check,
@@ -7,23 +7,56 @@ from ..exceptions import (
     RepeatedSetModelMetadataError,
     RepeatedSetKeyBuilderError,
     RepeatedSetSerializerError,
+    StorageModeNotSupportedError,
+    FieldNotFoundError,
+    PartialModelError,
+    IncrNotSupportedError,
 )
 from .metadata import ModelMetadata
-from ..d_type import SelfInstance, RedisDataType
+from .repository import RedisModelRepository, lazy_model_metadata
+from .field_storage import dump_fields, load_fields, load_partial
+from . import collection, generation, indexes, scan, unique
+from ..d_type import SelfInstance, RedisDataType, StorageMode, CollectionType
 from ..core.key_builder import KeyBuilderProtocol
 from ..core.serializer import SerializerProtocol
+from ..utils.action import Action
 
 
 class BaseRedisModel(BaseModel):
     __redis_type__: ClassVar[RedisDataType]
     __key_pattern__: ClassVar[str]
     __schema__: ClassVar[Optional[str]] = None
+    # 'fields' stores every model field as a hash field, only for standalone(string) models
+    __storage_mode__: ClassVar[StorageMode] = 'blob'
+    # opt-in membership index of the saved pks, see `models.collection`
+    __collection__: ClassVar[Optional[CollectionType]] = None
+    # opt-in generation marker bumped by the writes, for the query cache, see `models.generation`
+    __query_cache__: ClassVar[bool] = False
+    # abstract models are neither registered nor parsed, only read from the class body
+    __abstract__: ClassVar[bool] = True
 
     # the app will set value for them, can't repeat set it
     __redis_adaptor__: ClassVar[Optional[RedisAdaptor]] = None
-    __model_meta__: ClassVar[Optional[ModelMetadata]] = None
+    # parsed on first use, see `LazyModelMetadata`
+    __model_meta__: ClassVar[Optional[ModelMetadata]] = lazy_model_metadata
     __key_builder__: ClassVar[Optional[KeyBuilderProtocol]] = None
     __serializer__: ClassVar[Optional[SerializerProtocol]] = None
+    # (model, key builder, metadata, compiled function), rebuilt when one of them changes
+    __primary_key_func__: ClassVar[Optional[Tuple[type, Any, Any, Callable[[Any], str]]]] = None
+
+    # read with `get(pk, only=...)`, the fields which were not read hold their defaults
+    _partial: bool = PrivateAttr(default=False)
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any):
+        super().__pydantic_init_subclass__(**kwargs)
+        if '__model_meta__' not in cls.__dict__:
+            # own descriptor, so the metadata of a parent class is never inherited
+            type.__setattr__(cls, '__model_meta__', lazy_model_metadata)
+        if not cls.__dict__.get('__abstract__', False):
+            collection.check_collection(cls)
+            indexes.check_range_indexes(cls)
+            RedisModelRepository().add_model(cls.__schema__ or cls.__name__, cls)
 
     @classmethod
     def set_redis_adaptor(cls, adaptor: RedisAdaptor):
@@ -50,35 +83,163 @@ class BaseRedisModel(BaseModel):
         return cls.__redis_adaptor__.get_redis_driver(cls.__redis_type__)
 
     @classmethod
-    def get(cls, pk: Any) -> SelfInstance:
-        driver = cls.get_driver()
+    def get(cls, pk: Any, only: Optional[Iterable[str]] = None) -> SelfInstance:
+        """Load the model by pk.
+
+        :param only: field names to read, only supported by the `fields` storage mode,
+            the result is a partial model which has only these fields set.
+        """
         primary_key = cls.primary_key(pk)
+        if cls.__storage_mode__ == 'fields':
+            driver = cls._fields_driver()
+            if only:
+                names = cls._check_fields(only)
+                return driver.hmget(primary_key, names).then(
+                    lambda x: load_partial(cls, names, x, pk)
+                )
+            return driver.hgetall(primary_key).then(lambda x: load_fields(cls, x))
+        if only:
+            raise StorageModeNotSupportedError(
+                f"The model {cls.__name__} is stored as one value, "
+                "partial reads need `__storage_mode__ = 'fields'`."
+            )
+        driver = cls.get_driver()
         result = driver.get(primary_key)
-        return result.then(
-            lambda x: cls.__serializer__.deserialize(x, cls)
-        )
+        return result.then(lambda x: cls.__serializer__.deserialize(x, cls))
 
-    def delete(self):
+    def delete(self, unlink: bool = False):
+        """Delete the instance, with UNLINK the memory is freed in a background thread."""
         driver = self.get_driver()
-        return driver.delete(self.get_primary_key())
+        key = self.get_primary_key()
+        return self._track_write(driver.unlink(key) if unlink else driver.delete(key), added=False)
 
     def expire(self, ttl: int):
         driver = self.get_driver()
         return driver.expire(key=self.get_primary_key(), ttl=ttl)
 
     def save(self) -> SelfInstance:
-        driver = self.get_driver()
-        value = self.__serializer__.serialize(self)
-        return driver.commit(key=self.get_primary_key(), value=value)
+        self._check_complete()
+        if self.__storage_mode__ == 'fields':
+            driver = self._fields_driver()
+            action = driver.hmset(self.get_primary_key(), dump_fields(self))
+        else:
+            driver = self.get_driver()
+            value = self.__serializer__.serialize(self)
+            action = driver.commit(key=self.get_primary_key(), value=value)
+        return self._track_write(action, added=True)
+
+    def update(self, **changes: Any):
+        """Validate and apply `changes` to this instance and persist them.
+
+        In the `fields` storage mode only the changed fields are written,
+        otherwise the whole model is saved again.
+        """
+        self._check_complete()
+        names = self._check_fields(changes)
+        for name, value in changes.items():
+            self.__pydantic_validator__.validate_assignment(self, name, value)
+        if self.__storage_mode__ != 'fields':
+            return self.save()
+        driver = self._fields_driver()
+        action = driver.hmset(self.get_primary_key(), dump_fields(self, names))
+        return self._track_write(action, added=True, with_collection=False)
+
+    def incr_field(self, field_name: str, amount: Union[int, float] = 1):
+        """Increase a numeric field in place(HINCRBY/HINCRBYFLOAT), `fields` storage mode only.
+
+        The range index of the field (ZINCRBY) and the query generation are kept up
+        to date in the same transaction, the indexed, prefix indexed and unique
+        fields can't be increased in place.
+        """
+        def _final_handler(r):
+            self.__pydantic_validator__.validate_assignment(self, field_name, r)
+            return getattr(self, field_name)
+
+        if self.__storage_mode__ != 'fields':
+            raise StorageModeNotSupportedError(
+                f"The model {self.__class__.__name__} is stored as one value, "
+                "incr_field need `__storage_mode__ = 'fields'`."
+            )
+        self._check_fields([field_name])
+        model_cls = type(self)
+        if any(index.field == field_name for index in indexes.tracked_fields(model_cls)):
+            raise IncrNotSupportedError(
+                f"The field {field_name} of the model {model_cls.__name__} is indexed, "
+                "change it with `update()` so its index entries are moved."
+            )
+        driver = self._fields_driver()
+        pk = self.get_primary_key()
+        if isinstance(amount, float) or isinstance(getattr(self, field_name), float):
+            act = driver.hincrbyfloat(pk, field_name, amount)
+        else:
+            act = driver.hincrby(pk, field_name, amount)
+        adaptor = self.__redis_adaptor__
+        member = str(self.__model_meta__.accessors.pk_getter(self))
+        ops = [
+            *(adaptor.proxy.zincrby(index.key(model_cls), amount, member)
+              for index in indexes.model_range_indexes(model_cls) if index.field == field_name),
+            *generation.generation_ops(self)
+        ]
+        if ops:
+            act = Action.transaction(
+                [act, *ops],
+                runtime_mode=adaptor.runtime_mode,
+                client=adaptor.proxy,
+                result_from_index=0
+            )
+        return act.then(_final_handler)
 
     def ttl(self) -> int:
         driver = self.get_driver()
         return driver.ttl(self.get_primary_key())
 
     @classmethod
-    def keys(cls, pattern: str):
-        driver = cls.get_driver()
-        return driver.keys(cls.__key_pattern__)
+    def collection_key(cls) -> str:
+        """Key of the membership index of the model (`__collection__`)."""
+        return collection.collection_key(cls)
+
+    @classmethod
+    def count(cls):
+        """Number of saved instances, read from the collection."""
+        return collection.collection_count(cls)
+
+    @classmethod
+    def page(cls, cursor: int = 0, count: int = 100):
+        """One page of pks from the collection as (next cursor, pks), 0 is the cursor of the end."""
+        return collection.collection_page(cls, cursor, count)
+
+    @classmethod
+    def iter_pks(cls, batch_size: int = 100):
+        """Iterate over the pks of the collection page by page, an async iterator in async mode."""
+        return collection.iter_collection(cls, batch_size)
+
+    @classmethod
+    def scan_keys(cls, match: Optional[str] = None, count: int = 1000):
+        """Iterate over the keys with SCAN, the primary keys of the model when `match` is None.
+
+        An async iterator in async mode, see `models.scan`.
+        """
+        return scan.scan_keys(cls, match, count)
+
+    @classmethod
+    def scan_instances(cls, match: Optional[str] = None, count: int = 1000):
+        """Iterate over the stored instances with SCAN, read page by page in one round trip."""
+        return scan.scan_instances(cls, match, count)
+
+    @classmethod
+    def keys(cls, pattern: Optional[str] = None):
+        """Every key matching the glob `pattern` (the primary keys of the model by default).
+
+        Collected with SCAN, the server is never blocked like with KEYS, iterate
+        with `scan_keys` to avoid loading every key at once.
+        """
+        if cls.__redis_adaptor__.runtime_mode == 'sync':
+            return Action(runtime_mode='sync', executor=lambda: list(cls.scan_keys(pattern)))
+
+        async def _collect():
+            return [key async for key in cls.scan_keys(pattern)]
+
+        return Action(runtime_mode='async', executor=_collect)
 
     def __setitem__(self, key, value):
         if key == '__redis_adaptor__':
@@ -91,10 +252,66 @@ class BaseRedisModel(BaseModel):
             model_repeat_set_check(self, key, RepeatedSetSerializerError, SerializerProtocol)
         super().__setitem__(key, value)
 
+    def _track_write(self, action: Action, added: bool, with_collection: bool = True) -> Action:
+        """Run the write `action` with the upkeep of the collection, the indexes, the
+        unique claims and the query generation, in one transaction.
+
+        The models with indexed or unique fields read the values stored before the
+        write under WATCH first, see `models.unique.guarded_write`.
+        The result of `action` is kept as the result.
+        """
+        def _ops(stored):
+            ops = [
+                *indexes.index_ops(self, added, stored),
+                *indexes.range_index_ops(self, added),
+                *indexes.prefix_index_ops(self, added, stored),
+                *generation.generation_ops(self)
+            ]
+            if with_collection:
+                ops = collection.collection_ops(self, added) + ops
+            return ops
+
+        if indexes.tracked_fields(type(self)):
+            return unique.guarded_write(self, action, added, _ops)
+        ops = _ops({})
+        if not ops:
+            return action
+        adaptor = self.__redis_adaptor__
+        return Action.transaction(
+            [action, *ops],
+            runtime_mode=adaptor.runtime_mode,
+            client=adaptor.proxy,
+            result_from_index=0
+        )
+
+    def _check_complete(self):
+        if self._partial:
+            raise PartialModelError(
+                f"The instance of {self.__class__.__name__} was partially read, "
+                "read it whole with `get(pk)` before saving it."
+            )
+
+    @classmethod
+    def _fields_driver(cls):
+        if cls.__redis_adaptor__ is None:
+            raise RuntimeError("RedisAdaptor has not been set. Call BaseRedisModel.set_redis_adaptor() first.")
+        return cls.__redis_adaptor__.get_redis_driver('hash')
+
+    @classmethod
+    def _check_fields(cls, names: Iterable[str]) -> List[str]:
+        names = list(names)
+        for name in names:
+            if name not in cls.model_fields:
+                raise FieldNotFoundError(
+                    f"The field {name} doesn't exist in the model {cls.__name__}.",
+                    model_cls=cls,
+                    field_name=name
+                )
+        return names
+
     def pk_info(self):
-        pk_field = self.__model_meta__.pk_info
-        pk_field_name = list(pk_field.keys()).pop()
-        return getattr(self, pk_field_name), pk_field_name
+        accessors = self.__model_meta__.accessors
+        return accessors.pk_getter(self), accessors.pk_field
 
     def get_primary_key(self) -> str:
         """Get the primary key for this model instance.
@@ -133,14 +350,44 @@ class BaseRedisModel(BaseModel):
                 "pk parameter is required for class-level primary_key() calls. "
                 "For instance-level, use instance.get_primary_key() instead."
             )
-        # Get primary key metadata
-        pk_field_info = cls.__model_meta__.pk_info
-        pk_field_name = list(pk_field_info.keys())[0]
-        # Build and return the primary key
-        return cls.__key_builder__.primary_key(
-            model=cls,
-            shard_tags=cls.__model_meta__.shard_tags,
-            pk=pk,
-            pk_field_name=pk_field_name,
-            pk_field_info=pk_field_info
-        )
+        compiled = cls.__primary_key_func__
+        if (
+                compiled is None
+                or compiled[0] is not cls
+                or compiled[1] is not cls.__key_builder__
+                or compiled[2] is not cls.__model_meta__
+        ):
+            compiled = cls.compile_primary_key()
+        return compiled[3](pk)
+
+    @classmethod
+    def compile_primary_key(cls) -> Tuple[type, Any, Any, Callable[[Any], str]]:
+        """Build the primary key function of the model with the key builder.
+
+        It is called when the model is registered and again whenever the key builder
+        or the metadata of the model is replaced.
+        """
+        key_builder = cls.__key_builder__
+        meta = cls.__model_meta__
+        pk_field_info = meta.pk_info
+        pk_field_name = meta.accessors.pk_field
+        compile_primary_key = getattr(key_builder, 'compile_primary_key', None)
+        if compile_primary_key is not None:
+            func = compile_primary_key(
+                model=cls,
+                shard_tags=meta.shard_tags,
+                pk_field_name=pk_field_name,
+                pk_field_info=pk_field_info
+            )
+        else:
+            def func(pk):
+                return key_builder.primary_key(
+                    model=cls,
+                    shard_tags=meta.shard_tags,
+                    pk=pk,
+                    pk_field_name=pk_field_name,
+                    pk_field_info=pk_field_info
+                )
+        compiled = (cls, key_builder, meta, func)
+        cls.__primary_key_func__ = compiled
+        return compiled
@@ -1,35 +1,72 @@
+import threading
 from ..d_type import SingletonMeta
-from ..constant import (
-    StringModelDelimiter,
-    PydanticPropertyField,
-    FlameModelJsonSchemaKey
-)
+from functools import lru_cache
+from ..constant import StringModelDelimiter
 from ..exceptions import (
     ModelNotExistsError,
     FieldNotExistsError
 )
 from ..utils.logger import logger
-from typing import Dict, Type, TYPE_CHECKING
+from typing import Dict, List, Type, TYPE_CHECKING
 from ..utils.parse_model_metadata import parse_model_metadata
+from .metadata import get_field_metadata
 
 if TYPE_CHECKING:
     from .redis_model import BaseRedisModel
     from .fields import FieldMetaData
 
 
+class LazyModelMetadata:
+    """The `__model_meta__` of a model class, parsed the first time it is read.
+
+    Every model class gets this descriptor at creation, reading it parses the
+    metadata once (under a lock) and replaces the descriptor by the result on
+    that class, later reads are plain class attribute reads.
+    Abstract models (`__abstract__ = True` in their own body) have no metadata.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def __get__(self, instance, owner: Type['BaseRedisModel']):
+        if owner.__dict__.get('__abstract__', False):
+            return None
+        with self._lock:
+            current = owner.__dict__.get('__model_meta__', self)
+            if current is not self:
+                # parsed by another thread meanwhile, or set explicitly
+                return current
+            meta = parse_model_metadata(owner)
+            type.__setattr__(owner, '__model_meta__', meta)
+            return meta
+
+
+lazy_model_metadata = LazyModelMetadata()
+
+
 class RedisModelRepository(metaclass=SingletonMeta):
     def __init__(self):
         self._repo: Dict[str, Type['BaseRedisModel']] = {}
 
-    def register_model(self, model_name: str, model_cls: Type['BaseRedisModel']):
-        if model_name in self._repo:
+    def add_model(self, model_name: str, model_cls: Type['BaseRedisModel']):
+        """Record the model by name, its metadata is parsed on first use."""
+        if self._repo.get(model_name, model_cls) is not model_cls:
             logger.warning(
                 "The model name has been defined multiple times, "
                 f"model_name={model_name}"
             )
-        self._parse_model_metadata(model_cls)
         self._repo[model_name] = model_cls
 
+    def register_model(self, model_name: str, model_cls: Type['BaseRedisModel']):
+        """Record the model and parse/compile everything now, to warm up a process."""
+        self.add_model(model_name, model_cls)
+        self._parse_model_metadata(model_cls)
+        self._compile_model(model_cls)
+
+    def models(self) -> List[Type['BaseRedisModel']]:
+        """The recorded models, in the order they were defined."""
+        return list(self._repo.values())
+
     def parse_model_string(self, model_type: str):
         field_info = None
         if StringModelDelimiter in model_type:
@@ -55,20 +92,28 @@ class RedisModelRepository(metaclass=SingletonMeta):
         return self._repo.get(model)
 
     @classmethod
+    @lru_cache(maxsize=None)
     def _get_field_info(cls, model_cls: Type['BaseRedisModel'], field: str) -> 'FieldMetaData':
-        model_json_schema = model_cls.model_json_schema()
-        fields = model_json_schema[PydanticPropertyField]
+        fields = model_cls.model_fields
         if field not in fields:
             raise FieldNotExistsError(
                 f"The fields is not in model of {model_cls.__name__}, "
                 "check is it defined, "
                 f"field_name={field}",
                 field_name=field,
-                fields=fields
+                fields=list(fields)
             )
-        field_json_schema = fields[field]
-        return field_json_schema[FlameModelJsonSchemaKey]
+        return get_field_metadata(fields[field])
 
     @classmethod
     def _parse_model_metadata(cls, model_cls: Type['BaseRedisModel']):
         model_cls.__model_meta__ = parse_model_metadata(model_cls)
+
+    @classmethod
+    def _compile_model(cls, model_cls: Type['BaseRedisModel']):
+        # serializers may precompile per-model code, the hook is optional
+        compile_model = getattr(model_cls.__serializer__, 'compile_model', None)
+        if compile_model is not None:
+            compile_model(model_cls, model_cls.__model_meta__)
+        if model_cls.__key_builder__ is not None:
+            model_cls.compile_primary_key()
@@ -0,0 +1,258 @@
+"""Iterate over the keys and the instances of a model with SCAN.
+
+Unlike KEYS, SCAN walks the keyspace in small steps and never blocks the
+server. On Redis Cluster every primary is scanned, the pages of all the
+primaries are requested in parallel (threads in sync mode, tasks in async mode).
+
+    for key in User.scan_keys():                  # `async for` in async mode
+        ...
+    for user in User.scan_instances(count=500):
+        ...
+
+Without `match` only the primary keys of the model are returned, the glob of
+the key builder also matches its index/relation keys and the keys of models
+sharing the prefix, they are dropped with a `KeyResolver`. With an explicit
+`match` every matching key is returned.
+The instances of a page are read in one round trip: one MGET for the string
+models, a pipeline of HGETALL for the `fields` storage mode and the hash models.
+SCAN may return a key more than once, `scan_instances` yields every instance once.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Set, Type, TYPE_CHECKING
+from ..core.key_builder.resolver import KeyResolver
+from ..exceptions import ScanNotSupportedError
+from ..utils.action import Action
+from .field_storage import load_fields
+
+if TYPE_CHECKING:
+    from .redis_model import BaseRedisModel
+
+# redis type of the primary keys, for the TYPE option of SCAN
+_key_types = {
+    'string': 'string',
+    'hash': 'hash',
+    'list': 'list',
+    'set': 'set',
+    'zset': 'zset',
+    'geo': 'zset',
+    'bitmap': 'string',
+    'hyper_log_log': 'string',
+    'stream': 'stream',
+}
+
+
+class KeyScanner:
+    """Pages of keys of one SCAN over the whole keyspace (every primary on a cluster).
+
+    :param model_cls: the scanned model.
+    :param match: glob of the keys, the primary keys of the model when None.
+    :param count: COUNT hint of SCAN, the size of the pages of each node.
+    """
+
+    def __init__(self, model_cls: Type['BaseRedisModel'], match: Optional[str] = None, count: int = 1000):
+        adaptor = model_cls.__redis_adaptor__
+        self.client = adaptor.proxy._client
+        self._proxy = adaptor.proxy
+        self.is_cluster = adaptor.is_cluster
+        self.runtime_mode = adaptor.runtime_mode
+        self.resolver = None
+        if match is None:
+            key_builder = model_cls.__key_builder__
+            match = key_builder.key_pattern(model=model_cls, pattern_type='primary')
+            self.resolver = KeyResolver(key_builder, [model_cls])
+            self.type_ = _key_type(model_cls)
+        else:
+            self.type_ = None
+        self.match = match
+        self.count = count
+
+    def pages(self):
+        """Lists of keys, a generator in sync mode and an async generator in async mode."""
+        if self.runtime_mode == 'sync':
+            return self._cluster_pages_sync() if self.is_cluster else self._pages_sync()
+        return self._cluster_pages_async() if self.is_cluster else self._pages_async()
+
+    def nodes(self) -> List[Any]:
+        """The nodes to scan one by one with `page`, [None] for a standalone server."""
+        return list(self.client.get_primaries()) if self.is_cluster else [None]
+
+    def page(self, cursor: int = 0, node: Any = None) -> Action:
+        """One SCAN step of one node as (next cursor, keys), 0 is the cursor of the end.
+
+        The step form of `pages`, for the jobs driven by `utils.steps`.
+        """
+        proxy = self._proxy
+        if node is None:
+            return proxy.scan(cursor, **self._scan_kwargs()).then(
+                lambda r: (int(r[0]), self._filter(r[1]))
+            )
+        return proxy.scan(cursor, target_nodes=node, **self._scan_kwargs()).then(
+            lambda r: (int(r[0][node.name]), self._filter(r[1]))
+        )
+
+    def keys(self):
+        """Every key, a generator in sync mode and an async generator in async mode."""
+        if self.runtime_mode == 'sync':
+            return (key for page in self.pages() for key in page)
+        return self._keys_async()
+
+    # ===== Private Helper Methods =====
+
+    def _scan_kwargs(self):
+        return {'match': self.match, 'count': self.count, '_type': self.type_}
+
+    def _filter(self, keys: List[Any]) -> List[str]:
+        if self.resolver is not None:
+            return [parsed.key for parsed in self.resolver.parse_keys(keys) if parsed is not None]
+        return [key.decode('utf-8') if isinstance(key, bytes) else key for key in keys]
+
+    def _pages_sync(self):
+        cursor = 0
+        while True:
+            cursor, keys = self.client.scan(cursor, **self._scan_kwargs())
+            keys = self._filter(keys)
+            if keys:
+                yield keys
+            if not int(cursor):
+                return
+
+    async def _pages_async(self):
+        cursor = 0
+        while True:
+            cursor, keys = await self.client.scan(cursor, **self._scan_kwargs())
+            keys = self._filter(keys)
+            if keys:
+                yield keys
+            if not int(cursor):
+                return
+
+    def _scan_node_sync(self, node, cursor):
+        cursors, keys = self.client.scan(cursor, target_nodes=node, **self._scan_kwargs())
+        return cursors[node.name], keys
+
+    async def _scan_node_async(self, node, cursor):
+        cursors, keys = await self.client.scan(cursor, target_nodes=node, **self._scan_kwargs())
+        return cursors[node.name], keys
+
+    def _cluster_pages_sync(self):
+        cursors = {node: 0 for node in self.client.get_primaries()}
+        with ThreadPoolExecutor(max_workers=len(cursors) or 1) as pool:
+            while cursors:
+                futures = {node: pool.submit(self._scan_node_sync, node, cursor) for node, cursor in cursors.items()}
+                keys = []
+                for node, future in futures.items():
+                    cursor, node_keys = future.result()
+                    keys.extend(node_keys)
+                    cursors[node] = int(cursor)
+                cursors = {node: cursor for node, cursor in cursors.items() if cursor}
+                keys = self._filter(keys)
+                if keys:
+                    yield keys
+
+    async def _cluster_pages_async(self):
+        cursors = {node: 0 for node in self.client.get_primaries()}
+        while cursors:
+            nodes = list(cursors)
+            results = await asyncio.gather(*(self._scan_node_async(node, cursors[node]) for node in nodes))
+            keys = []
+            for node, (cursor, node_keys) in zip(nodes, results):
+                keys.extend(node_keys)
+                cursors[node] = int(cursor)
+            cursors = {node: cursor for node, cursor in cursors.items() if cursor}
+            keys = self._filter(keys)
+            if keys:
+                yield keys
+
+    async def _keys_async(self):
+        async for page in self.pages():
+            for key in page:
+                yield key
+
+
+def scan_keys(model_cls: Type['BaseRedisModel'], match: Optional[str] = None, count: int = 1000):
+    return KeyScanner(model_cls, match, count).keys()
+
+
+def scan_instances(model_cls: Type['BaseRedisModel'], match: Optional[str] = None, count: int = 1000):
+    if model_cls.__redis_type__ not in ('string', 'hash'):
+        raise ScanNotSupportedError(
+            f"The model {model_cls.__name__} is a {model_cls.__redis_type__} model, "
+            "only the instances of string and hash models can be scanned."
+        )
+    scanner = KeyScanner(model_cls, match, count)
+    if scanner.runtime_mode == 'sync':
+        return _instances_sync(model_cls, scanner)
+    return _instances_async(model_cls, scanner)
+
+
+def _instances_sync(model_cls: Type['BaseRedisModel'], scanner: KeyScanner):
+    seen = set()
+    for keys in scanner.pages():
+        keys = unseen_keys(keys, seen)
+        if keys:
+            yield from read_page(model_cls, keys, scanner.is_cluster).execute()
+
+
+async def _instances_async(model_cls: Type['BaseRedisModel'], scanner: KeyScanner):
+    seen = set()
+    async for keys in scanner.pages():
+        keys = unseen_keys(keys, seen)
+        if keys:
+            for instance in await read_page(model_cls, keys, scanner.is_cluster).execute():
+                yield instance
+
+
+def unseen_keys(keys: List[Any], seen: Set[Any]) -> List[Any]:
+    """The keys of a SCAN (or SSCAN) page not returned before in the same pass, added to `seen`."""
+    fresh = [key for key in dict.fromkeys(keys) if key not in seen]
+    seen.update(fresh)
+    return fresh
+
+
+def read_page(
+        model_cls: Type['BaseRedisModel'],
+        keys: List[str],
+        is_cluster: bool = False,
+        keep_missing: bool = False
+) -> Action:
+    """Read the instances stored at `keys` in one round trip.
+
+    :param keep_missing: missing keys are skipped, unless True, then the result
+        is aligned with `keys` with None for them (string models only).
+    """
+    adaptor = model_cls.__redis_adaptor__
+    proxy = adaptor.proxy
+    deserialize = model_cls.__serializer__.deserialize
+    if model_cls.__redis_type__ == 'hash':
+        return _pipeline(adaptor, [proxy.hgetall(key) for key in keys]).then(
+            lambda mappings: [
+                deserialize(value, model_cls)
+                for mapping in mappings if mapping
+                for value in mapping.values()
+            ]
+        )
+    if model_cls.__storage_mode__ == 'fields':
+        return _pipeline(adaptor, [proxy.hgetall(key) for key in keys]).then(
+            lambda mappings: [load_fields(model_cls, mapping) for mapping in mappings if mapping or keep_missing]
+        )
+    # MGET of keys of several slots is refused by a cluster
+    read = _pipeline(adaptor, [proxy.get(key) for key in keys]) if is_cluster else proxy.mget(keys)
+    return read.then(
+        lambda values: [deserialize(value, model_cls) for value in values if value is not None or keep_missing]
+    )
+
+
+def _pipeline(adaptor, actions: List[Action]) -> Action:
+    return Action.pipeline(
+        actions,
+        runtime_mode=adaptor.runtime_mode,
+        client=adaptor.proxy,
+        result_from_index=None
+    )
+
+
+def _key_type(model_cls: Type['BaseRedisModel']) -> Optional[str]:
+    if model_cls.__redis_type__ == 'string' and model_cls.__storage_mode__ == 'fields':
+        return 'hash'
+    return _key_types.get(model_cls.__redis_type__)
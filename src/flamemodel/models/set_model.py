@@ -5,6 +5,7 @@ from .redis_model import BaseRedisModel
 
 class Set(BaseRedisModel):
     __redis_type__ = 'set'
+    __abstract__ = True
 
     @classmethod
     def members(cls, pk: Any) -> TypingSet[SelfInstance]:
@@ -0,0 +1,101 @@
+"""Codec of the `Stream` entries.
+
+A stream entry is a flat mapping of field -> bytes, every model field is encoded
+by its annotated type: int, float and str are sent as they are, bool as 1/0,
+datetime/date/time in ISO format and everything else (nested models, lists...)
+as JSON. None values are not sent, the field falls back to its default on read.
+
+The encode/decode functions are generated once per model, decoding converts
+each field value in one pass and validates the model once.
+"""
+import json
+import types
+import datetime as dt
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Type, Union, get_args, get_origin, TYPE_CHECKING
+from pydantic import TypeAdapter
+
+if TYPE_CHECKING:
+    from .stream_model import Stream
+
+_scalar_types = (int, float, str)
+_iso_types = (dt.datetime, dt.date, dt.time)
+
+
+@dataclass(frozen=True)
+class StreamCodec:
+    encode: Callable[['Stream'], Dict[str, Any]]
+    decode: Callable[[Any, Any, Dict[Any, Any]], 'Stream']
+    source: str
+
+
+@lru_cache(maxsize=None)
+def stream_codec(model_cls: Type['Stream']) -> StreamCodec:
+    """Generate (once) the codec of a stream model."""
+    pk_field = model_cls.__model_meta__.accessors.pk_field
+    entry_field = model_cls._entry_id_field()
+    namespace = {
+        '_model_cls': model_cls,
+        '_decode_text': _decode_text,
+        '_json_loads': json.loads,
+        '_fields_names': {},
+    }
+    encode_lines = ['def encode(instance):', '    data = {}']
+    decode_lines = [
+        'def decode(pk, entry_id, fields):',
+        f'    data = {{{entry_field!r}: _decode_text(entry_id)}}',
+        '    if pk is not None:',
+        f'        data[{pk_field!r}] = pk',
+        '    for name, value in fields.items():',
+        '        name = _fields_names.get(name, name)',
+        '        if isinstance(name, bytes):',
+        "            name = name.decode('utf-8')",
+    ]
+    branch = 'if'
+    for i, (name, field_info) in enumerate(model_cls.model_fields.items()):
+        if name in (pk_field, entry_field):
+            continue
+        namespace['_fields_names'][name.encode('utf-8')] = name
+        kind = _unwrap_optional(field_info.annotation)
+        encode_lines.extend([f'    value = instance.{name}', '    if value is not None:'])
+        decode_lines.append(f'        {branch} name == {name!r}:')
+        branch = 'elif'
+        if kind is bool:
+            encode_lines.append(f"        data[{name!r}] = b'1' if value else b'0'")
+            decode_lines.append(f"            data[{name!r}] = value in (b'1', '1')")
+        elif kind in _scalar_types:
+            encode_lines.append(f'        data[{name!r}] = value')
+            if kind is str:
+                decode_lines.append(f'            data[{name!r}] = _decode_text(value)')
+            else:
+                decode_lines.append(f'            data[{name!r}] = {kind.__name__}(value)')
+        elif kind in _iso_types:
+            namespace[f'_from_iso_{i}'] = kind.fromisoformat
+            encode_lines.append(f'        data[{name!r}] = value.isoformat()')
+            decode_lines.append(f'            data[{name!r}] = _from_iso_{i}(_decode_text(value))')
+        else:
+            adapter = TypeAdapter(field_info.rebuild_annotation())
+            namespace[f'_dump_{i}'] = adapter.dump_json
+            encode_lines.append(f'        data[{name!r}] = _dump_{i}(value)')
+            decode_lines.append(f'            data[{name!r}] = _json_loads(value)')
+    encode_lines.append('    return data')
+    decode_lines.append('    return _model_cls.model_validate(data)')
+    source = '\n'.join(encode_lines) + '\n\n\n' + '\n'.join(decode_lines) + '\n'
+    exec(compile(source, f'<flamemodel stream codec {model_cls.__name__}>', 'exec'), namespace)
+    return StreamCodec(encode=namespace['encode'], decode=namespace['decode'], source=source)
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    origin = get_origin(annotation)
+    if origin is Union or origin is types.UnionType:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _decode_text(value: Optional[Union[bytes, str]]) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
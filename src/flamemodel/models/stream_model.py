@@ -1,17 +1,19 @@
 from typing import Any, List as TypingList, Optional, Dict, Tuple
 from .redis_model import BaseRedisModel
+from .stream_codec import stream_codec
 from ..d_type import SelfInstance
 
 
 class Stream(BaseRedisModel):
     __redis_type__ = 'stream'
+    __abstract__ = True
 
     @classmethod
     def _entry_id_field(cls) -> str:
-        entry_id_fields = cls.__model_meta__.entry_field
-        if not entry_id_fields:
+        entry_field = cls.__model_meta__.accessors.entry_field
+        if not entry_field:
             raise ValueError(f"Model {cls.__name__} has no entry_id_field defined")
-        return list(entry_id_fields.keys())[0]
+        return entry_field
 
     @property
     def entry_id_value(self) -> str:
@@ -32,8 +34,11 @@ class Stream(BaseRedisModel):
             parsed_results = {}
             if x:
                 for stream_key, messages in x:
+                    if isinstance(stream_key, bytes):
+                        stream_key = stream_key.decode('utf-8')
+                    pk = key_pks.get(stream_key)
                     parsed_messages = [
-                        (entry_id, cls._deserialize_from_dict(entry_id, fields))
+                        (entry_id, cls._deserialize_from_dict(entry_id, fields, pk))
                         for entry_id, fields in messages
                     ]
                     parsed_results[stream_key] = parsed_messages
@@ -41,6 +46,7 @@ class Stream(BaseRedisModel):
 
         driver = cls.get_driver()
         stream_keys = {cls.primary_key(pk): start_id for pk, start_id in streams.items()}
+        key_pks = {cls.primary_key(pk): pk for pk in streams}
         results = driver.xread(streams=stream_keys, count=count, block=block)
         return results.then(_final_handler)
 
@@ -52,7 +58,7 @@ class Stream(BaseRedisModel):
         results = driver.xrange(pk_key, start=start, end=end, count=count)
         return results.then(
             lambda x: [
-                (entry_id, cls._deserialize_from_dict(entry_id, fields))
+                (entry_id, cls._deserialize_from_dict(entry_id, fields, pk))
                 for entry_id, fields in x
             ]
         )
@@ -65,7 +71,7 @@ class Stream(BaseRedisModel):
         results = driver.xrevrange(pk_key, max=end, min=start, count=count)
         return results.then(
             lambda x: [
-                (entry_id, cls._deserialize_from_dict(entry_id, fields))
+                (entry_id, cls._deserialize_from_dict(entry_id, fields, pk))
                 for entry_id, fields in x
             ]
         )
@@ -112,23 +118,9 @@ class Stream(BaseRedisModel):
 
     @classmethod
     def _serialize_to_dict(cls, instance: SelfInstance) -> Dict[str, Any]:
-        fields = {}
-        pk_field_name = list(cls.__model_meta__.pk_info.keys())[0]
-        entry_id_field_name = cls._entry_id_field()
-        for field_name in instance.model_fields.keys():
-            if field_name in (pk_field_name, entry_id_field_name):
-                continue
-            value = getattr(instance, field_name)
-            fields[field_name] = value
-        return fields
+        """Encode the entry fields (pk and entry id excluded), see `stream_codec`."""
+        return stream_codec(cls).encode(instance)
 
     @classmethod
-    def _deserialize_from_dict(cls, entry_id: str, fields: Dict[str, Any]) -> SelfInstance:
-        data = {}
-        entry_id_field_name = cls._entry_id_field()
-        data[entry_id_field_name] = entry_id
-        for field_name, value in fields.items():
-            if isinstance(value, bytes):
-                value = value.decode('utf-8')
-            data[field_name] = cls.__serializer__.deserialize(value, cls)
-        return cls(**data)  # type: ignore
+    def _deserialize_from_dict(cls, entry_id: str, fields: Dict[str, Any], pk: Any = None) -> SelfInstance:
+        return stream_codec(cls).decode(pk, entry_id, fields)
@@ -3,6 +3,7 @@ from .redis_model import BaseRedisModel
 
 class String(BaseRedisModel):
     __redis_type__ = 'string'
+    __abstract__ = True
 
     def incr(self, amount: int = 1):
         driver = self.get_driver()
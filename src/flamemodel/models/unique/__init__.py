@@ -0,0 +1,11 @@
+from .constraint import (
+    UniqueIndex,
+    model_unique_indexes,
+    guarded_write
+)
+
+__all__ = (
+    'UniqueIndex',
+    'model_unique_indexes',
+    'guarded_write'
+)
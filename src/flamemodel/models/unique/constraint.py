@@ -0,0 +1,134 @@
+"""Unique constraints of the `fields(unique=True)` fields.
+
+Every value of a unique field of a string model is claimed by one key holding
+the pk of its owner (the key of `KeyBuilder.unique_key`):
+
+    User:uniq:email:a@x.com -> '42'
+
+`save()` checks and takes the claims of the instance atomically with the write:
+the claim keys and the primary key are WATCHed, the owners of the claims and
+the stored instance are read, then the write, the new claims and the release
+of the claims of the replaced values are queued in one MULTI. The whole is
+retried when one of the watched keys changed meanwhile. A value owned by
+another pk fails the save with `UniqueViolationError`, nothing is written then.
+`delete()` releases the claims of the instance.
+
+The same WATCHed read serves the indexes: every write of a model with indexed
+or unique fields reads the values stored before it, the index entries of the
+values it replaces are removed in the same MULTI.
+
+The claims are taken with WATCH/MULTI rather than a Lua script so they work on
+every server the adaptor supports, the watched keys must live on one node.
+
+An instance is found back by a unique value with two GETs, see `core.query`.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TYPE_CHECKING
+from dataclasses import dataclass
+from ...exceptions import UniqueViolationError
+from ...utils.action import Action
+from ..indexes import FieldIndex, field_indexes, stored_tokens
+
+if TYPE_CHECKING:
+    from ..redis_model import BaseRedisModel
+
+
+@dataclass(frozen=True)
+class UniqueIndex(FieldIndex):
+    def key(self, model_cls: Type['BaseRedisModel'], token: str) -> str:
+        return model_cls.__key_builder__.unique_key(
+            model=model_cls,
+            shard_tags=list(model_cls.__model_meta__.shard_tags),
+            unique_fields=[self.field],
+            unique_values=[token],
+            pk=None,
+            unique_fields_info=[self.field_info]
+        )
+
+
+@lru_cache(maxsize=None)
+def model_unique_indexes(model_cls: Type['BaseRedisModel']) -> Tuple[UniqueIndex, ...]:
+    """The enforced unique fields of a model, empty for the models other than string."""
+    meta = model_cls.__model_meta__
+    return field_indexes(model_cls, meta.unique_indexes if meta else (), UniqueIndex)
+
+
+def guarded_write(
+        instance: 'BaseRedisModel',
+        action: Action,
+        added: bool,
+        build_ops: Callable[[Dict[str, Optional[str]]], List[Action]]
+) -> Action:
+    """Run the write `action` with the upkeep of the unique claims and the indexes of `instance`.
+
+    The tokens of the values stored before the write (see `stored_tokens`) are
+    read under WATCH with the owners of the claims to take, `build_ops` gets
+    them and returns the other commands of the transaction (the indexes...).
+    The claims to release are the ones of the stored values.
+    The result of `action` is kept as the result.
+    """
+    model_cls = type(instance)
+    uniques = model_unique_indexes(model_cls)
+    adaptor = model_cls.__redis_adaptor__
+    proxy = adaptor.proxy
+    member = str(instance.__model_meta__.accessors.pk_getter(instance))
+    primary_key = instance.get_primary_key()
+    # claim key -> (unique field, value)
+    claims: Dict[str, Tuple[str, Any]] = {}
+    for index in uniques:
+        value = getattr(instance, index.field, None)
+        token = index.token(value)
+        if token is not None:
+            claims[index.key(model_cls, token)] = (index.field, value)
+    reads = [stored_tokens(model_cls, primary_key)]
+    if claims:
+        reads.append(proxy.mget(list(claims)))
+
+    def _build(results: List[Any]) -> Action:
+        stored = results[0]
+        owners = dict(zip(claims, (_decode(value) for value in results[1]))) if claims else {}
+        ops = build_ops(stored)
+        if added:
+            for key, (field_name, value) in claims.items():
+                owner = owners[key]
+                if owner is not None and owner != member:
+                    raise UniqueViolationError(
+                        f"The value {value!r} of the unique field {field_name} is already "
+                        f"used by the {model_cls.__name__} {owner}.",
+                        model_cls=model_cls,
+                        field_name=field_name,
+                        value=value,
+                        owner=owner
+                    )
+                if owner is None:
+                    ops.append(proxy.set(key, member))
+        else:
+            ops.extend(proxy.delete(key) for key, owner in owners.items() if owner == member)
+        # the claims of the values replaced (or deleted) by this write
+        for index in uniques:
+            token = stored.get(index.field)
+            if token is None:
+                continue
+            key = index.key(model_cls, token)
+            if key not in claims or not added:
+                ops.append(proxy.delete(key))
+        return Action.transaction(
+            [action, *ops],
+            runtime_mode=adaptor.runtime_mode,
+            client=proxy,
+            result_from_index=0
+        )
+
+    return Action.optimistic(
+        [primary_key, *claims],
+        reads,
+        _build,
+        runtime_mode=adaptor.runtime_mode,
+        client=proxy
+    )
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
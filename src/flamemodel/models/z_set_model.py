@@ -5,18 +5,21 @@ from ..d_type import SelfInstance
 
 class ZSet(BaseRedisModel):
     __redis_type__ = 'zset'
+    __abstract__ = True
 
     @classmethod
     def _score_field(cls) -> str:
-        score_fields = cls.__model_meta__.score_field
-        if not score_fields:
+        score_field = cls.__model_meta__.accessors.score_field
+        if not score_field:
             raise ValueError(f"Model {cls.__name__} has no score_field defined")
-        return list(score_fields.keys())[0]
+        return score_field
 
     @property
     def score_value(self) -> float:
-        field_name = self._score_field()
-        return float(getattr(self, field_name) or 0.0)
+        score_getter = self.__model_meta__.accessors.score_getter
+        if score_getter is None:
+            raise ValueError(f"Model {self.__class__.__name__} has no score_field defined")
+        return float(score_getter(self) or 0.0)
 
     @classmethod
     def add(cls, pk: Any, *members: SelfInstance) -> int:
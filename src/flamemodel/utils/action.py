@@ -1,6 +1,6 @@
 import inspect
 from enum import Enum
-from typing import Any, Callable, List, Optional, TYPE_CHECKING, Union, Literal
+from typing import Any, Callable, Iterator, List, Optional, TYPE_CHECKING, Union, Literal
 
 if TYPE_CHECKING:
     from ..adaptor.interface import RedisAdaptor
@@ -13,13 +13,15 @@ class ExecutionMode(Enum):
         SINGLE: Represents a single action execution.
         SEQUENCE: Represents a sequence of actions executed in order.
         TRANSACTION: Represents a set of actions executed within a transaction (e.g., Redis pipeline).
+        PIPELINE: Represents a set of actions sent in one non-transactional pipeline (one round trip).
     """
     SINGLE = 'single'
     SEQUENCE = 'sequence'
     TRANSACTION = 'transaction'
+    PIPELINE = 'pipeline'
 
 
-ExecutionModeType = Union[Literal['single', 'sequence', 'transaction'], ExecutionMode]
+ExecutionModeType = Union[Literal['single', 'sequence', 'transaction', 'pipeline'], ExecutionMode]
 
 class Action:
     """
@@ -52,8 +54,8 @@ class Action:
             args (Optional[tuple]): Positional arguments for the executor or command.
             kwargs (Optional[dict]): Keyword arguments for the executor or command.
             handler (Optional[Callable[[Any], Any]]): A callback function to process the result.
-            sub_actions (Optional[List['Action']]): A list of sub-actions for SEQUENCE or TRANSACTION modes.
-            execution_mode (ExecutionModeType): The mode of execution (SINGLE, SEQUENCE, or TRANSACTION).
+            sub_actions (Optional[List['Action']]): A list of sub-actions for SEQUENCE, TRANSACTION or PIPELINE modes.
+            execution_mode (ExecutionModeType): The mode of execution (SINGLE, SEQUENCE, TRANSACTION or PIPELINE).
             result_from_index (Optional[int]): The index of the result to return when executing multiple actions. 
                                               Defaults to -1 (the last result).
             client (Any): The client instance (e.g., Redis client) to execute commands on.
@@ -66,13 +68,15 @@ class Action:
         self._kwargs = kwargs or {}
         self._handler = handler
         self._sub_actions = sub_actions or []
+        # cleared by the actions which can't be queued although they are single commands
+        self._queueable = True
         if isinstance(execution_mode, str):
             try:
                 self._execution_mode = ExecutionMode(execution_mode)
             except ValueError:
                 raise ValueError(
                     "Action execute mode type must be "
-                    f"'single', 'sequence', 'transaction', got {execution_mode}"
+                    f"'single', 'sequence', 'transaction', 'pipeline', got {execution_mode}"
                 )
         else:
             self._execution_mode = execution_mode
@@ -202,6 +206,122 @@ class Action:
             result_from_index=result_from_index
         )
 
+    @classmethod
+    def pipeline(cls, actions: List['Action'], runtime_mode, client: Any, result_from_index: int = -1) -> 'Action':
+        """
+        Create an Action that sends a list of actions in one non-transactional pipeline.
+
+        Unlike `transaction`, the commands are not wrapped in MULTI/EXEC, this is the
+        cheapest way to batch independent commands (and the only one across cluster slots).
+
+        Args:
+            actions (List[Action]): The list of actions to execute.
+            runtime_mode: The runtime mode ('sync' or 'async').
+            client (Any): The client to execute the pipeline on (must support pipelines).
+            result_from_index (int): The index of the result to return. Defaults to -1.
+
+        Returns:
+            Action: An Action configured for pipeline execution.
+        """
+        return cls(
+            runtime_mode=runtime_mode,
+            sub_actions=actions,
+            execution_mode=ExecutionMode.PIPELINE,
+            client=client,
+            result_from_index=result_from_index
+        )
+
+    @classmethod
+    def optimistic(
+            cls,
+            watch: List[str],
+            reads: List['Action'],
+            build: Callable[[List[Any]], 'Action'],
+            runtime_mode,
+            client: Any,
+            max_attempts: int = 16
+    ) -> 'Action':
+        """
+        Create an Action running a transaction built from what was read under WATCH.
+
+        The keys of `watch` are WATCHed, the commands of `reads` are run, `build` gets
+        their results and returns the transaction to run (or raises to abort), it is
+        then queued in MULTI. EXEC fails when a watched key changed meanwhile,
+        everything is then done again.
+
+        Args:
+            watch (List[str]): The keys to watch, all of them on one node.
+            reads (List[Action]): The read commands, their handlers are applied.
+            build (Callable[[List[Any]], Action]): Builds the transaction from the results of `reads`.
+            runtime_mode: The runtime mode ('sync' or 'async').
+            client (Any): The client to execute the transaction on (must support pipelines).
+            max_attempts (int): The number of attempts before giving up with the WatchError.
+
+        Returns:
+            Action: A single Action, it can't be queued in another transaction or pipeline.
+        """
+        from redis.exceptions import WatchError
+
+        def _run_sync():
+            for attempt in range(max_attempts):
+                pipe = client.pipeline(transaction=True).execute()
+                try:
+                    pipe.watch(*watch)
+                    transaction = build([
+                        a._apply_handler_sync(getattr(pipe, a._command)(*a._args, **a._kwargs))
+                        for a in reads
+                    ])
+                    pipe.multi()
+                    for a in transaction._pipeline_commands():
+                        getattr(pipe, a._command)(*a._args, **a._kwargs)
+                    return transaction._pipeline_results_sync(iter(pipe.execute()))
+                except WatchError:
+                    if attempt == max_attempts - 1:
+                        raise
+                finally:
+                    pipe.reset()
+
+        async def _run_async():
+            for attempt in range(max_attempts):
+                pipe = await client.pipeline(transaction=True).execute()
+                try:
+                    await pipe.watch(*watch)
+                    transaction = build([
+                        await a._apply_handler_async(await getattr(pipe, a._command)(*a._args, **a._kwargs))
+                        for a in reads
+                    ])
+                    pipe.multi()
+                    for a in transaction._pipeline_commands():
+                        await getattr(pipe, a._command)(*a._args, **a._kwargs)
+                    return await transaction._pipeline_results_async(iter(await pipe.execute()))
+                except WatchError:
+                    if attempt == max_attempts - 1:
+                        raise
+                finally:
+                    await pipe.reset()
+
+        action = cls(
+            runtime_mode=runtime_mode,
+            executor=_run_sync if runtime_mode == 'sync' else _run_async,
+            client=client
+        )
+        action._queueable = False
+        return action
+
+    def queueable(self) -> bool:
+        """
+        Whether the action can be queued in a transaction or a pipeline.
+
+        The command actions of the proxy also carry the bound client method as executor,
+        it is replaced by the pipeline's method when queued.
+
+        Returns:
+            bool: True for a command, or a transaction or pipeline of commands.
+        """
+        if self._is_batch():
+            return all(a.queueable() for a in self._sub_actions)
+        return self._queueable and self._execution_mode == ExecutionMode.SINGLE and bool(self._command)
+
     def clone(self) -> 'Action':
         """
         Create a copy of this Action.
@@ -209,7 +329,7 @@ class Action:
         Returns:
             Action: A new Action instance with the same configuration.
         """
-        return Action(
+        new = Action(
             runtime_mode=self.runtime_mode,
             executor=self._executor,
             command=self._command,
@@ -222,6 +342,8 @@ class Action:
             client=self.client,
             adaptor=self._adaptor
         )
+        new._queueable = self._queueable
+        return new
 
     async def _apply_handler_async(self, value: Any) -> Any:
         """
@@ -297,31 +419,18 @@ class Action:
             else:
                 agg = results
             return self._apply_handler_sync(agg)
-        if self._execution_mode == ExecutionMode.TRANSACTION:
+        if self._execution_mode in (ExecutionMode.TRANSACTION, ExecutionMode.PIPELINE):
             if not self.client:
                 if self._adaptor is not None:
                     self.client = self._adaptor.proxy
                 else:
                     raise RuntimeError("Transaction requires a client.")
-            pipe_proxy = self.client.pipeline(transaction=True)
+            pipe_proxy = self.client.pipeline(transaction=self._execution_mode == ExecutionMode.TRANSACTION)
             pipe = pipe_proxy.execute()
-            for a in self._sub_actions:
-                if not a._command:
-                    raise RuntimeError("Action transaction mode only support command.")
+            for a in self._pipeline_commands():
                 getattr(pipe, a._command)(*a._args, **a._kwargs)
             exec_result = pipe.execute()
-            post = []
-            i = 0
-            for a in self._sub_actions:
-                if a._command:
-                    r = exec_result[i]
-                    post.append(a._apply_handler_sync(r))
-                    i += 1
-            if isinstance(self._result_from_index, int) and -1 <= self._result_from_index < len(post):
-                agg = post[self._result_from_index]
-            else:
-                agg = post
-            return self._apply_handler_sync(agg)
+            return self._pipeline_results_sync(iter(exec_result))
         raise TypeError("execution mode not supported.")
 
     async def _execute_async(self) -> Any:
@@ -357,29 +466,82 @@ class Action:
             else:
                 agg = results
             return await self._apply_handler_async(agg)
-        if self._execution_mode == ExecutionMode.TRANSACTION:
+        if self._execution_mode in (ExecutionMode.TRANSACTION, ExecutionMode.PIPELINE):
             if not self.client:
                 if self._adaptor is not None:
                     self.client = self._adaptor.proxy
                 else:
                     raise RuntimeError("Transaction requires a client.")
-            pipe_proxy = self.client.pipeline(transaction=True)
+            pipe_proxy = self.client.pipeline(transaction=self._execution_mode == ExecutionMode.TRANSACTION)
             pipe = await pipe_proxy.execute()
-            for a in self._sub_actions:
-                if not a._command:
-                    raise RuntimeError("Action transaction mode only support command.")
+            for a in self._pipeline_commands():
                 await getattr(pipe, a._command)(*a._args, **a._kwargs)
             exec_result = await pipe.execute()
-            post = []
-            i = 0
-            for a in self._sub_actions:
-                if a._executor or a._command:
-                    r = exec_result[i]
-                    post.append(await a._apply_handler_async(r))
-                    i += 1
-            if isinstance(self._result_from_index, int) and -1 <= self._result_from_index < len(post):
-                agg = post[self._result_from_index]
-            else:
-                agg = post
-            return await self._apply_handler_async(agg)
+            return await self._pipeline_results_async(iter(exec_result))
         raise TypeError("execution mode not supported.")
+
+    def _is_batch(self) -> bool:
+        return self._execution_mode in (ExecutionMode.TRANSACTION, ExecutionMode.PIPELINE)
+
+    def _pipeline_commands(self) -> List['Action']:
+        """
+        The command actions to queue on the pipeline, nested transactions and pipelines
+        (e.g. a model `save()` inside a `Session` commit) are flattened into this one.
+
+        Returns:
+            List[Action]: The single command actions, in order.
+
+        Raises:
+            RuntimeError: If a sub-action is not a command.
+        """
+        commands = []
+        for a in self._sub_actions:
+            if a._is_batch():
+                commands.extend(a._pipeline_commands())
+            elif not a._command:
+                raise RuntimeError("Action transaction mode only support command.")
+            else:
+                commands.append(a)
+        return commands
+
+    def _aggregate(self, results: List[Any]) -> Any:
+        if isinstance(self._result_from_index, int) and -1 <= self._result_from_index < len(results):
+            return results[self._result_from_index]
+        return results
+
+    def _pipeline_results_sync(self, results: Iterator[Any]) -> Any:
+        """
+        Consume the replies of the flattened commands, each nested action gets its own
+        replies and applies its handlers to them.
+
+        Args:
+            results (Iterator[Any]): The pipeline replies, in the order of `_pipeline_commands`.
+
+        Returns:
+            Any: The processed result.
+        """
+        post = []
+        for a in self._sub_actions:
+            if a._is_batch():
+                post.append(a._pipeline_results_sync(results))
+            else:
+                post.append(a._apply_handler_sync(next(results)))
+        return self._apply_handler_sync(self._aggregate(post))
+
+    async def _pipeline_results_async(self, results: Iterator[Any]) -> Any:
+        """
+        Async version of `_pipeline_results_sync`.
+
+        Args:
+            results (Iterator[Any]): The pipeline replies, in the order of `_pipeline_commands`.
+
+        Returns:
+            Any: The processed result.
+        """
+        post = []
+        for a in self._sub_actions:
+            if a._is_batch():
+                post.append(await a._pipeline_results_async(results))
+            else:
+                post.append(await a._apply_handler_async(next(results)))
+        return await self._apply_handler_async(self._aggregate(post))
@@ -1,5 +1,4 @@
 from typing import TYPE_CHECKING, Dict, Type
-from ..constant import PydanticPropertyField, FlameModelJsonSchemaKey
 from ..exceptions import (
     TooManyPrimaryKeyError, HasNoPrimaryKeyError,
     TooManyHashFieldError, HasNoHashFieldError,
@@ -8,9 +7,10 @@ from ..exceptions import (
     TooManyLngFieldFieldError, HasNoLngFieldError,
     TooManyMemberFieldFieldError, HasNoMemberFieldError,
     TooManyEntryFieldError, HasNoEntryFieldError,
-    HasNoFlagFieldsError, NotUsedFieldsError
+    HasNoFlagFieldsError, NotUsedFieldsError,
+    StorageModeNotSupportedError
 )
-from ..models.metadata import FieldMetaData, ModelMetadata
+from ..models.metadata import FieldMetaData, ModelMetadata, model_fields_metadata
 
 if TYPE_CHECKING:
     from ..models import BaseRedisModel
@@ -19,14 +19,8 @@ FieldsMetadataType = Dict[str, FieldMetaData]
 
 
 def parse_model_metadata(model_instance: Type['BaseRedisModel']) -> ModelMetadata:
-    model_json_schema = model_instance.model_json_schema()
-    model_fields = model_json_schema[PydanticPropertyField]
-    try:
-        model_fields_metadata: FieldsMetadataType = {
-            f: p[FlameModelJsonSchemaKey]
-            for f, p in model_fields.items()
-        }
-    except KeyError:
+    fields_metadata: FieldsMetadataType = model_fields_metadata(model_instance)
+    if any(metadata is None for metadata in fields_metadata.values()):
         raise NotUsedFieldsError(
             f"The model {model_instance} has doesn't used `fields` to mark fields, "
             f"use `fields` to mark all columns, please."
@@ -34,6 +28,8 @@ def parse_model_metadata(model_instance: Type['BaseRedisModel']) -> ModelMetadat
     fields = []
     pk = None
     indexes = []
+    range_indexes = []
+    prefix_indexes = []
     shard_tags = []
     unique_indexes = []
     hash_field = None
@@ -44,7 +40,18 @@ def parse_model_metadata(model_instance: Type['BaseRedisModel']) -> ModelMetadat
     entry_field = None
     flags = []
     model_name = model_instance.__name__
-    for field, metadata in model_fields_metadata.items():
+    storage_mode = getattr(model_instance, '__storage_mode__', 'blob')
+    if storage_mode not in ('blob', 'fields'):
+        raise StorageModeNotSupportedError(
+            f"The model {model_name} has unknown storage mode {storage_mode}, "
+            "it must be 'blob' or 'fields'."
+        )
+    if storage_mode == 'fields' and model_instance.__redis_type__ != 'string':
+        raise StorageModeNotSupportedError(
+            f"The model {model_name} is {model_instance.__redis_type__} model type, "
+            "only standalone(string) models can use the 'fields' storage mode."
+        )
+    for field, metadata in fields_metadata.items():
         item = {field: metadata}
         fields.append(item)
         if metadata.primary_key:
@@ -55,6 +62,10 @@ def parse_model_metadata(model_instance: Type['BaseRedisModel']) -> ModelMetadat
             pk = item
         if metadata.index:
             indexes.append(item)
+        if metadata.range_index:
+            range_indexes.append(item)
+        if metadata.prefix_index:
+            prefix_indexes.append(item)
         if metadata.shard_tag:
             shard_tags.append(field)
         if metadata.unique:
@@ -163,6 +174,8 @@ def parse_model_metadata(model_instance: Type['BaseRedisModel']) -> ModelMetadat
     return ModelMetadata(
         pk_info=pk,
         indexes=tuple(indexes),
+        range_indexes=tuple(range_indexes),
+        prefix_indexes=tuple(prefix_indexes),
         shard_tags=tuple(shard_tags),
         unique_indexes=tuple(unique_indexes),
         hash_field=hash_field,
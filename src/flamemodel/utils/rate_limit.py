@@ -0,0 +1,29 @@
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Keep the average throughput of a job under `ops_per_second`.
+
+    The job reports how many operations it issued and the limiter answers how
+    long to wait before the next batch, it never blocks by itself so it can be
+    used from both sync and async code.
+
+    :param ops_per_second: the ceiling, None or 0 disables the limit.
+    """
+
+    def __init__(self, ops_per_second: Optional[float] = None):
+        self.ops_per_second = ops_per_second
+        self._started_at: Optional[float] = None
+        self._ops = 0
+
+    def delay(self, ops: int) -> float:
+        """Record `ops` operations and return the seconds to wait."""
+        if not self.ops_per_second:
+            return 0.0
+        now = time.monotonic()
+        if self._started_at is None:
+            self._started_at = now
+        self._ops += ops
+        expected_elapsed = self._ops / self.ops_per_second
+        return max(0.0, expected_elapsed - (now - self._started_at))
@@ -0,0 +1,62 @@
+import time
+import asyncio
+from typing import Any, Generator, Union, TYPE_CHECKING
+from ..d_type import RuntimeMode
+
+if TYPE_CHECKING:
+    from .action import Action
+
+
+class Sleep:
+    """Step asking the runner to wait before resuming, `time.sleep` in sync mode
+    and `asyncio.sleep` in async mode."""
+    __slots__ = ('seconds',)
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+
+Step = Union['Action', Sleep]
+Steps = Generator[Step, Any, Any]
+
+
+def run_steps(steps: Steps, runtime_mode: RuntimeMode):
+    """Drive a generator of steps in the given runtime mode.
+
+    Long running jobs (SCAN loops, migrations...) are written once as a generator
+    which yields `Action`s and receives their results, the runner executes them
+    synchronously or awaits them, so the same logic serves both runtime modes.
+
+    :return: the generator return value, or a coroutine of it in async mode.
+    """
+    if runtime_mode == 'sync':
+        return _run_sync(steps)
+    return _run_async(steps)
+
+
+def _run_sync(steps: Steps):
+    result = None
+    try:
+        while True:
+            step = steps.send(result)
+            if isinstance(step, Sleep):
+                time.sleep(step.seconds)
+                result = None
+            else:
+                result = step.run_sync()
+    except StopIteration as stop:
+        return stop.value
+
+
+async def _run_async(steps: Steps):
+    result = None
+    try:
+        while True:
+            step = steps.send(result)
+            if isinstance(step, Sleep):
+                await asyncio.sleep(step.seconds)
+                result = None
+            else:
+                result = await step.execute()
+    except StopIteration as stop:
+        return stop.value
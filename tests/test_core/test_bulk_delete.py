@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+from src.flamemodel import FlameModel
+from src.flamemodel.core.bulk_delete import BulkDeleter
+from src.flamemodel.models import String, Geo
+from src.flamemodel.models.fields import fields
+
+
+class PurgeUser(String):
+    __collection__ = 'set'
+
+    id: int = fields(primary_key=True)
+
+
+class PurgeCart(String):
+    __key_pattern__ = 'cart:{pk}:items'
+
+    id: int = fields(primary_key=True)
+
+
+class PurgeShop(Geo):
+    id: str = fields(primary_key=True)
+    name: str = fields(member_field=True)
+    lng: float = fields(lng_field=True)
+    lat: float = fields(lat_field=True)
+
+
+class TestBulkDeleter(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/9')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+
+    def key_count(self):
+        return self.proxy.dbsize().execute()
+
+    def test_purge_model(self):
+        for i in range(50):
+            PurgeUser(id=i).save().execute()
+        self.proxy.set('PurgeUser:idx:name:x', '1').execute()
+        self.proxy.set('Other:1', '1').execute()
+        reports = []
+        progress = BulkDeleter(PurgeUser, batch_size=10, on_progress=reports.append).run()
+        self.assertTrue(progress.done)
+        self.assertEqual(progress.deleted, 52)
+        self.assertTrue(reports)
+        self.assertEqual(self.proxy.keys('*').execute(), [b'Other:1'])
+
+    def test_purge_pattern_with_rate_limit(self):
+        for i in range(30):
+            self.proxy.set(f'tenant42:k{i}', '1').execute()
+        self.proxy.set('tenant7:k1', '1').execute()
+        progress = BulkDeleter('tenant42:*', batch_size=10, max_ops_per_second=100000).run()
+        self.assertEqual((progress.scanned, progress.deleted), (30, 30))
+        self.assertEqual(self.key_count(), 1)
+
+    def test_companion_keys(self):
+        PurgeShop(id='paris', name='a', lng=2.35, lat=48.85).save().execute()
+        PurgeCart(id=1).save().execute()
+        self.proxy.set('PurgeCart:idx:id:1', '1').execute()
+        BulkDeleter(PurgeShop).run()
+        BulkDeleter(PurgeCart).run()
+        self.assertEqual(self.key_count(), 0)
+
+
+class TestAsyncBulkDeleter(unittest.TestCase):
+    def test_async_run(self):
+        async def main():
+            fm = FlameModel('async', 'redis://:@localhost:6379/9')
+            proxy = fm.adaptor.proxy
+            await proxy.flushdb().execute()
+            for i in range(5):
+                await PurgeUser(id=i).save().execute()
+            progress = await BulkDeleter(PurgeUser, batch_size=2).run()
+            size = await proxy.dbsize().execute()
+            await proxy.aclose().execute()
+            return progress, size
+
+        progress, size = asyncio.run(main())
+        self.assertEqual(progress.deleted, 6)
+        self.assertEqual(size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+import json
+import asyncio
+import unittest
+from typing import Optional
+from src.flamemodel import FlameModel
+from src.flamemodel.models import String, Hash
+from src.flamemodel.models.fields import fields
+from src.flamemodel.core.migration import Migrator
+from src.flamemodel.core.session import Session
+from src.flamemodel.exceptions import MigrationNotSupportedError, UniqueViolationError
+
+
+class MigUser(String):
+    id: int = fields(primary_key=True)
+    full_name: str = fields()
+
+
+class MigProfile(String):
+    __storage_mode__ = 'fields'
+
+    id: int = fields(primary_key=True)
+    full_name: str = fields()
+    age: Optional[int] = fields(default=None)
+
+
+class MigAddress(Hash):
+    user_id: int = fields(primary_key=True)
+    label: str = fields(hash_field=True)
+    city: str = fields()
+
+
+class MigMember(String):
+    id: int = fields(primary_key=True)
+    city: str = fields(index=True)
+    email: str = fields(unique=True)
+
+
+class MigPerson(String):
+    id: int = fields(primary_key=True)
+    full_name: str = fields(index=True)
+    city: str = fields(index=True)
+
+
+def upgrade_name(data):
+    if 'full_name' in data:
+        return None
+    return {'id': data['id'], 'full_name': f"{data['first']} {data['last']}"}
+
+
+class TestMigrator(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel(
+            'sync',
+            'redis://:@localhost:6379/3'
+        )
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        for i in range(20):
+            self.proxy.set(f'MigUser:{i}', json.dumps({'id': i, 'first': 'f', 'last': str(i)})).execute()
+        self.proxy.expire('MigUser:0', 100).execute()
+
+    def test_migrate_blob_values(self):
+        reports = []
+        progress = Migrator(MigUser, upgrade_name, batch_size=5, on_progress=reports.append).run()
+        self.assertTrue(progress.done)
+        self.assertEqual((progress.scanned, progress.migrated, progress.skipped), (20, 20, 0))
+        self.assertTrue(reports)
+        self.assertEqual(MigUser.get(7).execute().full_name, 'f 7')
+        # the ttl is kept
+        self.assertGreater(self.proxy.ttl('MigUser:0').execute(), 0)
+        # nothing left to upgrade on a second run
+        progress = Migrator(MigUser, upgrade_name).run()
+        self.assertEqual((progress.migrated, progress.skipped), (0, 20))
+
+    def test_resume_from_checkpoint(self):
+        calls = []
+
+        def failing_upgrade(data):
+            calls.append(data['id'])
+            if len(calls) == 10:
+                raise RuntimeError('boom')
+            return upgrade_name(data)
+
+        migrator = Migrator(MigUser, failing_upgrade, name='resume', batch_size=2)
+        with self.assertRaises(RuntimeError):
+            migrator.run()
+        checkpoint = migrator.checkpoint().execute()
+        self.assertIsNotNone(checkpoint)
+        self.assertNotEqual(checkpoint.cursor, 0)
+
+        progress = Migrator(MigUser, upgrade_name, name='resume', batch_size=2).run()
+        self.assertTrue(progress.done)
+        self.assertEqual(progress.scanned, 20)
+        self.assertIsNone(migrator.checkpoint().execute())
+        for i in range(20):
+            self.assertEqual(MigUser.get(i).execute().full_name, f'f {i}')
+
+    def test_fields_storage_mode(self):
+        self.proxy.hset('MigProfile:1', mapping={'id': '1', 'first': '"a"', 'last': '"b"'}).execute()
+        Migrator(MigProfile, upgrade_name).run()
+        self.assertEqual(
+            set(self.proxy.hkeys('MigProfile:1').execute()),
+            {b'id', b'full_name', b'age'}
+        )
+        self.assertEqual(MigProfile.get(1).execute().full_name, 'a b')
+
+    def test_hash_model(self):
+        self.proxy.hset('MigAddress:1', mapping={
+            'home': json.dumps({'user_id': 1, 'label': 'home', 'town': 'Paris'}),
+            'work': json.dumps({'user_id': 1, 'label': 'work', 'town': 'Lyon'}),
+        }).execute()
+        progress = Migrator(
+            MigAddress,
+            lambda data: {'user_id': data['user_id'], 'label': data['label'], 'city': data['town']}
+        ).run()
+        self.assertEqual(progress.migrated, 1)
+        self.assertEqual(MigAddress.get(1, 'work').execute().city, 'Lyon')
+
+    def test_indexes_follow(self):
+        for i in range(6):
+            self.proxy.set(f'MigMember:{i}', json.dumps({'id': i, 'city': 'x', 'email': f'{i}@old'})).execute()
+        progress = Migrator(
+            MigMember,
+            lambda data: {**data, 'city': ['paris', 'lyon'][data['id'] % 2], 'email': f"{data['id']}@new"}
+        ).run()
+        self.assertEqual(progress.migrated, 6)
+        query = Session(self.fm).query(MigMember).filter_by(city='lyon')
+        self.assertEqual(sorted(m.id for m in query.all()), [1, 3, 5])
+        with self.assertRaises(UniqueViolationError):
+            MigMember(id=9, city='rome', email='2@new').save().execute()
+
+    def test_indexed_old_shape(self):
+        # the stored values are not valid instances of the new model
+        for i in range(4):
+            self.proxy.set(f'MigPerson:{i}', json.dumps({'id': i, 'first': 'f', 'last': str(i), 'city': 'Paris'})).execute()
+            self.proxy.sadd('MigPerson:idx:city:Paris', i).execute()
+        progress = Migrator(
+            MigPerson,
+            lambda data: {'id': data['id'], 'full_name': f"{data['first']} {data['last']}", 'city': data['city'].lower()}
+        ).run()
+        self.assertEqual(progress.migrated, 4)
+        self.assertEqual(self.proxy.smembers('MigPerson:idx:city:Paris').execute(), set())
+        query = Session(self.fm).query(MigPerson)
+        self.assertEqual(sorted(p.id for p in query.filter_by(city='paris').all()), [0, 1, 2, 3])
+        self.assertEqual([p.id for p in query.filter_by(full_name='f 2').all()], [2])
+
+    def test_chunk_is_one_pipeline(self):
+        sizes = []
+        original = self.proxy._client.pipeline
+
+        def pipeline(*args, **kwargs):
+            pipe = original(*args, **kwargs)
+            execute = pipe.execute
+
+            def counted(*a, **kw):
+                sizes.append(len(pipe.command_stack))
+                return execute(*a, **kw)
+
+            pipe.execute = counted
+            return pipe
+
+        self.proxy._client.pipeline = pipeline
+        self.addCleanup(delattr, self.proxy._client, 'pipeline')
+        progress = Migrator(MigUser, upgrade_name).run()
+        self.assertEqual(progress.migrated, 20)
+        # the reads, then the 20 writes with the removal of the checkpoint
+        self.assertEqual(sizes, [20, 21])
+
+    def test_rate_limit(self):
+        progress = Migrator(MigUser, upgrade_name, batch_size=10, max_ops_per_second=100000).run()
+        self.assertEqual(progress.migrated, 20)
+
+    def test_not_supported_model(self):
+        from src.flamemodel.models import List
+
+        class MigTask(List):
+            id: int = fields(primary_key=True)
+
+        with self.assertRaises(MigrationNotSupportedError):
+            Migrator(MigTask, upgrade_name)
+
+
+class TestAsyncMigrator(unittest.TestCase):
+    def test_async_run(self):
+        async def main():
+            fm = FlameModel('async', 'redis://:@localhost:6379/3')
+            proxy = fm.adaptor.proxy
+            await proxy.flushdb().execute()
+            for i in range(5):
+                await proxy.set(f'MigUser:{i}', json.dumps({'id': i, 'first': 'x', 'last': 'y'})).execute()
+            progress = await Migrator(MigUser, upgrade_name, batch_size=2).run()
+            user = await MigUser.get(3).execute()
+            await fm.adaptor.proxy.aclose().execute()
+            return progress, user
+
+        progress, user = asyncio.run(main())
+        self.assertEqual(progress.migrated, 5)
+        self.assertEqual(user.full_name, 'x y')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,616 @@
+import asyncio
+import datetime
+import unittest
+from unittest import mock
+from src.flamemodel import FlameModel
+from src.flamemodel.core.session import Session
+from src.flamemodel.exceptions import InvalidCursorError
+from src.flamemodel.models import String, Hash
+from src.flamemodel.models.fields import fields
+from src.flamemodel.models.scan import KeyScanner
+
+
+class QueryUser(String):
+    id: int = fields(primary_key=True)
+    name: str = fields()
+    city: str = fields(index=True)
+    age: int = fields(index=True)
+    nickname: str | None = fields(index=True, default=None)
+
+
+class QueryProfile(String):
+    __storage_mode__ = 'fields'
+
+    id: int = fields(primary_key=True)
+    team: str = fields(index=True)
+    score: int = fields()
+
+
+class QueryAddress(Hash):
+    user_id: int = fields(primary_key=True)
+    label: str = fields(hash_field=True)
+    city: str = fields()
+
+
+class QueryProduct(String):
+    id: int = fields(primary_key=True)
+    kind: str = fields(index=True)
+    price: float = fields(range_index=True)
+    created_at: datetime.datetime = fields(range_index=True)
+    stock: int | None = fields(range_index=True, default=None)
+
+
+class QueryNote(String):
+    id: int = fields(primary_key=True)
+    text: str = fields()
+
+
+class UniqueQueryAccount(String):
+    id: int = fields(primary_key=True)
+    email: str = fields(unique=True)
+    city: str = fields(index=True, default='paris')
+
+
+class QueryContact(String):
+    id: int = fields(primary_key=True)
+    name: str = fields(prefix_index=True, prefix_casefold=True)
+    email: str | None = fields(prefix_index=True, default=None)
+    city: str = fields(index=True, default='paris')
+
+
+class QueryTag(String):
+    id: int = fields(primary_key=True)
+    tag: str = fields(index=True, prefix_index=True)
+
+
+def spy_pipelines(test, proxy):
+    """Record the `transaction` flag of every pipeline opened on the client of `proxy`."""
+    calls = []
+    original = proxy._client.pipeline
+
+    def pipeline(transaction=True, **kwargs):
+        calls.append(transaction)
+        return original(transaction=transaction, **kwargs)
+
+    proxy._client.pipeline = pipeline
+    test.addCleanup(delattr, proxy._client, 'pipeline')
+    return calls
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/10')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        self.session = Session(self.fm)
+        for i, (city, age) in enumerate([('paris', 30), ('paris', 40), ('rome', 30), ('oslo', 30)]):
+            QueryUser(id=i, name=f'n{i}', city=city, age=age).save().execute()
+
+    def members(self, key):
+        return sorted(m.decode() for m in self.proxy.smembers(key).execute())
+
+    def test_save_maintains_index(self):
+        self.assertEqual(self.members('QueryUser:idx:city:paris'), ['0', '1'])
+        self.assertEqual(self.members('QueryUser:idx:age:30'), ['0', '2', '3'])
+        # None values are not indexed
+        self.assertEqual(self.proxy.keys('QueryUser:idx:nickname:*').execute(), [])
+
+    def test_changed_value_moves_entry(self):
+        user = QueryUser.get(0).execute()
+        self.assertEqual(user, QueryUser(id=0, name='n0', city='paris', age=30))
+        user.city = 'rome'
+        user.save().execute()
+        self.assertEqual(self.members('QueryUser:idx:city:paris'), ['1'])
+        self.assertEqual(self.members('QueryUser:idx:city:rome'), ['0', '2'])
+        user.update(city='oslo').execute()
+        self.assertEqual(self.members('QueryUser:idx:city:rome'), ['2'])
+        self.assertEqual(self.members('QueryUser:idx:city:oslo'), ['0', '3'])
+
+    def test_blind_save_moves_entry(self):
+        # built without reading the stored instance first
+        QueryUser(id=0, name='n0', city='lima', age=31).save().execute()
+        self.assertEqual(self.members('QueryUser:idx:city:paris'), ['1'])
+        self.assertEqual(self.members('QueryUser:idx:age:30'), ['2', '3'])
+        self.assertEqual(self.session.query(QueryUser).filter_by(city='paris').count(), 1)
+        QueryUser(id=2, name='n2', city='paris', age=30).delete().execute()
+        self.assertEqual(self.members('QueryUser:idx:city:rome'), [])
+
+    def test_delete_removes_entries(self):
+        QueryUser.get(1).execute().delete().execute()
+        self.assertEqual(self.members('QueryUser:idx:city:paris'), ['0'])
+        self.assertEqual(self.members('QueryUser:idx:age:40'), [])
+
+    def test_filter_by(self):
+        query = self.session.query(QueryUser)
+        self.assertEqual([u.id for u in query.filter_by(city='paris').all()], [0, 1])
+        users = self.session.query(QueryUser).filter_by(city='paris', age='30').all()
+        self.assertEqual([u.id for u in users], [0])
+        # a condition on a field which is not indexed is checked on the instances
+        users = self.session.query(QueryUser).filter_by(age=30, name='n3').all()
+        self.assertEqual([u.id for u in users], [3])
+        self.assertEqual(self.session.query(QueryUser).filter_by(city='nowhere').all(), [])
+        self.assertEqual(self.session.query(QueryUser).filter_by(city='rome').first().id, 2)
+
+    def test_filter_without_index_scans(self):
+        self.assertEqual([u.id for u in self.session.query(QueryUser).filter_by(name='n2').all()], [2])
+        QueryAddress(user_id=1, label='home', city='paris').save().execute()
+        QueryAddress(user_id=2, label='work', city='rome').save().execute()
+        addresses = self.session.query(QueryAddress).filter_by(city='rome').all()
+        self.assertEqual([a.user_id for a in addresses], [2])
+
+    def test_stale_entries_are_repaired(self):
+        # written by another client, the index still holds the old value
+        self.proxy.set('QueryUser:2', QueryUser(id=2, name='n2', city='oslo', age=30).model_dump_json()).execute()
+        self.proxy.sadd('QueryUser:idx:city:paris', '9').execute()
+        users = self.session.query(QueryUser).filter_by(city='paris').all()
+        self.assertEqual([u.id for u in users], [0, 1])
+        self.assertEqual([u.id for u in self.session.query(QueryUser).filter_by(city='rome').all()], [])
+        self.assertEqual(self.members('QueryUser:idx:city:paris'), ['0', '1'])
+        self.assertEqual(self.members('QueryUser:idx:city:rome'), [])
+
+    def test_stale_entries_refilled(self):
+        # sorted before the live pks, read first by the page cut on the server
+        self.proxy.sadd('QueryUser:idx:city:paris', '00', '01').execute()
+        query = self.session.query(QueryUser, batch_size=1).filter_by(city='paris')
+        self.assertEqual([u.id for u in query.limit(2).all()], [0, 1])
+        self.proxy.sadd('QueryUser:idx:city:paris', '00', '01').execute()
+        self.assertEqual([u.id for u in query.offset(1).limit(1).all()], [1])
+        self.assertEqual(self.members('QueryUser:idx:city:paris'), ['0', '1'])
+
+    def test_fields_storage_mode(self):
+        profile = QueryProfile(id=1, team='red', score=1)
+        profile.save().execute()
+        QueryProfile(id=2, team='red', score=5).save().execute()
+        profile.update(team='blue').execute()
+        self.assertEqual(self.members('QueryProfile:idx:team:red'), ['2'])
+        found = self.session.query(QueryProfile).filter_by(team='blue').all()
+        self.assertEqual(found, [QueryProfile(id=1, team='blue', score=1)])
+
+    def test_session_commit_is_one_transaction(self):
+        session = Session(self.fm).begin()
+        session.add(QueryAddress(user_id=1, label='home', city='paris'))
+        session.add(QueryAddress(user_id=1, label='work', city='lyon'))
+        calls = spy_pipelines(self, self.proxy)
+        session.commit()
+        self.assertEqual(calls, [True])
+        self.assertEqual(QueryAddress.get(1, 'work').execute().city, 'lyon')
+
+    def test_session_commit(self):
+        session = Session(self.fm).begin()
+        user = QueryUser(id=7, name='n7', city='lima', age=50)
+        session.add(user)
+        session.commit()
+        self.assertEqual(self.members('QueryUser:idx:city:lima'), ['7'])
+        user.city = 'quito'
+        user.save().execute()
+        self.assertEqual(self.members('QueryUser:idx:city:lima'), [])
+
+
+class TestRangeQuery(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/10')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        self.session = Session(self.fm)
+        self.t0 = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        for i in range(10):
+            QueryProduct(
+                id=i,
+                kind='book' if i % 2 else 'pen',
+                price=i * 10,
+                created_at=self.t0 + datetime.timedelta(days=i)
+            ).save().execute()
+
+    def query(self):
+        return self.session.query(QueryProduct)
+
+    def ids(self, query):
+        return [p.id for p in query.all()]
+
+    def test_maintained(self):
+        self.assertEqual(self.proxy.zscore('QueryProduct:idx:price', '3').execute(), 30)
+        QueryProduct(id=3, kind='pen', price=35, created_at=self.t0).save().execute()
+        self.assertEqual(self.proxy.zscore('QueryProduct:idx:price', '3').execute(), 35)
+        self.assertEqual(self.proxy.zcard('QueryProduct:idx:stock').execute(), 0)
+        QueryProduct.get(3).execute().delete().execute()
+        self.assertIsNone(self.proxy.zscore('QueryProduct:idx:price', '3').execute())
+
+    def test_operators(self):
+        self.assertEqual(self.ids(self.query().filter_by(price__gt=70)), [8, 9])
+        self.assertEqual(self.ids(self.query().filter_by(price__gte=70)), [7, 8, 9])
+        self.assertEqual(self.ids(self.query().filter_by(price__lt=20)), [0, 1])
+        self.assertEqual(self.ids(self.query().filter_by(price__lte=20, price__gt=0)), [1, 2])
+        self.assertEqual(self.ids(self.query().filter_by(price__between=(30, 50))), [3, 4, 5])
+        self.assertEqual(self.ids(self.query().filter_by(price=40)), [4])
+        since = self.t0 + datetime.timedelta(days=7, hours=1)
+        self.assertEqual(self.ids(self.query().filter_by(created_at__gt=since)), [8, 9])
+
+    def test_order_and_limit(self):
+        query = self.query().filter_by(price__gte=20).order_by('-price').offset(1).limit(3)
+        self.assertEqual(self.ids(query), [8, 7, 6])
+        self.assertEqual(self.ids(self.query().order_by('price').limit(2)), [0, 1])
+        self.assertEqual(self.query().order_by('-created_at').first().id, 9)
+        # a condition on another field is checked on the instances, page by page
+        query = self.session.query(QueryProduct, batch_size=2)
+        self.assertEqual(self.ids(query.filter_by(price__gte=20, id__lt=8).order_by('-price').limit(3)), [7, 6, 5])
+        # resolved through the equality index, ordered here
+        self.assertEqual(self.ids(self.query().filter_by(kind='book', price__lt=60).order_by('-price')), [5, 3, 1])
+        # no index at all
+        self.assertEqual(self.ids(self.query().filter_by(id__between=(2, 4)).order_by('-id')), [4, 3, 2])
+
+    def test_stale_entries_are_repaired(self):
+        self.proxy.zadd('QueryProduct:idx:price', {'42': 45}).execute()
+        product = QueryProduct(id=4, kind='pen', price=95, created_at=self.t0)
+        self.proxy.set('QueryProduct:4', product.model_dump_json()).execute()
+        self.assertEqual(self.ids(self.query().filter_by(price__between=(40, 50))), [5])
+        self.assertIsNone(self.proxy.zscore('QueryProduct:idx:price', '42').execute())
+        self.assertEqual(self.proxy.zscore('QueryProduct:idx:price', '4').execute(), 95)
+
+
+class TestQueryPlanner(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/13')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        self.session = Session(self.fm)
+        self.t0 = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        for i in range(10):
+            QueryProduct(
+                id=i,
+                kind='book' if i % 2 else 'pen',
+                price=i * 10,
+                created_at=self.t0 + datetime.timedelta(days=i),
+                stock=i % 3
+            ).save().execute()
+
+    def query(self):
+        return self.session.query(QueryProduct)
+
+    def ids(self, query):
+        return [p.id for p in query.all()]
+
+    def temp_keys(self):
+        return self.proxy.keys('QueryProduct:idx:__tmp__:*').execute()
+
+    def test_strategies(self):
+        plan = self.query().filter_by(price__gte=80).explain()
+        self.assertEqual((plan.strategy, plan.pushdown), ('index', True))
+        self.assertEqual(plan.sources[0].cardinality, 2)
+        plan = self.query().filter_by(kind='book', price__lt=30).order_by('-price').explain()
+        self.assertEqual((plan.strategy, plan.kind, plan.ordered), ('intersect', 'zset', True))
+        # the smallest index first
+        self.assertEqual([s.field for s in plan.sources], ['price', 'kind'])
+        self.assertEqual(self.query().filter_by(kind='pencil', price__lt=30).explain().strategy, 'empty')
+        self.assertEqual(self.query().filter_by(id__gt=3).explain().strategy, 'scan')
+        plan = self.query().filter_by(kind='book', id__gt=3).explain()
+        self.assertEqual((plan.strategy, plan.residual), ('index', ['id']))
+        self.assertIn('strategy: index', str(plan))
+        # nothing was stored
+        self.assertEqual(self.temp_keys(), [])
+
+    def test_scan_duplicates(self):
+        # SCAN may return a key again, e.g. when the keyspace is rehashed
+        page = KeyScanner.page
+
+        def twice(scanner, cursor=0, node=None):
+            return page(scanner, cursor, node).then(lambda r: (r[0], r[1] + r[1][:2]))
+
+        query = self.query().filter_by(id__gte=5)
+        with mock.patch.object(KeyScanner, 'page', twice):
+            self.assertEqual(self.ids(query), [5, 6, 7, 8, 9])
+            self.assertEqual(query.count(), 5)
+            self.assertEqual(sorted(p.id for p in query.iter(chunk_size=4)), [5, 6, 7, 8, 9])
+            self.assertEqual(self.query().filter_by(id__gte=0).update(stock=3), 10)
+
+    def test_intersections(self):
+        query = self.query().filter_by(kind='book', price__lt=60).order_by('-price').limit(2)
+        self.assertEqual(self.ids(query), [5, 3])
+        query = self.query().filter_by(kind='pen', price__gte=20, stock__lte=1).order_by('created_at')
+        self.assertEqual(self.ids(query), [4, 6])
+        query = self.query().filter_by(price__lt=70).order_by('-created_at').offset(1).limit(2)
+        self.assertEqual(self.ids(query), [5, 4])
+        self.assertEqual(self.ids(self.query().filter_by(price__gt=10, stock=2)), [2, 5, 8])
+        self.assertEqual(self.temp_keys(), [])
+
+    def test_set_intersection(self):
+        for i in range(4):
+            QueryUser(id=i, name=f'n{i}', city='paris' if i < 3 else 'rome', age=30 + i % 2).save().execute()
+        query = self.session.query(QueryUser).filter_by(city='paris', age=30)
+        self.assertEqual(query.explain().strategy, 'intersect')
+        self.assertEqual([u.id for u in query.all()], [0, 2])
+        self.assertEqual([u.id for u in query.offset(1).limit(1).all()], [2])
+        self.assertEqual(self.proxy.keys('QueryUser:idx:__tmp__:*').execute(), [])
+
+    def test_stale_entries_are_repaired(self):
+        product = QueryProduct(id=3, kind='pen', price=30, created_at=self.t0, stock=0)
+        self.proxy.set('QueryProduct:3', product.model_dump_json()).execute()
+        self.assertEqual(self.ids(self.query().filter_by(kind='book', price__lte=30)), [1])
+        self.assertEqual(self.proxy.sismember('QueryProduct:idx:kind:book', '3').execute(), 0)
+
+
+class TestKeysetPagination(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/15')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        self.session = Session(self.fm)
+        t0 = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        for i in range(12):
+            # ties on the price, broken by the pk
+            QueryProduct(id=i, kind='book' if i % 2 else 'pen', price=i // 3, created_at=t0).save().execute()
+
+    def walk(self, make_query):
+        pages, cursor = [], None
+        while True:
+            page = make_query().after(cursor).page()
+            pages.append([p.id for p in page.items])
+            cursor = page.cursor
+            if cursor is None:
+                return pages
+
+    def test_pages(self):
+        pages = self.walk(lambda: self.session.query(QueryProduct).order_by('price').limit(5))
+        self.assertEqual(pages, [[0, 1, 2, 3, 4], [5, 6, 7, 8, 10], [11, 9]])
+        pages = self.walk(lambda: self.session.query(QueryProduct).order_by('-price').limit(4))
+        # the last page is full, it has no cursor
+        self.assertEqual(pages, [[9, 11, 10, 8], [7, 6, 5, 4], [3, 2, 1, 0]])
+
+    def test_filtered_pages(self):
+        def books():
+            query = self.session.query(QueryProduct, batch_size=2).filter_by(kind='book', price__gte=1)
+            return query.order_by('price').limit(2)
+
+        def first_ids():
+            # the index doesn't answer the condition, ordered on the instances
+            return self.session.query(QueryProduct).filter_by(id__lt=5).order_by('-price').limit(3)
+
+        self.assertEqual(self.walk(books), [[3, 5], [7, 11], [9]])
+        self.assertEqual(self.walk(first_ids), [[4, 3, 2], [1, 0]])
+
+    def test_changes_between_pages(self):
+        page = self.session.query(QueryProduct).order_by('price').limit(3).page()
+        QueryProduct.get(3).execute().delete().execute()
+        query = self.session.query(QueryProduct).order_by('price').limit(3).after(page.cursor)
+        self.assertEqual([p.id for p in query.page().items], [4, 5, 6])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursorError):
+            self.session.query(QueryProduct).order_by('price').after('nope').page()
+        cursor = self.session.query(QueryProduct).order_by('price').limit(1).page().cursor
+        with self.assertRaises(InvalidCursorError):
+            self.session.query(QueryProduct).order_by('-price').after(cursor).all()
+        with self.assertRaises(InvalidCursorError):
+            self.session.query(QueryProduct).order_by('kind').page()
+
+
+class TestQueryIter(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/13')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        self.session = Session(self.fm)
+        t0 = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        for i in range(25):
+            QueryProduct(id=i, kind='book' if i % 2 else 'pen', price=i // 4, created_at=t0).save().execute()
+
+    def query(self):
+        return self.session.query(QueryProduct)
+
+    def test_ordered_by_index(self):
+        ids = [p.id for p in self.query().order_by('-price').iter(chunk_size=3)]
+        self.assertEqual(ids, [p.id for p in self.query().order_by('-price').all()])
+        ids = [p.id for p in self.query().filter_by(price__between=(1, 3)).iter(chunk_size=2)]
+        self.assertEqual(ids, [p.id for p in self.query().filter_by(price__between=(1, 3)).order_by('price').all()])
+
+    def test_unordered(self):
+        books = self.query().filter_by(kind='book').iter(chunk_size=4)
+        self.assertEqual(sorted(p.id for p in books), list(range(1, 25, 2)))
+        # scanned
+        last = self.query().filter_by(id__gte=20).iter(chunk_size=4)
+        self.assertEqual(sorted(p.id for p in last), [20, 21, 22, 23, 24])
+        self.assertEqual(list(self.query().filter_by(kind='none').iter()), [])
+
+    def test_intersection(self):
+        query = self.query().filter_by(kind='pen', price__lt=4).order_by('price')
+        self.assertEqual([p.id for p in query.iter(chunk_size=3)], [0, 2, 4, 6, 10, 8, 12, 14])
+        self.assertEqual(self.proxy.keys('QueryProduct:idx:__tmp__:*').execute(), [])
+
+    def test_loaded_first(self):
+        ids = [p.id for p in self.query().filter_by(kind='book').order_by('-id').limit(5).iter(chunk_size=2)]
+        self.assertEqual(ids, [23, 21, 19, 17, 15])
+
+
+class TestQueryCount(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/14')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        self.session = Session(self.fm)
+        t0 = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        for i in range(30):
+            QueryProduct(id=i, kind='book' if i % 3 else 'pen', price=i, created_at=t0, stock=i % 2).save().execute()
+
+    def query(self):
+        return self.session.query(QueryProduct)
+
+    def test_indexes(self):
+        self.assertEqual(self.query().filter_by(kind='pen').count(), 10)
+        self.assertEqual(self.query().filter_by(price__gte=10, price__lt=20).order_by('-price').limit(2).count(), 10)
+        self.assertEqual(self.query().filter_by(kind='pen', price__lt=15).count(), 5)
+        self.assertEqual(self.query().filter_by(kind='pen', stock=1, price__gt=3).count(), 4)
+        self.assertEqual(self.query().filter_by(kind='pencil').count(), 0)
+        self.assertEqual(self.proxy.keys('QueryProduct:idx:__tmp__:*').execute(), [])
+
+    def test_verify(self):
+        # left by another client
+        self.proxy.delete('QueryProduct:0', 'QueryProduct:3').execute()
+        self.assertEqual(self.query().filter_by(kind='pen').count(), 10)
+        self.assertEqual(self.query().filter_by(kind='pen', price__lt=15).count(verify=True), 3)
+        self.assertEqual(self.query().filter_by(kind='pen').count(verify=True), 8)
+        # repaired by the verified count
+        self.assertEqual(self.query().filter_by(kind='pen').count(), 8)
+
+    def test_conflicting_equalities(self):
+        query = self.query().filter_by(kind='pen').filter_by(kind='book')
+        self.assertEqual(query.explain().strategy, 'empty')
+        self.assertEqual(query.count(), 0)
+        self.assertEqual(query.all(), [])
+        self.assertEqual(self.query().filter_by(kind='pen').filter_by(kind='pen').count(), 10)
+
+    def test_checked_on_instances(self):
+        self.assertEqual(self.query().filter_by(kind='book', id__lt=10).count(), 6)
+        self.assertEqual(self.query().filter_by(id__gte=25).count(), 5)
+        self.assertEqual(self.query().count(), 30)
+        self.assertEqual(self.session.query(QueryUser).count(), 0)
+
+    def test_approximate(self):
+        self.assertEqual(self.query().filter_by(kind='book', id__lt=10).count(approximate=True), 6)
+        estimate = self.query().filter_by(price__lt=20, id__lt=10).count(approximate=True, sample_size=10)
+        self.assertTrue(0 <= estimate <= 20)
+        estimate = self.query().filter_by(kind='book', id__lt=10).count(approximate=True, sample_size=5)
+        self.assertTrue(0 <= estimate <= 20)
+        # sampled within the range only
+        self.assertEqual(self.query().filter_by(price__gte=20, id__gte=0).count(approximate=True, sample_size=5), 10)
+
+
+class TestBulkQuery(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/14')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        self.session = Session(self.fm)
+        for i in range(7):
+            QueryUser(id=i, name=f'n{i}', city='paris' if i < 5 else 'rome', age=30 + i % 2).save().execute()
+
+    def ids(self, **conditions):
+        return [u.id for u in self.session.query(QueryUser).filter_by(**conditions).all()]
+
+    def test_update(self):
+        query = self.session.query(QueryUser).filter_by(city='paris', age=30)
+        self.assertEqual(query.update(city='oslo', batch_size=2), 3)
+        self.assertEqual(self.ids(city='oslo'), [0, 2, 4])
+        self.assertEqual(self.ids(city='paris'), [1, 3])
+        self.assertEqual(QueryUser.get(2).execute().city, 'oslo')
+        # the changes of a field named like an option, and a scan
+        self.assertEqual(self.session.query(QueryUser).filter_by(name='n6').update({'name': 'x'}), 1)
+        self.assertEqual(self.ids(name='x'), [6])
+
+    def test_chunk_is_one_transaction(self):
+        for i in range(4):
+            QueryNote(id=i, text='draft' if i < 3 else 'done').save().execute()
+        calls = spy_pipelines(self, self.proxy)
+        self.assertEqual(self.session.query(QueryNote).filter_by(text='draft').update(text='sent', batch_size=10), 3)
+        # the three saves in the MULTI of the chunk
+        self.assertEqual(calls.count(True), 1)
+        self.assertEqual(sorted(n.id for n in self.session.query(QueryNote).filter_by(text='sent').all()), [0, 1, 2])
+
+    def test_delete(self):
+        self.assertEqual(self.session.query(QueryUser).filter_by(city='paris').delete(batch_size=2), 5)
+        self.assertEqual(self.ids(), [5, 6])
+        self.assertEqual(self.proxy.exists('QueryUser:idx:city:paris').execute(), 0)
+        self.assertEqual(self.members('QueryUser:idx:age:30'), ['6'])
+        self.assertEqual(self.session.query(QueryUser).filter_by(city='nowhere').delete(), 0)
+
+    def test_paged_and_limited(self):
+        query = self.session.query(QueryUser).filter_by(age=30).order_by('-id').limit(2)
+        self.assertEqual(query.delete(max_ops_per_second=1000), 2)
+        self.assertEqual(self.ids(age=30), [0, 2])
+
+    def test_unique_fields(self):
+        for i in range(3):
+            UniqueQueryAccount(id=i, email=f'{i}@x.com').save().execute()
+        self.assertEqual(self.session.query(UniqueQueryAccount).filter_by(city='paris').update(city='rome'), 3)
+        self.assertEqual(self.session.query(UniqueQueryAccount).filter_by(email='1@x.com').delete(), 1)
+        self.assertEqual(self.proxy.exists('UniqueQueryAccount:uniq:email:1@x.com').execute(), 0)
+        self.assertEqual(self.members('UniqueQueryAccount:idx:city:rome'), ['0', '2'])
+
+    def members(self, key):
+        return sorted(m.decode() for m in self.proxy.smembers(key).execute())
+
+
+class TestPrefixQuery(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/15')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        self.session = Session(self.fm)
+        for i, name in enumerate(['Alice', 'albert', 'Bob', 'alfred', 'Alba']):
+            city = 'rome' if i == 3 else 'paris'
+            QueryContact(id=i, name=name, email=f'{name.lower()}@x.com', city=city).save().execute()
+
+    def names(self, query):
+        return [c.name for c in query.all()]
+
+    def query(self, **conditions):
+        return self.session.query(QueryContact).filter_by(**conditions)
+
+    def members(self, key):
+        return [m.decode() for m in self.proxy.zrange(key, 0, -1).execute()]
+
+    def test_maintained(self):
+        self.assertEqual(self.members('QueryContact:idx:__prefix__:name'),
+                         ['alba\x004', 'albert\x001', 'alfred\x003', 'alice\x000', 'bob\x002'])
+        contact = QueryContact.get(2).execute()
+        contact.name = 'Bea'
+        contact.save().execute()
+        QueryContact.get(1).execute().delete().execute()
+        self.assertEqual(self.members('QueryContact:idx:__prefix__:name'),
+                         ['alba\x004', 'alfred\x003', 'alice\x000', 'bea\x002'])
+
+    def test_startswith(self):
+        query = self.query(name__startswith='AL')
+        self.assertIn('lex QueryContact:idx:__prefix__:name', str(query.explain()))
+        self.assertEqual(self.names(query), ['Alba', 'albert', 'alfred', 'Alice'])
+        self.assertEqual(self.names(self.query(name__startswith='alb').limit(1).offset(1)), ['albert'])
+        self.assertEqual(self.query(name__startswith='al').count(), 4)
+        self.assertEqual([c.name for c in self.query(name__startswith='al').iter(chunk_size=3)],
+                         ['Alba', 'albert', 'alfred', 'Alice'])
+        # without casefold the case is kept
+        self.assertEqual(self.names(self.query(email__startswith='al')), ['Alba', 'albert', 'alfred', 'Alice'])
+        self.assertEqual(self.names(self.query(email__startswith='Al')), [])
+        self.assertEqual(self.names(self.query(name__startswith='z')), [])
+
+    def test_with_other_conditions(self):
+        self.assertEqual(self.names(self.query(name__startswith='al', city='rome')), ['alfred'])
+        self.assertEqual(self.names(self.query(name__startswith='al', id__gte=3)), ['Alba', 'alfred'])
+        self.assertEqual(self.query(name__startswith='al', email__startswith='alb').count(), 2)
+
+    def test_marker_value(self):
+        # the set of the value '__prefix__' and the prefix index are two keys
+        QueryTag(id=1, tag='__prefix__').save().execute()
+        QueryTag(id=2, tag='__other__').save().execute()
+        query = self.session.query(QueryTag)
+        self.assertEqual([t.id for t in query.filter_by(tag='__prefix__').all()], [1])
+        self.assertEqual([t.id for t in self.session.query(QueryTag).filter_by(tag__startswith='__p').all()], [1])
+
+    def test_stale_members_removed(self):
+        key = 'QueryContact:idx:__prefix__:name'
+        self.proxy.zadd(key, {'alan\x009': 0, 'alex\x000': 0}).execute()
+        self.assertEqual(self.names(self.query(name__startswith='al')), ['Alba', 'albert', 'alfred', 'Alice'])
+        self.assertNotIn('alan\x009', self.members(key))
+        self.assertNotIn('alex\x000', self.members(key))
+        self.assertIn('alice\x000', self.members(key))
+
+
+class TestQueryAsync(unittest.TestCase):
+    def test_filter_by(self):
+        async def main():
+            fm = FlameModel('async', 'redis://:@localhost:6379/10')
+            await fm.adaptor.proxy.flushdb().execute()
+            user = QueryUser(id=1, name='a', city='paris', age=20)
+            await user.save().execute()
+            await QueryUser(id=2, name='b', city='paris', age=21).save().execute()
+            user.city = 'rome'
+            await user.save().execute()
+            query = Session(fm).query(QueryUser).filter_by(city='paris')
+            self.assertEqual([u.id for u in await query.all()], [2])
+            self.assertEqual((await Session(fm).query(QueryUser).filter_by(city='rome').first()).id, 1)
+            self.assertEqual([u.id async for u in Session(fm).query(QueryUser).filter_by(city='paris').iter()], [2])
+            self.assertEqual(await Session(fm).query(QueryUser).filter_by(city='rome').delete(), 1)
+            await fm.adaptor.proxy.aclose().execute()
+
+        asyncio.run(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import asyncio
+import unittest
+from src.flamemodel import FlameModel
+from src.flamemodel.core.bulk_delete import BulkDeleter
+from src.flamemodel.core.query_cache import QueryCache
+from src.flamemodel.core.session import Session
+from src.flamemodel.exceptions import QueryCacheNotSupportedError
+from src.flamemodel.models import Hash, String
+from src.flamemodel.models.fields import fields
+
+
+class CachedCity(String):
+    __query_cache__ = True
+
+    id: int = fields(primary_key=True)
+    name: str = fields()
+    country: str = fields(index=True)
+    population: int = fields(range_index=True)
+
+
+class CachedMember(Hash):
+    __query_cache__ = True
+
+    team: int = fields(primary_key=True)
+    name: str = fields(hash_field=True)
+    role: str = fields()
+
+
+class UncachedCity(String):
+    id: int = fields(primary_key=True)
+    country: str = fields(index=True)
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/12')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        self.session = Session(self.fm)
+        self.cache = QueryCache(max_entries=2)
+        for i, (name, country) in enumerate([('paris', 'fr'), ('lyon', 'fr'), ('rome', 'it')]):
+            CachedCity(id=i, name=name, country=country, population=i * 100).save().execute()
+
+    def names(self, **conditions):
+        query = self.session.query(CachedCity, cache=self.cache).filter_by(**conditions).order_by('-population')
+        return [c.name for c in query.all()]
+
+    def test_hit_until_write(self):
+        self.assertEqual(self.names(country='fr'), ['lyon', 'paris'])
+        self.assertEqual(self.names(country='fr'), ['lyon', 'paris'])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        CachedCity(id=3, name='nice', country='fr', population=50).save().execute()
+        self.assertEqual(self.names(country='fr'), ['lyon', 'nice', 'paris'])
+        CachedCity.get(1).execute().delete().execute()
+        self.assertEqual(self.names(country='fr'), ['nice', 'paris'])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+
+    def test_keys_and_lru(self):
+        self.names(country='fr')
+        self.names(country='it')
+        self.assertEqual(self.session.query(CachedCity, cache=self.cache).filter_by(country='fr').first().name, 'paris')
+        # the least recently used entry was evicted
+        self.assertEqual(self.names(country='fr'), ['lyon', 'paris'])
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 4))
+
+    def test_copies(self):
+        self.names(country='it')
+        query = self.session.query(CachedCity, cache=self.cache).filter_by(country='it').order_by('-population')
+        query.all()[0].name = 'changed'
+        self.assertEqual(self.names(country='it'), ['rome'])
+
+    def test_shared_tier(self):
+        shared = QueryCache(shared_ttl=30)
+        query = self.session.query(CachedCity, cache=shared).filter_by(population__gte=100)
+        self.assertEqual(sorted(c.name for c in query.all()), ['lyon', 'rome'])
+        other = QueryCache(shared_ttl=30)
+        query = self.session.query(CachedCity, cache=other).filter_by(population__gte=100)
+        self.assertEqual(sorted(c.name for c in query.all()), ['lyon', 'rome'])
+        self.assertEqual((other.hits, other.misses), (1, 0))
+        CachedCity(id=1, name='lyon', country='fr', population=10).save().execute()
+        query = self.session.query(CachedCity, cache=other).filter_by(population__gte=100)
+        self.assertEqual([c.name for c in query.all()], ['rome'])
+
+    def test_hash_writes(self):
+        CachedMember(team=1, name='ann', role='dev').save().execute()
+        roles = lambda: [m.name for m in self.session.query(CachedMember, cache=self.cache).filter_by(role='dev').all()]
+        self.assertEqual(roles(), ['ann'])
+        member = CachedMember(team=1, name='bob', role='dev')
+        member.save().execute()
+        self.assertEqual(sorted(roles()), ['ann', 'bob'])
+        member.hash_delete().execute()
+        self.assertEqual(roles(), ['ann'])
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 3))
+
+    def test_missing_generation(self):
+        # e.g. the generation key was evicted, or the data was written before the cache was enabled
+        CachedCity(id=4, name='oslo', country='no', population=1).save().execute()
+        self.proxy.delete('CachedCity:idx:__gen__').execute()
+        self.assertEqual(self.names(country='no'), ['oslo'])
+        self.assertEqual(self.names(country='no'), ['oslo'])
+        # the purge removes the generation key with the data
+        BulkDeleter(CachedCity).run()
+        self.assertEqual(self.names(country='no'), [])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_not_enabled(self):
+        with self.assertRaises(QueryCacheNotSupportedError):
+            self.session.query(UncachedCity, cache=self.cache)
+
+
+class TestQueryCacheAsync(unittest.TestCase):
+    def test_hit_until_write(self):
+        async def main():
+            fm = FlameModel('async', 'redis://:@localhost:6379/12')
+            await fm.adaptor.proxy.flushdb().execute()
+            cache = QueryCache()
+            await CachedCity(id=1, name='oslo', country='no', population=1).save().execute()
+            found = []
+            for _ in range(2):
+                found.append(await Session(fm).query(CachedCity, cache=cache).filter_by(country='no').all())
+            await CachedCity(id=2, name='bergen', country='no', population=2).save().execute()
+            found.append(await Session(fm).query(CachedCity, cache=cache).filter_by(country='no').all())
+            await fm.adaptor.proxy.aclose().execute()
+            return [len(f) for f in found], cache.hits
+
+        self.assertEqual(asyncio.run(main()), ([1, 1, 2], 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import datetime
+import hashlib
+import unittest
+from unittest import mock
+from redis.exceptions import ResponseError
+from src.flamemodel import FlameModel
+from src.flamemodel.core import server_filter
+from src.flamemodel.core.planner import QueryPlan
+from src.flamemodel.core.session import Session
+from src.flamemodel.models import String
+from src.flamemodel.models.fields import fields
+
+
+class FilteredItem(String):
+    id: int = fields(primary_key=True)
+    kind: str = fields(index=True)
+    price: float = fields(range_index=True)
+    label: str = fields(prefix_index=True, prefix_casefold=True)
+    color: str | None = fields(default=None)
+    qty: int = fields()
+    seen_at: datetime.datetime | None = fields(default=None)
+
+
+class TestServerFilter(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/9')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        self.session = Session(self.fm)
+        for i in range(40):
+            FilteredItem(
+                id=i, kind='ab'[i % 2], price=i % 13, label=f"{'xy'[i % 3 % 2]}{i}",
+                color=[None, 'red', 'blue'][i % 3], qty=i % 7
+            ).save().execute()
+
+    def query(self, server_filter=True):
+        return self.session.query(FilteredItem, server_filter=server_filter, batch_size=8)
+
+    def test_compiled(self):
+        t0 = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        query = self.query().filter_by(
+            kind='a', color=None, qty__between=(1, 3), label__startswith='X', seen_at__lt=t0, price__gt=2
+        )
+        plan = QueryPlan(
+            'index', key='FilteredItem:idx:kind:a', kind='set', residual=['color', 'qty', 'label', 'seen_at']
+        )
+        # the casefolded prefix and the datetime are left to the client
+        self.assertEqual(server_filter.predicates(query, plan), [['color', 'null', None], ['qty', 'between', [1, 3]]])
+        plan.residual = ['label']
+        self.assertIsNone(server_filter.predicates(query, plan))
+
+    def test_same_results(self):
+        queries = [
+            lambda q: q.filter_by(kind='a', color='red'),
+            lambda q: q.filter_by(kind='b', qty__gte=3, color=None).limit(3).offset(1),
+            lambda q: q.filter_by(price__gte=4, qty__lt=3).order_by('-price').limit(5).offset(2),
+            lambda q: q.filter_by(label__startswith='y', qty=2),
+            lambda q: q.filter_by(kind='a', price__lt=9, color='blue').order_by('price'),
+            # a set plan paged without order: by pk
+            lambda q: q.filter_by(kind='b', qty__gte=2).limit(4).offset(3),
+        ]
+        for build in queries:
+            expected = [i.id for i in build(self.query(server_filter=False)).all()]
+            self.assertTrue(expected)
+            self.assertEqual([i.id for i in build(self.query()).all()], expected)
+
+    def test_replies(self):
+        # the replies of the script are decoded without running it
+        query = self.query().filter_by(label__startswith='y', qty=2)
+        plan = query.explain()
+        self.assertEqual((plan.kind, plan.residual), ('lex', ['qty']))
+        compiled = server_filter.predicates(query, plan)
+        self.assertEqual(compiled, [['qty', 'eq', 2]])
+        value = FilteredItem(id=9, kind='b', price=9, label='y9', qty=2).model_dump_json()
+        other = FilteredItem(id=16, kind='a', price=3, label='y16', qty=2).model_dump_json()
+        replies = iter([[8, 8, [value, value]], [3, 3, [other, value]]])
+        with mock.patch.object(server_filter, '_run', lambda *args: None):
+            steps = server_filter.filter_steps(query, plan, compiled, None)
+            reply = None
+            try:
+                while True:
+                    steps.send(reply)
+                    reply = next(replies)
+            except StopIteration as stop:
+                found = stop.value
+        # a pk returned twice (a stale prefix entry, SSCAN) is kept once
+        self.assertEqual([i.id for i in found], [9, 16])
+
+    def test_script(self):
+        try:
+            self.proxy.eval('return 1', 0).execute()
+        except ResponseError:
+            self.skipTest('the server has no scripting')
+        query = self.query().filter_by(price__gte=4, color='red').order_by('price').limit(3)
+        self.assertEqual([(i.price, i.id) for i in query.all()], [(4.0, 4), (5.0, 31), (6.0, 19)])
+        sha = hashlib.sha1(server_filter._script.encode('utf-8')).hexdigest()
+        self.assertEqual(self.proxy.script_exists(sha).execute(), [True])
+        # loaded again after a flush of the script cache
+        self.proxy.script_flush().execute()
+        self.assertEqual(len(self.query().filter_by(kind='a', qty=0).all()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import asyncio
+import unittest
+from redis import Redis
+from src.flamemodel import FlameModel
+from src.flamemodel.core.key_builder import CompactKeyBuilder, DefaultKeyBuilder, KeyCodeRegistry, KeyResolver
+from src.flamemodel.exceptions import KeyCodeRegistryError
+from src.flamemodel.models import BaseRedisModel, String
+from src.flamemodel.models.fields import fields
+from src.flamemodel.models.metadata import FieldMetaData
+
+REDIS_URL = 'redis://:@localhost:6379/5'
+
+
+class CompactUserProfile(String):
+    id: str = fields(primary_key=True)
+    email: str = fields()
+
+
+class TestKeyCodeRegistry(unittest.TestCase):
+    def setUp(self):
+        self.client = Redis.from_url(REDIS_URL)
+        self.client.flushdb()
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_codes_are_shared(self):
+        first = KeyCodeRegistry(client=self.client)
+        second = KeyCodeRegistry(client=self.client)
+        self.assertEqual([first.code('User'), first.code('Order'), first.code('User')], ['0', '1', '0'])
+        # another process gets the same codes and resolves the new ones
+        self.assertEqual(second.code('Order'), '1')
+        self.assertEqual(first.code('Item'), '2')
+        self.assertEqual(second.name('2'), 'Item')
+        self.assertIsNone(second.name('zz'))
+
+    def test_misses_are_throttled(self):
+        registry = KeyCodeRegistry(client=self.client, reload_interval=60)
+        other = KeyCodeRegistry(client=self.client)
+        self.assertEqual(registry.code('User'), '0')
+        self.assertIsNone(registry.name('1'))
+        other.code('Order')
+        # the miss is answered from memory until the interval is over
+        self.assertIsNone(registry.name('1'))
+        registry.reload_interval = 0
+        self.assertEqual(registry.name('1'), 'Order')
+
+    def test_not_bound(self):
+        with self.assertRaises(KeyCodeRegistryError):
+            KeyCodeRegistry().code('User')
+
+
+class TestCompactKeyBuilder(unittest.TestCase):
+    def setUp(self):
+        self.client = Redis.from_url(REDIS_URL)
+        self.client.flushdb()
+        self.builder = CompactKeyBuilder(hash_pk_over=24)
+        self.builder.registry.bind(self.client)
+        self.pk_info = {'id': FieldMetaData(primary_key=True)}
+
+    def tearDown(self):
+        self.client.close()
+
+    def primary_key(self, pk):
+        return self.builder.primary_key(
+            model=CompactUserProfile, shard_tags=[], pk=pk, pk_field_name='id', pk_field_info=self.pk_info
+        )
+
+    def test_keys(self):
+        self.assertEqual(self.primary_key('42'), '0:42')
+        index = self.builder.index_key(
+            model=CompactUserProfile, shard_tags=[], index_fields=['email'],
+            index_values=['a@b.c'], pk='42', index_fields_info=[]
+        )
+        self.assertEqual(index, '0:#:1:a@b.c')
+        default = DefaultKeyBuilder().index_key(
+            model=CompactUserProfile, shard_tags=[], index_fields=['email'],
+            index_values=['a@b.c'], pk='42', index_fields_info=[]
+        )
+        self.assertLess(len(index), len(default) / 2)
+
+    def test_parse_key(self):
+        self.primary_key('42')
+        self.assertEqual(
+            self.builder.parse_key('0:42'),
+            {'model': 'CompactUserProfile', 'type': 'primary', 'pk': '42'}
+        )
+        fk = self.builder.foreign_key(
+            model=CompactUserProfile, foreign_model=CompactUserProfile,
+            field_name='email', pk='42', foreign_pk='7'
+        )
+        parsed = self.builder.parse_key(fk)
+        self.assertEqual((parsed['type'], parsed['pk'], parsed['field']), ('foreign', '42', 'email'))
+
+    def test_long_pk_digest(self):
+        pk = 'x' * 64
+        key = self.primary_key(pk)
+        self.assertEqual(key, self.primary_key(pk))
+        self.assertLess(len(key), 24)
+        parsed = self.builder.parse_key(key)
+        self.assertIsNone(parsed['pk'])
+        self.assertTrue(parsed['pk_digest'].startswith('~'))
+        compiled = self.builder.compile_primary_key(
+            model=CompactUserProfile, shard_tags=[], pk_field_name='id', pk_field_info=self.pk_info
+        )
+        self.assertEqual(compiled(pk), key)
+        self.assertEqual(compiled('short'), '0:short')
+
+    def test_hash_pk_over_too_small(self):
+        with self.assertRaises(ValueError):
+            CompactKeyBuilder(hash_pk_over=4)
+
+
+class TestCompactKeyBuilderModel(unittest.TestCase):
+    def setUp(self):
+        self.previous = BaseRedisModel.__key_builder__
+        self.fm = FlameModel(
+            'sync',
+            REDIS_URL,
+            key_builder_cls='src.flamemodel.core.key_builder:CompactKeyBuilder'
+        )
+        self.fm.adaptor.proxy.flushdb().execute()
+
+    def tearDown(self):
+        BaseRedisModel.set_key_builder(self.previous or DefaultKeyBuilder())
+
+    def test_save_and_get(self):
+        CompactUserProfile(id='42', email='a@b.c').save().execute()
+        keys = {key.decode() for key in self.fm.adaptor.proxy.keys('*').execute()}
+        self.assertEqual(keys, {'0:42', '__flamemodel__:keycodes'})
+        self.assertEqual(CompactUserProfile.get('42').execute().email, 'a@b.c')
+        # a new builder (e.g. after a deploy) reuses the persisted codes
+        builder = CompactKeyBuilder()
+        builder.bind_adaptor(self.fm.adaptor)
+        parsed = KeyResolver(builder, [CompactUserProfile]).parse_key('0:42')
+        self.assertEqual((parsed.model, parsed.pk), (CompactUserProfile, '42'))
+
+
+class TestCompactKeyBuilderAsync(unittest.TestCase):
+    def setUp(self):
+        self.previous = BaseRedisModel.__key_builder__
+
+    def tearDown(self):
+        BaseRedisModel.set_key_builder(self.previous or DefaultKeyBuilder())
+
+    def test_prepare(self):
+        async def main():
+            fm = FlameModel('async', REDIS_URL, key_builder_cls='src.flamemodel.core.key_builder:CompactKeyBuilder')
+            await fm.adaptor.proxy.flushdb().execute()
+            builder = BaseRedisModel.__key_builder__
+            with self.assertRaises(KeyCodeRegistryError):
+                CompactUserProfile.primary_key('42')
+            await builder.prepare([CompactUserProfile])
+            await CompactUserProfile(id='42', email='a@b.c').save().execute()
+            user = await CompactUserProfile.get('42').execute()
+            keys = await fm.adaptor.proxy.keys('0:*').execute()
+            await fm.adaptor.proxy.aclose().execute()
+            return user.email, keys
+
+        self.assertEqual(asyncio.run(main()), ('a@b.c', [b'0:42']))
+
+
+if __name__ == '__main__':
+    unittest.main()
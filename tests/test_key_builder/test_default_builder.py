@@ -1,6 +1,7 @@
 import unittest
 from src.flamemodel.core.key_builder import DefaultKeyBuilder, KeyBuilderProtocol
-from src.flamemodel.models import BaseRedisModel
+from src.flamemodel.models import BaseRedisModel, String
+from src.flamemodel.models.fields import fields
 from src.flamemodel.models.metadata import FieldMetaData
 
 
@@ -227,5 +228,104 @@ class TestDefaultKeyBuilder(unittest.TestCase):
         self.assertEqual(namespace, 'User')
 
 
+    def test_compile_primary_key(self):
+        """Test compiled primary key functions match primary_key"""
+        pk_field_info = {'id': FieldMetaData(primary_key=True)}
+        builders = [self.builder, DefaultKeyBuilder(namespace='app'), DefaultKeyBuilder(delimiter='/')]
+        for builder in builders:
+            for shard_tags in ([], ['us-west', 'prod']):
+                func = builder.compile_primary_key(
+                    model=self.model,
+                    shard_tags=shard_tags,
+                    pk_field_name='id',
+                    pk_field_info=pk_field_info
+                )
+                for pk in (123, 'abc'):
+                    expected = builder.primary_key(
+                        model=self.model,
+                        shard_tags=shard_tags,
+                        pk=pk,
+                        pk_field_name='id',
+                        pk_field_info=pk_field_info
+                    )
+                    self.assertEqual(func(pk), expected)
+
+    def test_compile_primary_key_with_format_spec(self):
+        """Test key patterns which aren't a plain placeholder keep str.format"""
+        class PaddedModel(BaseRedisModel):
+            __redis_type__ = 'string'
+            __key_pattern__ = 'Padded:{pk:05d}:{{raw}}'
+
+        func = self.builder.compile_primary_key(
+            model=PaddedModel,
+            shard_tags=[],
+            pk_field_name='id',
+            pk_field_info={'id': FieldMetaData(primary_key=True)}
+        )
+        self.assertEqual(func(42), 'Padded:00042:{raw}')
+
+
+class DuckKeyBuilder:
+    """A key builder implementing the protocol without inheriting it, nor compiling primary keys"""
+
+    def __init__(self):
+        self.builder = DefaultKeyBuilder(delimiter='/')
+
+    def primary_key(self, **kwargs):
+        return self.builder.primary_key(**kwargs)
+
+    def index_key(self, **kwargs):
+        return self.builder.index_key(**kwargs)
+
+    def unique_key(self, **kwargs):
+        return self.builder.unique_key(**kwargs)
+
+    def foreign_key(self, **kwargs):
+        return self.builder.foreign_key(**kwargs)
+
+    def relationship_key(self, **kwargs):
+        return self.builder.relationship_key(**kwargs)
+
+    def backref_key(self, **kwargs):
+        return self.builder.backref_key(**kwargs)
+
+    def hash_field_key(self, **kwargs):
+        return self.builder.hash_field_key(**kwargs)
+
+    def model_collection_key(self, **kwargs):
+        return self.builder.model_collection_key(**kwargs)
+
+    def key_pattern(self, **kwargs):
+        return self.builder.key_pattern(**kwargs)
+
+    def format_shard_tags(self, shard_tags):
+        return self.builder.format_shard_tags(shard_tags)
+
+    def parse_key(self, key):
+        return self.builder.parse_key(key)
+
+    def get_namespace(self, model):
+        return self.builder.get_namespace(model)
+
+
+class DuckUser(String):
+    id: int = fields(primary_key=True)
+
+
+class TestDuckKeyBuilder(unittest.TestCase):
+    def setUp(self):
+        self.previous = BaseRedisModel.__key_builder__
+
+    def tearDown(self):
+        BaseRedisModel.set_key_builder(self.previous or DefaultKeyBuilder())
+
+    def test_set_key_builder(self):
+        """Test a builder without compile_primary_key is accepted and used"""
+        builder = DuckKeyBuilder()
+        self.assertIsInstance(builder, KeyBuilderProtocol)
+        BaseRedisModel.set_key_builder(builder)
+        self.assertEqual(DuckUser(id=7).get_primary_key(), 'DuckUser/7')
+
+
 if __name__ == '__main__':
     unittest.main()
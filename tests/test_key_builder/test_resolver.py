@@ -0,0 +1,71 @@
+import unittest
+from src.flamemodel.core.key_builder import DefaultKeyBuilder, KeyResolver
+from src.flamemodel.models import String, Hash
+from src.flamemodel.models.fields import fields
+
+
+class ResUser(String):
+    id: int = fields(primary_key=True)
+    name: str = fields()
+
+
+class ResUserArchive(String):
+    __schema__ = 'ResUser:archive'
+
+    id: str = fields(primary_key=True)
+
+
+class ResCart(Hash):
+    __key_pattern__ = 'cart:{pk}:items'
+
+    owner: int = fields(primary_key=True)
+    item: str = fields(hash_field=True)
+
+
+class TestKeyResolver(unittest.TestCase):
+    def setUp(self):
+        self.resolver = KeyResolver(DefaultKeyBuilder(), [ResUser, ResUserArchive, ResCart])
+
+    def test_parse_primary_keys(self):
+        parsed = self.resolver.parse_key('ResUser:42')
+        self.assertIs(parsed.model, ResUser)
+        self.assertEqual(parsed.pk, 42)
+        self.assertEqual(parsed.key, 'ResUser:42')
+        parsed = self.resolver.parse_key(b'cart:7:items')
+        self.assertIs(parsed.model, ResCart)
+        self.assertEqual(parsed.pk, 7)
+
+    def test_longest_prefix_wins(self):
+        parsed = self.resolver.parse_key('ResUser:archive:abc')
+        self.assertIs(parsed.model, ResUserArchive)
+        self.assertEqual(parsed.pk, 'abc')
+
+    def test_unknown_keys(self):
+        self.assertIsNone(self.resolver.parse_key('Other:1'))
+        self.assertIsNone(self.resolver.parse_key('ResUser:abc'))
+        self.assertIsNone(self.resolver.parse_key('ResUser:1:idx:name'))
+
+    def test_parse_keys(self):
+        parsed = self.resolver.parse_keys([b'ResUser:1', 'Other:1', 'cart:2:items'])
+        self.assertEqual([item and item.pk for item in parsed], [1, None, 2])
+
+    def test_namespace(self):
+        resolver = KeyResolver(DefaultKeyBuilder(namespace='app'), [ResUser])
+        self.assertEqual(resolver.parse_key('app:ResUser:3').pk, 3)
+        self.assertIsNone(resolver.parse_key('ResUser:3'))
+
+    def test_defined_models_by_default(self):
+        resolver = KeyResolver(DefaultKeyBuilder())
+        self.assertIn(ResCart, resolver.models)
+        self.assertIs(resolver.parse_key('ResUser:archive:abc').model, ResUserArchive)
+        self.assertEqual(resolver.parse_key('cart:5:items').pk, 5)
+
+    def test_parse_key_cache_returns_copies(self):
+        builder = DefaultKeyBuilder()
+        result = builder.parse_key('User:123:fk:user_id')
+        result['pk'] = 'changed'
+        self.assertEqual(builder.parse_key('User:123:fk:user_id')['pk'], '123')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from src.flamemodel.models import BitMap, Geo, Hash, ZSet
+from src.flamemodel.models.fields import fields
+from src.flamemodel.utils.parse_model_metadata import parse_model_metadata
+
+
+class AccessorHash(Hash):
+    user_id: int = fields(primary_key=True)
+    label: str = fields(hash_field=True)
+
+
+class AccessorRank(ZSet):
+    board: str = fields(primary_key=True)
+    points: float = fields(score_field=True)
+
+
+class AccessorShop(Geo):
+    city: str = fields(primary_key=True)
+    name: str = fields(member_field=True)
+    lng: float = fields(lng_field=True)
+    lat: float = fields(lat_field=True)
+
+
+class AccessorFlags(BitMap):
+    user_id: int = fields(primary_key=True)
+    vip: bool = fields(flag=3)
+    active: bool = fields(flag=1)
+
+
+class TestModelAccessors(unittest.TestCase):
+    def setUp(self):
+        for model in (AccessorHash, AccessorRank, AccessorShop, AccessorFlags):
+            model.__model_meta__ = parse_model_metadata(model)
+
+    def test_pk_and_hash_field(self):
+        accessors = AccessorHash.__model_meta__.accessors
+        self.assertEqual((accessors.pk_field, accessors.hash_field), ('user_id', 'label'))
+        item = AccessorHash(user_id=1, label='home')
+        self.assertEqual(item.pk_info(), (1, 'user_id'))
+        self.assertEqual(item.hash_field, ('label', 'home'))
+
+    def test_score_field(self):
+        self.assertEqual(AccessorRank._score_field(), 'points')
+        self.assertEqual(AccessorRank(board='b', points=2).score_value, 2.0)
+
+    def test_geo_fields(self):
+        self.assertEqual(AccessorShop._geo_fields(), ('name', 'lng', 'lat'))
+        shop = AccessorShop(city='paris', name='bakery', lng=2.35, lat=48.85)
+        self.assertEqual(shop.geo_tuple, (2.35, 48.85, 'bakery'))
+
+    def test_bitmap_offsets(self):
+        accessors = AccessorFlags.__model_meta__.accessors
+        self.assertEqual(AccessorFlags._bitmap_offset(), (('active', 1), ('vip', 3)))
+        flags = AccessorFlags(user_id=1, vip=True, active=False)
+        self.assertEqual(accessors.bitmap_getter(flags), (False, True))
+
+    def test_accessors_are_frozen(self):
+        with self.assertRaises(Exception):
+            AccessorHash.__model_meta__.accessors.pk_field = 'other'
+
+
+if __name__ == '__main__':
+    unittest.main()
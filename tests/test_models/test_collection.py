@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+from src.flamemodel import FlameModel
+from src.flamemodel.core.session import Session
+from src.flamemodel.exceptions import CollectionNotSupportedError
+from src.flamemodel.models import String, Hash, List
+from src.flamemodel.models.fields import fields
+
+
+class ColUser(String):
+    __collection__ = 'set'
+
+    id: int = fields(primary_key=True)
+    name: str = fields()
+
+
+class ColEvent(String):
+    __collection__ = 'zset'
+    __storage_mode__ = 'fields'
+
+    id: int = fields(primary_key=True)
+    kind: str = fields()
+
+
+class ColAddress(Hash):
+    __collection__ = 'set'
+
+    user_id: int = fields(primary_key=True)
+    label: str = fields(hash_field=True)
+
+
+class ColPlain(String):
+    id: int = fields(primary_key=True)
+
+
+class TestCollection(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/6')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+
+    def test_set_collection(self):
+        for i in range(25):
+            self.assertTrue(ColUser(id=i, name=str(i)).save().execute())
+        self.assertEqual(ColUser.collection_key(), 'ColUser:all')
+        self.assertEqual(ColUser.count().execute(), 25)
+        self.assertEqual(sorted(ColUser.iter_pks(batch_size=10)), list(range(25)))
+        ColUser(id=3, name='3').delete().execute()
+        self.assertEqual(ColUser.count().execute(), 24)
+        self.assertIsNone(ColUser.get(3).execute())
+        self.assertNotIn(3, set(ColUser.iter_pks()))
+
+    def test_zset_pages_in_write_order(self):
+        for i in (5, 1, 9, 3):
+            ColEvent(id=i, kind='x').save().execute()
+        cursor, pks = ColEvent.page(0, count=3).execute()
+        self.assertEqual((cursor, pks), (3, [5, 1, 9]))
+        self.assertEqual(ColEvent.page(cursor, count=3).execute(), (0, [3]))
+        self.assertEqual(ColEvent.get(9).execute().kind, 'x')
+
+    def test_hash_collection(self):
+        ColAddress(user_id=1, label='home').save().execute()
+        ColAddress(user_id=1, label='work').save().execute()
+        ColAddress(user_id=2, label='home').save().execute()
+        self.assertEqual(sorted(ColAddress.iter_pks()), [1, 2])
+
+    def test_session_commit(self):
+        session = Session(self.fm).begin()
+        session.add_all([ColUser(id=1, name='a'), ColUser(id=2, name='b'), ColPlain(id=3)])
+        self.assertEqual(session.commit(), [True, True, True])
+        self.assertEqual(ColUser.count().execute(), 2)
+        self.assertIsNotNone(ColPlain.get(3).execute())
+
+    def test_not_enabled(self):
+        with self.assertRaises(CollectionNotSupportedError):
+            ColPlain.count()
+        self.assertFalse(self.proxy.exists('ColPlain:all').execute())
+
+    def test_not_supported_model(self):
+        with self.assertRaises(CollectionNotSupportedError):
+            class ColTasks(List):
+                __collection__ = 'set'
+
+                id: int = fields(primary_key=True)
+
+
+class TestAsyncCollection(unittest.TestCase):
+    def test_async_iter(self):
+        async def main():
+            fm = FlameModel('async', 'redis://:@localhost:6379/6')
+            await fm.adaptor.proxy.flushdb().execute()
+            for i in range(7):
+                await ColUser(id=i, name='x').save().execute()
+            pks = [pk async for pk in ColUser.iter_pks(batch_size=3)]
+            count = await ColUser.count().execute()
+            await fm.adaptor.proxy.aclose().execute()
+            return pks, count
+
+        pks, count = asyncio.run(main())
+        self.assertEqual(sorted(pks), list(range(7)))
+        self.assertEqual(count, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+from datetime import datetime
+from typing import List, Optional
+from src.flamemodel import FlameModel
+from src.flamemodel.models import String
+from src.flamemodel.models.fields import fields
+from src.flamemodel.core.session import Session
+from src.flamemodel.exceptions import (
+    StorageModeNotSupportedError, FieldNotFoundError, PartialModelError, IncrNotSupportedError,
+    RangeIndexNotSupportedError
+)
+
+
+class Profile(String):
+    __schema__ = 'FieldProfile'
+    __storage_mode__ = 'fields'
+
+    id: int = fields(primary_key=True)
+    nickname: str = fields()
+    visits: int = fields(default=0)
+    balance: float = fields(default=0.0)
+    tags: List[str] = fields(default_factory=list)
+    last_login: Optional[datetime] = fields(default=None)
+
+
+class Badge(String):
+    __storage_mode__ = 'fields'
+
+    id: int = fields(primary_key=True)
+    tags: List[str] = fields(index=True, serializer=','.join, deserializer=lambda x: x.split(','))
+    note: Optional[str] = fields(default=None, exclude_from_dump=True)
+
+
+class Score(String):
+    __storage_mode__ = 'fields'
+
+    id: int = fields(primary_key=True)
+    points: int = fields(range_index=True)
+    team: str = fields(index=True)
+
+
+class TestFieldStorage(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel(
+            'sync',
+            'redis://:@localhost:6379/2'
+        )
+        self.fm.adaptor.proxy.flushdb().execute()
+        self.profile = Profile(
+            id=1, nickname='Jack', visits=3, balance=1.5,
+            tags=['a', 'b'], last_login=datetime(2025, 1, 1, 8, 30)
+        )
+        self.profile.save().execute()
+
+    def test_stored_as_hash_fields(self):
+        stored = self.fm.adaptor.proxy.hgetall('FieldProfile:1').execute()
+        self.assertEqual(stored[b'nickname'], b'"Jack"')
+        self.assertEqual(stored[b'visits'], b'3')
+        self.assertEqual(stored[b'tags'], b'["a","b"]')
+
+    def test_get_full_model(self):
+        profile = Profile.get(1).execute()
+        self.assertEqual(profile, self.profile)
+
+    def test_get_only(self):
+        profile = Profile.get(1, only=['visits', 'last_login']).execute()
+        self.assertEqual(profile.visits, 3)
+        self.assertEqual(profile.last_login, datetime(2025, 1, 1, 8, 30))
+        self.assertEqual(profile.model_fields_set, {'visits', 'last_login'})
+        with self.assertRaises(FieldNotFoundError):
+            Profile.get(1, only=['missing'])
+
+    def test_partial_keeps_pk(self):
+        profile = Profile.get(1, only=['visits']).execute()
+        self.assertEqual(profile.id, 1)
+        self.assertEqual(profile.get_primary_key(), 'FieldProfile:1')
+        with self.assertRaises(PartialModelError):
+            profile.save()
+        with self.assertRaises(PartialModelError):
+            profile.update(visits=4)
+        self.assertEqual(profile.incr_field('visits').execute(), 4)
+        self.assertEqual(self.fm.adaptor.proxy.keys('FieldProfile:*').execute(), [b'FieldProfile:1'])
+
+    def test_update_writes_changed_fields(self):
+        self.fm.adaptor.proxy.hset('FieldProfile:1', 'nickname', '"Other"').execute()
+        self.profile.update(visits='10').execute()
+        self.assertEqual(self.profile.visits, 10)
+        profile = Profile.get(1).execute()
+        self.assertEqual(profile.visits, 10)
+        # untouched fields were not rewritten
+        self.assertEqual(profile.nickname, 'Other')
+
+    def test_incr_field(self):
+        self.assertEqual(self.profile.incr_field('visits', 2).execute(), 5)
+        self.assertEqual(self.profile.incr_field('balance', 0.25).execute(), 1.75)
+        profile = Profile.get(1).execute()
+        self.assertEqual((profile.visits, profile.balance), (5, 1.75))
+
+    def test_field_options(self):
+        Badge(id=1, tags=['a', 'b'], note='secret').save().execute()
+        stored = self.fm.adaptor.proxy.hgetall('Badge:1').execute()
+        # the same logical document as the blob mode
+        self.assertEqual(stored, {b'id': b'1', b'tags': b'"a,b"'})
+        badge = Badge.get(1).execute()
+        self.assertEqual((badge.tags, badge.note), (['a', 'b'], None))
+        self.assertEqual(Badge.get(1, only=['tags']).execute().tags, ['a', 'b'])
+        badge.update(tags=['c']).execute()
+        self.assertEqual(Badge.get(1).execute().tags, ['c'])
+
+    def test_incr_field_indexes(self):
+        for i in range(3):
+            Score(id=i, points=i * 10, team='a').save().execute()
+        Score.get(0).execute().incr_field('points', 25).execute()
+        query = Session(self.fm).query(Score).filter_by(points__gte=20).order_by('-points')
+        self.assertEqual([s.id for s in query.all()], [0, 2])
+        with self.assertRaises(IncrNotSupportedError):
+            Score.get(1).execute().incr_field('team')
+
+    def test_range_index_type(self):
+        with self.assertRaises(RangeIndexNotSupportedError):
+            class BadScore(String):
+                id: int = fields(primary_key=True)
+                name: str = fields(range_index=True)
+
+        class GoodScore(String):
+            id: int = fields(primary_key=True)
+            at: Optional[datetime] = fields(default=None, range_index=True)
+
+    def test_blob_model_rejects_partial_read(self):
+        class BlobProfile(String):
+            id: int = fields(primary_key=True)
+
+        with self.assertRaises(StorageModeNotSupportedError):
+            BlobProfile(id=1).incr_field('id')
+
+
+if __name__ == '__main__':
+    unittest.main()
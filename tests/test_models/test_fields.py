@@ -29,3 +29,22 @@ class TestFields(unittest.TestCase):
         print('fields json schema ->', fields_json_schema)
         print('id fields schema ->', id_json_schema)
         self.assertIn(FlameModelJsonSchemaKey, id_json_schema.keys())
+
+    def test_metadata_on_field_info(self):
+        from unittest import mock
+        from src.flamemodel.models.metadata import FieldMetaData, get_field_metadata
+        from src.flamemodel.utils.parse_model_metadata import parse_model_metadata
+
+        class IndexedModel(BaseRedisModel):
+            __redis_type__ = 'string'
+
+            id: int = fields(primary_key=True, primary_key_factory=int)
+            email: str = fields(index=True)
+
+        metadata = get_field_metadata(IndexedModel.model_fields['email'])
+        self.assertIsInstance(metadata, FieldMetaData)
+        self.assertTrue(metadata.index)
+        with mock.patch.object(IndexedModel, 'model_json_schema', side_effect=AssertionError):
+            meta = parse_model_metadata(IndexedModel)
+        self.assertEqual(meta.accessors.pk_field, 'id')
+        self.assertEqual([list(item) for item in meta.indexes], [['email']])
@@ -0,0 +1,56 @@
+import unittest
+from typing import Optional
+from src.flamemodel.core.serializer import DefaultSerializer
+from src.flamemodel.models import BaseRedisModel, LazyModel, LazyModelList
+from src.flamemodel.models.fields import fields
+
+
+class LazyTask(BaseRedisModel):
+    __redis_type__ = 'list'
+
+    id: int = fields(primary_key=True)
+    title: str = fields()
+    priority: Optional[int] = fields(default=None)
+
+
+class TestLazyModelList(unittest.TestCase):
+    def setUp(self):
+        BaseRedisModel.set_serializer(DefaultSerializer())
+        self.raws = [
+            LazyTask(id=i, title=f'task-{i}', priority=i % 3).model_dump_json().encode('utf-8')
+            for i in range(10)
+        ]
+        self.result = LazyModelList(self.raws, LazyTask)
+
+    def test_len_and_slice_do_not_parse(self):
+        self.assertEqual(len(self.result), 10)
+        sliced = self.result[2:5]
+        self.assertIsInstance(sliced, LazyModelList)
+        self.assertEqual(len(sliced), 3)
+        self.assertFalse(any(proxy.is_resolved for proxy in self.result))
+
+    def test_attribute_access_resolves_once(self):
+        proxy = self.result[-1]
+        self.assertIsInstance(proxy, LazyModel)
+        self.assertFalse(proxy.is_resolved)
+        self.assertEqual(proxy.title, 'task-9')
+        self.assertTrue(proxy.is_resolved)
+        self.assertIs(proxy.resolve(), self.result[9].resolve())
+
+    def test_peek_does_not_build_model(self):
+        high = [proxy for proxy in self.result if proxy.peek('priority') == 2]
+        self.assertEqual([proxy.peek('id') for proxy in high], [2, 5, 8])
+        self.assertFalse(any(proxy.is_resolved for proxy in self.result))
+
+    def test_materialize(self):
+        models = self.result[:3].materialize()
+        self.assertEqual([m.id for m in models], [0, 1, 2])
+        self.assertTrue(all(isinstance(m, LazyTask) for m in models))
+
+    def test_index_error(self):
+        with self.assertRaises(IndexError):
+            self.result[10]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from src.flamemodel.models import String, RedisModelRepository
+from src.flamemodel.models.fields import fields
+from src.flamemodel.models.repository import LazyModelMetadata
+
+
+class LazyBase(String):
+    __abstract__ = True
+
+    id: int = fields(primary_key=True)
+
+
+class LazyAccount(LazyBase):
+    name: str = fields()
+
+
+class LazyAdminAccount(LazyAccount):
+    level: int = fields(index=True)
+
+
+class TestLazyMetadata(unittest.TestCase):
+    def test_registered_at_class_creation(self):
+        repo = RedisModelRepository()._repo
+        self.assertIs(repo['LazyAdminAccount'], LazyAdminAccount)
+        self.assertNotIn('LazyBase', repo)
+        self.assertNotIn('String', repo)
+
+    def test_parsed_on_first_use(self):
+        class LazyNote(String):
+            id: int = fields(primary_key=True)
+
+        self.assertIsInstance(LazyNote.__dict__['__model_meta__'], LazyModelMetadata)
+        meta = LazyNote.__model_meta__
+        self.assertEqual(meta.accessors.pk_field, 'id')
+        self.assertIs(LazyNote.__dict__['__model_meta__'], meta)
+
+    def test_abstract_has_no_metadata(self):
+        self.assertIsNone(LazyBase.__model_meta__)
+        self.assertIsNone(String.__model_meta__)
+
+    def test_subclass_has_its_own_metadata(self):
+        parent = LazyAccount.__model_meta__
+        child = LazyAdminAccount.__model_meta__
+        self.assertIsNot(parent, child)
+        self.assertEqual([list(item) for item in child.indexes], [['level']])
+
+    def test_parsed_once_across_threads(self):
+        class LazyCounter(String):
+            id: int = fields(primary_key=True)
+
+        from src.flamemodel.models import repository
+        with mock.patch.object(repository, 'parse_model_metadata', wraps=repository.parse_model_metadata) as parse:
+            with ThreadPoolExecutor(8) as pool:
+                metas = list(pool.map(lambda _: LazyCounter.__model_meta__, range(32)))
+        self.assertEqual(parse.call_count, 1)
+        self.assertTrue(all(meta is metas[0] for meta in metas))
+
+
+if __name__ == '__main__':
+    unittest.main()
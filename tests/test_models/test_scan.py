@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+from unittest import mock
+from redis import Redis
+from src.flamemodel import FlameModel
+from src.flamemodel.exceptions import ScanNotSupportedError
+from src.flamemodel.models import String, Hash, List
+from src.flamemodel.models.fields import fields
+from src.flamemodel.models.scan import KeyScanner
+
+
+class ScanUser(String):
+    id: int = fields(primary_key=True)
+    name: str = fields()
+
+
+class ScanProfile(String):
+    __storage_mode__ = 'fields'
+
+    id: int = fields(primary_key=True)
+    name: str = fields()
+
+
+class ScanAddress(Hash):
+    user_id: int = fields(primary_key=True)
+    label: str = fields(hash_field=True)
+
+
+class ScanQueue(List):
+    id: int = fields(primary_key=True)
+
+
+class _Node:
+    def __init__(self, name, client):
+        self.name = name
+        self.client = client
+
+
+class _TwoNodes:
+    """Two databases standing for the primaries of a cluster."""
+
+    def __init__(self, url):
+        self.nodes = [_Node(f'node{db}', Redis.from_url(f'{url}/{db}')) for db in (7, 8)]
+
+    def get_primaries(self):
+        return self.nodes
+
+    def scan(self, cursor=0, target_nodes=None, **kwargs):
+        cursor, keys = target_nodes.client.scan(cursor, **kwargs)
+        return {target_nodes.name: cursor}, keys
+
+
+class TestScan(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/7')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        for i in range(30):
+            ScanUser(id=i, name=f'n{i}').save().execute()
+        # secondary keys sharing the prefix of the model
+        self.proxy.set('ScanUser:idx:name:n1', '1').execute()
+        self.proxy.sadd('ScanUser:all', '1').execute()
+
+    def test_scan_keys(self):
+        keys = list(ScanUser.scan_keys(count=7))
+        self.assertEqual(sorted(keys), sorted(f'ScanUser:{i}' for i in range(30)))
+        self.assertEqual(len(list(ScanUser.scan_keys(match='ScanUser:idx:*'))), 1)
+
+    def test_keys_uses_pattern(self):
+        self.assertEqual(len(ScanUser.keys().execute()), 30)
+        self.assertEqual(len(ScanUser.keys('ScanUser:1?').execute()), 10)
+
+    def test_scan_instances(self):
+        users = list(ScanUser.scan_instances(count=8))
+        self.assertEqual(sorted(user.id for user in users), list(range(30)))
+        ScanProfile(id=1, name='p').save().execute()
+        self.assertEqual([p.name for p in ScanProfile.scan_instances()], ['p'])
+        ScanAddress(user_id=1, label='home').save().execute()
+        ScanAddress(user_id=1, label='work').save().execute()
+        self.assertEqual(sorted(a.label for a in ScanAddress.scan_instances()), ['home', 'work'])
+
+    def test_scan_instances_once(self):
+        # SCAN may return a key again, e.g. when the keyspace is rehashed
+        pages = KeyScanner.pages
+
+        def twice(scanner):
+            for page in pages(scanner):
+                yield page
+                yield page[:3]
+
+        with mock.patch.object(KeyScanner, 'pages', twice):
+            users = list(ScanUser.scan_instances(count=8))
+        self.assertEqual(sorted(user.id for user in users), list(range(30)))
+
+    def test_not_supported(self):
+        with self.assertRaises(ScanNotSupportedError):
+            ScanQueue.scan_instances()
+
+    def test_cluster_fan_out(self):
+        cluster = _TwoNodes('redis://:@localhost:6379')
+        other = cluster.nodes[1].client
+        other.flushdb()
+        other.set('ScanUser:100', '{}')
+        scanner = KeyScanner(ScanUser, count=5)
+        scanner.client, scanner.is_cluster = cluster, True
+        keys = [key for page in scanner.pages() for key in page]
+        self.assertEqual(len(keys), 31)
+        self.assertIn('ScanUser:100', keys)
+        other.flushdb()
+        for node in cluster.nodes:
+            node.client.close()
+
+
+class TestAsyncScan(unittest.TestCase):
+    def test_async_scan(self):
+        async def main():
+            fm = FlameModel('async', 'redis://:@localhost:6379/7')
+            await fm.adaptor.proxy.flushdb().execute()
+            for i in range(12):
+                await ScanUser(id=i, name='x').save().execute()
+            keys = [key async for key in ScanUser.scan_keys(count=5)]
+            users = [user async for user in ScanUser.scan_instances(count=5)]
+            collected = await ScanUser.keys().execute()
+            await fm.adaptor.proxy.aclose().execute()
+            return keys, users, collected
+
+        keys, users, collected = asyncio.run(main())
+        self.assertEqual(len(keys), 12)
+        self.assertEqual(sorted(user.id for user in users), list(range(12)))
+        self.assertEqual(sorted(keys), sorted(collected))
+
+
+if __name__ == '__main__':
+    unittest.main()
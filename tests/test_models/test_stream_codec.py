@@ -0,0 +1,68 @@
+import unittest
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+from src.flamemodel import FlameModel
+from src.flamemodel.models import Stream
+from src.flamemodel.models.fields import fields
+from src.flamemodel.models.stream_codec import stream_codec
+
+
+class Device(BaseModel):
+    name: str
+    ports: List[int]
+
+
+class SensorEvent(Stream):
+    sensor_id: int = fields(primary_key=True)
+    entry_id: str = fields(entry=True, default='*')
+    value: float = fields()
+    count: int = fields()
+    ok: bool = fields()
+    at: datetime = fields()
+    label: Optional[str] = fields(default=None)
+    device: Optional[Device] = fields(default=None)
+
+
+class TestStreamCodec(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel(
+            'sync',
+            'redis://:@localhost:6379/4'
+        )
+        self.fm.adaptor.proxy.flushdb().execute()
+        self.event = SensorEvent(
+            sensor_id=7, value=1.5, count=3, ok=False, at=datetime(2025, 5, 1, 12, 0),
+            device=Device(name='d1', ports=[1, 2])
+        )
+
+    def test_encode(self):
+        data = stream_codec(SensorEvent).encode(self.event)
+        self.assertEqual(data['ok'], b'0')
+        self.assertEqual(data['at'], '2025-05-01T12:00:00')
+        self.assertEqual(data['device'], b'{"name":"d1","ports":[1,2]}')
+        self.assertNotIn('label', data)
+        self.assertNotIn('sensor_id', data)
+        self.assertNotIn('entry_id', data)
+
+    def test_decode_raw_entry(self):
+        event = stream_codec(SensorEvent).decode(7, b'1-0', {
+            b'value': b'2.25', b'count': b'4', b'ok': b'1', b'at': b'2025-05-01T12:00:00', b'unknown': b'x'
+        })
+        self.assertEqual(event.sensor_id, 7)
+        self.assertEqual(event.entry_id, '1-0')
+        self.assertEqual((event.value, event.count, event.ok), (2.25, 4, True))
+        self.assertIsNone(event.device)
+
+    def test_round_trip(self):
+        entry_id = self.event.add().execute()
+        self.assertEqual(self.event.entry_id, entry_id)
+        [(_, loaded)] = SensorEvent.range(7).execute()
+        self.assertEqual(loaded.model_dump(exclude={'entry_id'}), self.event.model_dump(exclude={'entry_id'}))
+        [(_, loaded)] = SensorEvent.read({7: '0'}).execute()['SensorEvent:7']
+        self.assertEqual(loaded.sensor_id, 7)
+        self.assertEqual(loaded.device.ports, [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+from src.flamemodel import FlameModel
+from src.flamemodel.core.session import Session
+from src.flamemodel.exceptions import UniqueViolationError
+from src.flamemodel.models import String
+from src.flamemodel.models.fields import fields
+
+
+class UniqAccount(String):
+    id: int = fields(primary_key=True)
+    email: str = fields(unique=True)
+    login: str | None = fields(unique=True, default=None)
+    city: str = fields(index=True, default='paris')
+
+
+class UniqMember(String):
+    __storage_mode__ = 'fields'
+
+    id: int = fields(primary_key=True)
+    email: str = fields(unique=True)
+
+
+class TestUnique(unittest.TestCase):
+    def setUp(self):
+        self.fm = FlameModel('sync', 'redis://:@localhost:6379/11')
+        self.proxy = self.fm.adaptor.proxy
+        self.proxy.flushdb().execute()
+        UniqAccount(id=1, email='a@x.com', login='a').save().execute()
+
+    def owner(self, key):
+        value = self.proxy.get(key).execute()
+        return value.decode() if value is not None else None
+
+    def test_save_claims(self):
+        self.assertEqual(self.owner('UniqAccount:uniq:email:a@x.com'), '1')
+        self.assertEqual(self.owner('UniqAccount:uniq:login:a'), '1')
+        # saving again keeps the claims
+        self.assertTrue(UniqAccount(id=1, email='a@x.com', login='a').save().execute())
+
+    def test_conflict(self):
+        with self.assertRaises(UniqueViolationError) as ctx:
+            UniqAccount(id=2, email='a@x.com').save().execute()
+        self.assertEqual((ctx.exception.field_name, ctx.exception.owner), ('email', '1'))
+        self.assertIsNone(UniqAccount.get(2).execute())
+        self.assertEqual(self.proxy.smembers('UniqAccount:idx:city:paris').execute(), {b'1'})
+
+    def test_changed_value_releases_claim(self):
+        # an instance which was not loaded first, the stored values are read
+        UniqAccount(id=1, email='b@x.com', login='a').save().execute()
+        self.assertIsNone(self.owner('UniqAccount:uniq:email:a@x.com'))
+        self.assertEqual(self.owner('UniqAccount:uniq:email:b@x.com'), '1')
+        UniqAccount(id=2, email='a@x.com').save().execute()
+        account = UniqAccount.get(1).execute()
+        account.update(login=None).execute()
+        self.assertIsNone(self.owner('UniqAccount:uniq:login:a'))
+
+    def test_delete_releases_claims(self):
+        UniqAccount.get(1).execute().delete().execute()
+        self.assertEqual(self.proxy.keys('UniqAccount:uniq:*').execute(), [])
+        UniqAccount(id=3, email='a@x.com').save().execute()
+
+    def test_fields_storage_mode(self):
+        member = UniqMember(id=1, email='m@x.com')
+        member.save().execute()
+        member.update(email='n@x.com').execute()
+        self.assertIsNone(self.owner('UniqMember:uniq:email:m@x.com'))
+        with self.assertRaises(UniqueViolationError):
+            UniqMember(id=2, email='n@x.com').save().execute()
+
+    def test_save_over_invalid_value(self):
+        # a stored value which is no longer a valid instance: the valid fields still count
+        self.proxy.set('UniqAccount:1', '{"id": 1, "email": "a@x.com", "login": 5, "city": "lyon"}').execute()
+        self.assertTrue(UniqAccount(id=1, email='b@x.com').save().execute())
+        self.assertIsNone(self.owner('UniqAccount:uniq:email:a@x.com'))
+        self.assertEqual(self.owner('UniqAccount:uniq:email:b@x.com'), '1')
+        self.assertEqual(self.proxy.smembers('UniqAccount:idx:city:lyon').execute(), set())
+        # and a value which can't be decoded at all
+        self.proxy.set('UniqAccount:1', 'not json').execute()
+        self.assertTrue(UniqAccount(id=1, email='b@x.com').save().execute())
+        self.proxy.hset('UniqMember:1', mapping={'id': '1', 'email': '7'}).execute()
+        UniqMember(id=1, email='m@x.com').save().execute()
+        self.assertEqual(self.owner('UniqMember:uniq:email:m@x.com'), '1')
+
+    def test_lookup(self):
+        UniqAccount(id=2, email='b@x.com').save().execute()
+        session = Session(self.fm)
+        self.assertEqual(session.query(UniqAccount).filter_by(email='b@x.com').first().id, 2)
+        self.assertIsNone(session.query(UniqAccount).filter_by(email='c@x.com').first())
+        self.assertEqual(session.query(UniqAccount).filter_by(email='a@x.com', login='b').all(), [])
+        self.assertEqual([a.id for a in session.query(UniqAccount).filter_by(email='a@x.com', login='a').all()], [1])
+
+    def test_session_commit(self):
+        session = Session(self.fm).begin()
+        session.add_all([UniqAccount(id=4, email='d@x.com'), UniqAccount(id=5, email='e@x.com')])
+        self.assertEqual(session.commit(), [True, True])
+        self.assertEqual(self.owner('UniqAccount:uniq:email:e@x.com'), '5')
+
+
+class TestUniqueAsync(unittest.TestCase):
+    def test_conflict(self):
+        async def main():
+            fm = FlameModel('async', 'redis://:@localhost:6379/11')
+            await fm.adaptor.proxy.flushdb().execute()
+            await UniqAccount(id=1, email='a@x.com').save().execute()
+            with self.assertRaises(UniqueViolationError):
+                await UniqAccount(id=2, email='a@x.com').save().execute()
+            found = await Session(fm).query(UniqAccount).filter_by(email='a@x.com').first()
+            await fm.adaptor.proxy.aclose().execute()
+            return found
+
+        self.assertEqual(asyncio.run(main()).id, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import unittest
+from datetime import datetime, timezone
+from typing import List, Optional
+from src.flamemodel.core.serializer import DefaultSerializer
+from src.flamemodel.models import BaseRedisModel
+from src.flamemodel.models.fields import fields
+
+
+def to_timestamp(value: datetime) -> int:
+    return int(value.timestamp())
+
+
+def from_timestamp(value: int) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+class Article(BaseRedisModel):
+    __redis_type__ = 'string'
+
+    id: int = fields(primary_key=True)
+    title: str = fields()
+    created_at: datetime = fields(serializer=to_timestamp, deserializer=from_timestamp)
+    tags: List[str] = fields(serializer=','.join, deserializer=lambda x: x.split(','))
+    summary: Optional[str] = fields(default=None, exclude_from_dump=True)
+
+
+class Plain(BaseRedisModel):
+    __redis_type__ = 'string'
+
+    id: int = fields(primary_key=True)
+    title: str = fields()
+
+
+class TestCodegen(unittest.TestCase):
+    def setUp(self):
+        self.serializer = DefaultSerializer()
+        self.article = Article(
+            id=1,
+            title='hello',
+            created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+            tags=['a', 'b'],
+            summary='computed'
+        )
+
+    def test_serialize_honors_field_options(self):
+        data = json.loads(self.serializer.serialize(self.article))
+        self.assertEqual(data, {'id': 1, 'title': 'hello', 'created_at': 1735689600, 'tags': 'a,b'})
+
+    def test_round_trip(self):
+        loaded = self.serializer.deserialize(self.serializer.serialize(self.article).encode('utf-8'), Article)
+        self.assertEqual(loaded.created_at, self.article.created_at)
+        self.assertEqual(loaded.tags, ['a', 'b'])
+        self.assertIsNone(loaded.summary)
+
+    def test_dict_mode(self):
+        serializer = DefaultSerializer({'mode': 'dict'})
+        data = serializer.serialize(self.article)
+        self.assertEqual(data['created_at'], 1735689600)
+        self.assertNotIn('summary', data)
+        self.assertEqual(serializer.deserialize(data, Article).tags, ['a', 'b'])
+
+    def test_compiled_once(self):
+        codec = self.serializer.compile_model(Article)
+        self.assertIn('_ser_', codec.source)
+        self.serializer.serialize(self.article)
+        self.assertIs(self.serializer._get_codec(Article), codec)
+
+    def test_plain_model_has_no_codec(self):
+        self.assertIsNone(self.serializer.compile_model(Plain))
+        self.assertEqual(self.serializer.serialize(Plain(id=1, title='x')), '{"id":1,"title":"x"}')
+
+    def test_exclude_none(self):
+        serializer = DefaultSerializer({'exclude_none': True})
+        article = self.article.model_copy(update={'tags': None})
+        self.assertNotIn('tags', json.loads(serializer.serialize(article)))
+
+
+if __name__ == '__main__':
+    unittest.main()
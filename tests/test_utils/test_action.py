@@ -158,6 +158,17 @@ class ActionTest(unittest.TestCase):
         with self.assertRaises(RuntimeError):
             await action  # 如果运行模式是同步的，调用 `await` 应该抛出异常
 
+    def test_queueable(self):
+        # the proxy sets both the bound method and the command name
+        command = Action(runtime_mode='sync', executor=self.client.set, command='set', args=('a', 'b'))
+        self.assertTrue(command.queueable())
+        self.assertTrue(command.then(str).queueable())
+        self.assertFalse(Action(runtime_mode='sync', executor=mock_executor).queueable())
+        optimistic = Action.optimistic(['a'], [], lambda r: command, runtime_mode='sync', client=self.client)
+        self.assertFalse(optimistic.queueable())
+        self.assertFalse(optimistic.then(str).queueable())
+        self.assertFalse(Action.sequence([command], runtime_mode='sync').queueable())
+
     def test_then_chained_handler(self):
         # 创建一个带有链式处理的 Action
         action = Action(